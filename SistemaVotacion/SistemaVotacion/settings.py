@@ -10,10 +10,14 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
 from corsheaders.defaults import  default_headers
+from django.db.backends.signals import connection_created
+
+from SistemaVotacion import sqlite
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -47,6 +51,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'SistemaVotacion.perfilado.PerfiladoMiddleware',
+    'SistemaVotacion.respuestas.CompresionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -80,12 +86,23 @@ WSGI_APPLICATION = 'SistemaVotacion.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Perfil para escrituras concurrentes (WAL, busy timeout, transacciones
+# IMMEDIATE), ver sqlite.py. SQLITE_CONCURRENTE=0 vuelve a lo de fabrica.
+SQLITE_CONCURRENTE = os.environ.get('SQLITE_CONCURRENTE', '1') == '1'
+# WAL queda grabado en el archivo: solo en el despliegue, no en la copia del repo
+SQLITE_WAL = os.environ.get('SQLITE_WAL', '0') == '1'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': sqlite.OPCIONES if SQLITE_CONCURRENTE else {},
+        # cada hilo reusa su conexion entre requests y los PRAGMA se pagan una vez
+        'CONN_MAX_AGE': 600 if SQLITE_CONCURRENTE else 0,
+        'CONN_HEALTH_CHECKS': True,
     }
 }
+connection_created.connect(sqlite.configurar_conexion, dispatch_uid='sqlite_concurrente')
 
 
 # Password validation
@@ -144,7 +161,26 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'SistemaVotacion.respuestas.OrjsonRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'SistemaVotacion.respuestas.OrjsonParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
+
+# respuestas de texto/JSON mas chicas que esto no se comprimen
+COMPRESION_MINIMO = 1024
+
+# Server-Timing y /_perfilado/ por request, solo si se pide (PERFILADO=1)
+PERFILADO = os.environ.get('PERFILADO') == '1'
+PERFILADO_MUESTRAS = 5000
+# sin DEBUG, /_perfilado/ pide usuario staff o la cabecera X-Perfilado-Token
+PERFILADO_TOKEN = os.environ.get('PERFILADO_TOKEN', '')
+
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(days=1),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1)
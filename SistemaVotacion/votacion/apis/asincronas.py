@@ -0,0 +1,20 @@
+"""
+Version async del GET mas pedido de votacion, servida por votacion/urls.py
+en la misma ruta que el @action de VotoViewSet, que queda detras.
+
+Bajo ASGI una vista sync corre en el unico hilo de sync_to_async y todas las
+conexiones de un worker hacen cola ahi; esta usa el ORM async. Como el
+endpoint es publico (VotoViewSet no tiene permission_classes) no autentica:
+DRF validaba el token de todas formas y hacia una consulta por el usuario.
+"""
+from django.views.decorators.http import require_safe
+
+from SistemaVotacion.respuestas import respuesta_json
+from votacion.models import Voto
+
+
+@require_safe
+async def cantidad_votos_votante(request, eleccion_id, votante_id):
+    # VotoViewSet.get_cantidad_votos_eleccion
+    cantidad = await Voto.objects.filter(eleccion_id=eleccion_id, votante_id=votante_id).acount()
+    return respuesta_json({'cantidad_votos': cantidad})
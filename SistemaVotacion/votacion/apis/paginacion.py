@@ -0,0 +1,27 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+
+
+class PaginacionPorId(CursorPagination):
+    """
+    Paginacion por cursor sobre la clave primaria: cada pagina es
+    WHERE id > <ultimo id> ORDER BY id LIMIT n, asi una pagina profunda
+    cuesta lo mismo que la primera.
+    """
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+def filtrar_por_params(queryset, params, filtros):
+    # filtros: {'<query param>': '<lookup del ORM>'}, los valores deben ser enteros
+    for param, lookup in filtros.items():
+        valor = params.get(param)
+        if valor in (None, ''):
+            continue
+        try:
+            queryset = queryset.filter(**{lookup: int(valor)})
+        except ValueError:
+            raise ValidationError({param: 'Debe ser un número válido'})
+    return queryset
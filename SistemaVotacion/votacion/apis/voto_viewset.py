@@ -3,6 +3,7 @@ from votacion.models import Voto
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from django.db.models import Count
+from votacion.apis.paginacion import PaginacionPorId, filtrar_por_params
 
 
 class VotoSerializer(serializers.ModelSerializer):
@@ -14,6 +15,18 @@ class VotoViewSet(viewsets.ModelViewSet):
     # permission_classes = [IsAuthenticated, DjangoModelPermissions]
     queryset = Voto.objects.all()
     serializer_class = VotoSerializer
+    pagination_class = PaginacionPorId
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = filtrar_por_params(queryset, self.request.query_params, {
+                'eleccion': 'eleccion_id',
+                'mesa': 'mesa_id',
+                'cargo': 'cargo_id',
+                'candidatura': 'candidatura_id',
+            })
+        return queryset
 
     @action(detail=False, methods=['get'], url_path='eleccion/(?P<eleccion_id>[^/.]+)/votante/(?P<votante_id>[^/.]+)')
     def get_cantidad_votos_eleccion (self, request, eleccion_id=None, votante_id=None):
@@ -0,0 +1,348 @@
+"""
+Utilidades compartidas por los comandos benchmark_*.
+Los benchmarks corren siempre sobre una base de prueba temporal, nunca sobre
+db.sqlite3.
+
+El mismo archivo esta en los tres servicios (eleccion, votacion y
+autenticacion); ComandoBenchmark es la base de sus benchmark_carga, que
+escriben un reporte JSON con el mismo formato para poder compararlo entre
+commits (--salida / --comparar). ComandoBenchmarkAsgi es la de los
+benchmark_async, que comparan las vistas async con las de los viewsets.
+"""
+import asyncio
+import inspect
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+import django
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test.utils import override_settings
+
+
+class ContadorQueries:
+    # se engancha con connection.execute_wrapper, no guarda el SQL
+    def __init__(self):
+        self.total = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.total += 1
+        return execute(sql, params, many, context)
+
+
+@contextmanager
+def base_de_prueba(archivo=False):
+    """
+    Con archivo=True la base de prueba es un archivo temporal en vez de
+    memoria: es lo que hace falta para medir varios hilos escribiendo.
+    """
+    directorio, test_original = None, connection.settings_dict.get('TEST', {})
+    if archivo:
+        directorio = tempfile.mkdtemp(prefix='bench-')
+        connection.settings_dict['TEST'] = {**test_original, 'NAME': os.path.join(directorio, 'bench.sqlite3')}
+    # el archivo temporal es del benchmark: ahi si va WAL (ver sqlite.py)
+    with override_settings(SQLITE_WAL=True) if archivo else nullcontext():
+        nombre_original = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(nombre_original, verbosity=0)
+            if directorio:
+                connection.settings_dict['TEST'] = test_original
+                shutil.rmtree(directorio, ignore_errors=True)
+
+
+@contextmanager
+def sqlite_de_fabrica(activo=True):
+    """
+    Con activo=True corre sin el perfil de sqlite.py: OPTIONS vacias, sin
+    PRAGMA y una conexion por request. Es el "antes" para comparar
+    (benchmark_carga --sqlite defecto).
+    """
+    if not activo:
+        yield
+        return
+    ajustes = connection.settings_dict
+    originales = ajustes.get('OPTIONS', {}), ajustes.get('CONN_MAX_AGE', 0), getattr(settings, 'SQLITE_CONCURRENTE', True)
+    connection.close()
+    ajustes['OPTIONS'], ajustes['CONN_MAX_AGE'] = {}, 0
+    settings.SQLITE_CONCURRENTE = False
+    try:
+        yield
+    finally:
+        connection.close()
+        ajustes['OPTIONS'], ajustes['CONN_MAX_AGE'] = originales[:2]
+        settings.SQLITE_CONCURRENTE = originales[2]
+
+
+@contextmanager
+def medir():
+    """
+    Uso:
+        with medir() as m:
+            ...
+        m['segundos'], m['queries']
+    """
+    contador = ContadorQueries()
+    resultado = {}
+    inicio = time.perf_counter()
+    with connection.execute_wrapper(contador):
+        yield resultado
+    resultado['segundos'] = time.perf_counter() - inicio
+    resultado['queries'] = contador.total
+
+
+def percentiles_ms(tiempos):
+    tiempos = sorted(tiempos)
+
+    def p(q):
+        return round(tiempos[min(len(tiempos) - 1, int(q * len(tiempos)))] * 1000, 3)
+    return {'p50_ms': p(0.50), 'p95_ms': p(0.95), 'p99_ms': p(0.99)}
+
+
+def carga(operacion, clientes, iteraciones):
+    """
+    Corre operacion(cliente, i) `iteraciones` veces repartidas entre
+    `clientes` hilos, cada uno con su APIClient y su conexion. Cuenta como
+    error una excepcion o una respuesta >= 400.
+    """
+    from rest_framework.test import APIClient
+
+    principal = threading.current_thread()
+
+    def trabajar(indices):
+        cliente = APIClient(raise_request_exception=False)
+        contador = ContadorQueries()
+        tiempos, errores, primer_error = [], 0, None
+        try:
+            with connection.execute_wrapper(contador):
+                for i in indices:
+                    inicio = time.perf_counter()
+                    try:
+                        respuesta = operacion(cliente, i)
+                        if respuesta.status_code >= 400:
+                            errores += 1
+                            primer_error = primer_error or f'HTTP {respuesta.status_code}'
+                    except Exception as e:
+                        errores += 1
+                        primer_error = primer_error or f'{type(e).__name__}: {e}'
+                    tiempos.append(time.perf_counter() - inicio)
+        finally:
+            if threading.current_thread() is not principal:
+                connection.close()
+        return tiempos, errores, primer_error, contador.total
+
+    porciones = [range(h, iteraciones, clientes) for h in range(clientes)]
+    inicio = time.perf_counter()
+    if clientes == 1:
+        resultados = [trabajar(porciones[0])]
+    else:
+        with ThreadPoolExecutor(clientes) as pool:
+            resultados = list(pool.map(trabajar, porciones))
+    segundos = time.perf_counter() - inicio
+
+    tiempos = [t for r in resultados for t in r[0]]
+    errores = [r[2] for r in resultados if r[2]]
+    return _resumen(
+        clientes, iteraciones, segundos, tiempos, sum(r[1] for r in resultados),
+        errores[0] if errores else None, round(sum(r[3] for r in resultados) / iteraciones, 2),
+    )
+
+
+def carga_asgi(operacion, conexiones, iteraciones):
+    """
+    Como carga(), pero con `conexiones` corutinas concurrentes contra el
+    handler ASGI en un solo event loop, como un worker de uvicorn. `operacion`
+    recibe un AsyncClient y devuelve lo que hay que esperar. No cuenta
+    queries: las vistas sync corren en otro hilo.
+    """
+    from django.test import AsyncClient
+
+    async def correr():
+        cliente = AsyncClient(raise_request_exception=False)
+        tiempos, fallas = [], []
+
+        async def trabajar(indices):
+            for i in indices:
+                inicio = time.perf_counter()
+                try:
+                    respuesta = operacion(cliente, i)
+                    if inspect.isawaitable(respuesta):
+                        respuesta = await respuesta
+                    if respuesta.status_code >= 400:
+                        fallas.append(f'HTTP {respuesta.status_code}')
+                except Exception as e:
+                    fallas.append(f'{type(e).__name__}: {e}')
+                tiempos.append(time.perf_counter() - inicio)
+
+        inicio = time.perf_counter()
+        await asyncio.gather(*(trabajar(range(h, iteraciones, conexiones)) for h in range(conexiones)))
+        segundos = time.perf_counter() - inicio
+        # las conexiones que abrio el hilo de sync_to_async
+        await sync_to_async(connections.close_all)()
+        return tiempos, fallas, segundos
+
+    tiempos, fallas, segundos = asyncio.run(correr())
+    return _resumen(conexiones, iteraciones, segundos, tiempos, len(fallas), fallas[0] if fallas else None, None)
+
+
+def _resumen(clientes, iteraciones, segundos, tiempos, errores, primer_error, queries_por_op):
+    return {
+        'clientes': clientes,
+        'iteraciones': iteraciones,
+        'segundos': round(segundos, 3),
+        'por_segundo': round(iteraciones / segundos, 1),
+        **percentiles_ms(tiempos),
+        'errores': errores,
+        'primer_error': primer_error,
+        'queries_por_op': queries_por_op,
+    }
+
+
+class Escenario:
+    """
+    preparar(tamano) carga los datos y devuelve operacion(cliente, i).
+    `escala` achica las iteraciones de los escenarios caros; los que no
+    tienen sentido en paralelo corren solo con un cliente.
+    """
+
+    def __init__(self, preparar, concurrente=True, escala=1.0):
+        self.preparar = preparar
+        self.concurrente = concurrente
+        self.escala = escala
+
+
+def metadatos():
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR,
+            capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        'commit': commit,
+        'fecha': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'base': connection.vendor,
+    }
+
+
+def _porcentaje(valor):
+    return 'n/a' if valor is None else f'{valor:+}%'
+
+
+def _clave(resultado):
+    return resultado['escenario'], resultado.get('modo'), resultado['tamano'], resultado['clientes']
+
+
+def comparar(actual, anterior):
+    # cambio porcentual de throughput y p95 contra un reporte anterior
+    previos = {_clave(r): r for r in anterior.get('resultados', [])}
+    filas = []
+    for r in actual['resultados']:
+        p = previos.get(_clave(r))
+        if p is None:
+            continue
+        filas.append({
+            'escenario': r['escenario'], 'modo': r.get('modo'), 'tamano': r['tamano'], 'clientes': r['clientes'],
+            'por_segundo_%': round((r['por_segundo'] / p['por_segundo'] - 1) * 100, 1) if p['por_segundo'] else None,
+            'p95_%': round((r['p95_ms'] / p['p95_ms'] - 1) * 100, 1) if p['p95_ms'] else None,
+        })
+    return filas
+
+
+def _fila(r):
+    nombre = f"{r['escenario']}/{r['modo']}" if r.get('modo') else r['escenario']
+    return f"{nombre:>14} tamano={r['tamano']:<8} clientes={r['clientes']:<3} "
+
+
+class ComandoBenchmark(BaseCommand):
+    servicio = None
+    escenarios = {}
+    clientes = [1, 4, 8]
+
+    def add_arguments(self, parser):
+        parser.add_argument('--escenarios', nargs='+', choices=sorted(self.escenarios))
+        parser.add_argument('--tamanos', type=int, nargs='+', default=[10_000, 100_000])
+        parser.add_argument('--clientes', type=int, nargs='+', default=self.clientes)
+        parser.add_argument('--iteraciones', type=int, default=500)
+        parser.add_argument('--salida', help='archivo donde escribir el reporte JSON')
+        parser.add_argument('--comparar', help='reporte JSON anterior contra el que comparar')
+        parser.add_argument('--sqlite', choices=['concurrente', 'defecto'], default='concurrente',
+                            help='defecto: sin el perfil de sqlite.py, para medir el antes')
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        if '*' not in settings.ALLOWED_HOSTS:
+            settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+        elegidos = options['escenarios'] or list(self.escenarios)
+        parametros = {k: options[k] for k in ('tamanos', 'clientes', 'iteraciones', 'sqlite')}
+        reporte = {'servicio': self.servicio, **metadatos(), 'parametros': parametros, 'resultados': []}
+
+        for nombre in elegidos:
+            escenario = self.escenarios[nombre]
+            iteraciones = max(1, int(options['iteraciones'] * escenario.escala))
+            for tamano in options['tamanos']:
+                with sqlite_de_fabrica(options['sqlite'] == 'defecto'), base_de_prueba(archivo=True):
+                    operacion = escenario.preparar(tamano)
+                    clientes = options['clientes'] if escenario.concurrente else [1]
+                    for medido in self.correr(operacion, clientes, iteraciones):
+                        resultado = {'escenario': nombre, 'tamano': tamano, **medido}
+                        reporte['resultados'].append(resultado)
+                        if not options['json']:
+                            self.stdout.write(
+                                f"{_fila(resultado)}{resultado['por_segundo']:>9}/s p50={resultado['p50_ms']}ms "
+                                f"p95={resultado['p95_ms']}ms errores={resultado['errores']}"
+                            )
+
+        if options['comparar']:
+            with open(options['comparar']) as archivo:
+                reporte['comparacion'] = comparar(reporte, json.load(archivo))
+            if not options['json']:
+                for fila in reporte['comparacion']:
+                    self.stdout.write(
+                        f"{_fila(fila)}por_segundo {_porcentaje(fila['por_segundo_%'])} p95 {_porcentaje(fila['p95_%'])}"
+                    )
+        if options['salida']:
+            with open(options['salida'], 'w') as archivo:
+                json.dump(reporte, archivo, indent=2)
+        if options['json']:
+            self.stdout.write(json.dumps(reporte, indent=2))
+
+    def correr(self, operacion, clientes, iteraciones):
+        for n in clientes:
+            yield carga(operacion, n, iteraciones)
+
+
+class ComandoBenchmarkAsgi(ComandoBenchmark):
+    """
+    Mide cada escenario por el handler ASGI dos veces: con las vistas async
+    (modo async, las rutas de ROOT_URLCONF) y con las de los viewsets (modo
+    sync, las de `urlconf_sync`). La cache se vacia antes de cada modo.
+    """
+    urlconf_sync = None
+    clientes = [1, 16, 64]
+
+    def correr(self, operacion, clientes, iteraciones):
+        for modo in ('sync', 'async'):
+            urls = override_settings(ROOT_URLCONF=self.urlconf_sync) if modo == 'sync' else nullcontext()
+            with urls:
+                cache.clear()
+                for n in clientes:
+                    yield {'modo': modo, **carga_asgi(operacion, n, iteraciones)}
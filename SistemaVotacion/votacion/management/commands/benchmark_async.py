@@ -0,0 +1,32 @@
+from django.urls import path, re_path, include
+
+from votacion.apis import VotoViewSet
+from votacion.management.commands._bench import ComandoBenchmarkAsgi, Escenario
+from votacion.management.commands.benchmark_carga import cargar_votos, ELECCIONES, CARGOS
+
+# modo sync: la misma ruta servida por el @action del viewset
+urlpatterns = [
+    re_path(r'^votacion/votos/eleccion/(?P<eleccion_id>[^/.]+)/votante/(?P<votante_id>[^/.]+)/$',
+            VotoViewSet.as_view({'get': 'get_cantidad_votos_eleccion'})),
+    path('', include('SistemaVotacion.urls')),
+]
+
+
+def preparar_votante(tamano):
+    # lo que consulta la mesa antes de dejar votar a alguien
+    cargar_votos(tamano)
+    votantes = max(1, tamano // CARGOS)
+
+    def operacion(cliente, i):
+        votante = (i * 7919) % votantes
+        return cliente.get(f'/votacion/votos/eleccion/{votante % ELECCIONES + 1}/votante/{votante}/')
+    return operacion
+
+
+class Command(ComandoBenchmarkAsgi):
+    help = 'Cantidad de votos de un votante bajo ASGI, vista async contra la del viewset'
+    servicio = 'votacion'
+    urlconf_sync = __name__
+    escenarios = {
+        'votante': Escenario(preparar_votante),
+    }
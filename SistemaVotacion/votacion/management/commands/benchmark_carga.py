@@ -0,0 +1,67 @@
+import random
+
+from votacion.management.commands._bench import ComandoBenchmark, Escenario
+from votacion.models import Voto
+
+ELECCIONES = 3
+CARGOS = 5
+CANDIDATURAS_POR_CARGO = 12
+VOTANTES_POR_MESA = 250
+
+
+def cargar_votos(tamano, lote=50_000):
+    # `tamano` votos ya emitidos: cada votante vota una vez por cargo
+    azar = random.Random(0)
+    for inicio in range(0, tamano, lote):
+        Voto.objects.bulk_create([
+            Voto(
+                votante_id=i // CARGOS, mesa_id=i // (CARGOS * VOTANTES_POR_MESA),
+                eleccion_id=(i // CARGOS) % ELECCIONES + 1, cargo_id=i % CARGOS + 1,
+                candidatura_id=(i % CARGOS) * CANDIDATURAS_POR_CARGO + azar.randrange(CANDIDATURAS_POR_CARGO) + 1,
+            )
+            for i in range(inicio, min(tamano, inicio + lote))
+        ], batch_size=lote)
+
+
+def preparar_voto(tamano):
+    cargar_votos(tamano)
+    primero = tamano // CARGOS + 1
+
+    def operacion(cliente, i):
+        cargo = i % CARGOS
+        return cliente.post('/votacion/votos/', {
+            'votante_id': primero + i // CARGOS, 'mesa_id': 1, 'eleccion_id': 1, 'cargo_id': cargo + 1,
+            'candidatura_id': cargo * CANDIDATURAS_POR_CARGO + 1,
+        }, format='json')
+    return operacion
+
+
+def preparar_conteo(tamano):
+    cargar_votos(tamano)
+
+    def operacion(cliente, i):
+        return cliente.get(
+            f'/votacion/votos/cargo/{i % CARGOS + 1}/eleccion/{i % ELECCIONES + 1}/candidaturas/'
+        )
+    return operacion
+
+
+def preparar_mixto(tamano):
+    # lo que pasa el dia de la eleccion: votos entrando mientras se consulta el conteo
+    votar, contar = preparar_voto(tamano), (lambda cliente, i: cliente.get(
+        f'/votacion/votos/cargo/{i % CARGOS + 1}/eleccion/{i % ELECCIONES + 1}/candidaturas/'
+    ))
+
+    def operacion(cliente, i):
+        return contar(cliente, i) if i % 4 == 3 else votar(cliente, i)
+    return operacion
+
+
+class Command(ComandoBenchmark):
+    help = 'Carga contra el POST de votos, el conteo por candidaturas y los dos a la vez; reporte JSON comparable entre commits'
+    servicio = 'votacion'
+    escenarios = {
+        'voto': Escenario(preparar_voto),
+        'conteo': Escenario(preparar_conteo, escala=0.2),
+        'mixto': Escenario(preparar_mixto, escala=0.5),
+    }
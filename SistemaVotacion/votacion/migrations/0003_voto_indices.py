@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('votacion', '0002_voto_cargo_id'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='voto',
+            index=models.Index(fields=['eleccion_id', 'votante_id'], name='voto_eleccion_votante_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voto',
+            index=models.Index(fields=['cargo_id', 'eleccion_id', 'candidatura_id'], name='voto_cargo_eleccion_cand_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voto',
+            index=models.Index(fields=['candidatura_id'], name='voto_candidatura_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='voto',
+            index=models.Index(fields=['mesa_id'], name='voto_mesa_idx'),
+        ),
+    ]
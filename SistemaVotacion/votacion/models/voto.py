@@ -7,5 +7,15 @@ class Voto(models.Model):
     eleccion_id = models.IntegerField()
     cargo_id = models.IntegerField( null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # votos de un votante en una eleccion
+            models.Index(fields=['eleccion_id', 'votante_id'], name='voto_eleccion_votante_idx'),
+            # conteo por candidatura de un cargo en una eleccion
+            models.Index(fields=['cargo_id', 'eleccion_id', 'candidatura_id'], name='voto_cargo_eleccion_cand_idx'),
+            models.Index(fields=['candidatura_id'], name='voto_candidatura_idx'),
+            models.Index(fields=['mesa_id'], name='voto_mesa_idx'),
+        ]
+
     def __str__(self):
         return f"Voto: Mesa {self.mesa_id}, Votante {self.votante_id}, Candidatura {self.candidatura_id}, Elección {self.eleccion_id}"
\ No newline at end of file
@@ -1,3 +1,196 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
 
-# Create your tests here.
+from django.conf import settings
+from django.core.management import call_command
+from django.db.models import Count
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from SistemaVotacion import sqlite
+from votacion.models import Voto
+
+
+class IndicesVotoTest(TestCase):
+    """
+    Revisa con EXPLAIN QUERY PLAN que las consultas mas usadas el dia de la
+    eleccion se resuelven con un indice y no recorriendo la tabla.
+    """
+
+    def setUp(self):
+        Voto.objects.bulk_create([
+            Voto(mesa_id=i % 50, votante_id=i, candidatura_id=i % 7, eleccion_id=i % 3, cargo_id=i % 4)
+            for i in range(2000)
+        ])
+
+    def assertUsaIndice(self, queryset, indice):
+        plan = queryset.explain()
+        self.assertIn(indice, plan)
+
+    def test_votos_de_un_votante(self):
+        # VotoViewSet.get_cantidad_votos_eleccion
+        self.assertUsaIndice(Voto.objects.filter(eleccion_id=1, votante_id=10), 'voto_eleccion_votante_idx')
+
+    def test_votos_por_candidaturas(self):
+        # VotoViewSet.votos_por_candidaturas
+        queryset = (
+            Voto.objects
+            .filter(cargo_id=1, eleccion_id=1)
+            .values('candidatura_id')
+            .annotate(cantidad=Count('id'))
+            .order_by('-cantidad')
+        )
+        self.assertUsaIndice(queryset, 'voto_cargo_eleccion_cand_idx')
+
+    def test_votos_de_una_candidatura(self):
+        # VotoViewSet.get_cantidad_votos_candidatura
+        self.assertUsaIndice(Voto.objects.filter(candidatura_id=3), 'voto_candidatura_idx')
+
+    def test_votos_de_una_mesa(self):
+        self.assertUsaIndice(Voto.objects.filter(mesa_id=5), 'voto_mesa_idx')
+
+
+class ConteoTest(TestCase):
+
+    def test_votos_por_candidaturas_con_orjson(self):
+        # la vista responde con un .values() sin pasar por un serializer
+        Voto.objects.bulk_create([
+            Voto(mesa_id=1, votante_id=i, candidatura_id=1 + (i % 3 == 0), eleccion_id=1, cargo_id=1)
+            for i in range(9)
+        ])
+        response = self.client.get('/votacion/votos/cargo/1/eleccion/1/candidaturas/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), [
+            {'candidatura_id': 1, 'cantidad': 6}, {'candidatura_id': 2, 'cantidad': 3},
+        ])
+
+    async def test_cantidad_votos_votante_async(self):
+        # la vista async responde lo mismo que VotoViewSet.get_cantidad_votos_eleccion
+        await Voto.objects.abulk_create([
+            Voto(mesa_id=1, votante_id=7, candidatura_id=c, eleccion_id=1, cargo_id=c) for c in (1, 2)
+        ])
+        response = await self.async_client.get('/votacion/votos/eleccion/1/votante/7/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'cantidad_votos': 2})
+        response = await self.async_client.get('/votacion/votos/eleccion/2/votante/7/')
+        self.assertEqual(response.json(), {'cantidad_votos': 0})
+        response = await self.async_client.head('/votacion/votos/eleccion/1/votante/7/')
+        self.assertEqual(response.status_code, 200)
+
+
+class PaginacionTest(TestCase):
+
+    def setUp(self):
+        Voto.objects.bulk_create([
+            Voto(mesa_id=1 + i % 2, votante_id=i, candidatura_id=1, eleccion_id=1, cargo_id=1) for i in range(1100)
+        ])
+
+    def test_siguiente_hasta_el_final(self):
+        ids, url = [], '/votacion/votos/?mesa=2&page_size=200'
+        while url:
+            respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200)
+            ids += [voto['id'] for voto in respuesta.json()['results']]
+            url = respuesta.json()['next']
+        self.assertEqual(ids, list(Voto.objects.filter(mesa_id=2).order_by('id').values_list('id', flat=True)))
+
+    def test_page_size_maximo(self):
+        self.assertEqual(len(self.client.get('/votacion/votos/?page_size=5000').json()['results']), 1000)
+
+    def test_filtros_no_enteros(self):
+        for param in ('eleccion', 'mesa', 'cargo', 'candidatura'):
+            with self.subTest(param=param):
+                self.assertEqual(self.client.get(f'/votacion/votos/?{param}=abc').status_code, 400)
+
+
+class GenerarVotosTest(TestCase):
+
+    def test_votos_reproducibles_y_con_indices(self):
+        call_command('generate_election', '--votantes', '2000', '--semilla', '5', stdout=StringIO())
+        votos = list(Voto.objects.order_by('pk').values_list('mesa_id', 'votante_id', 'candidatura_id', 'cargo_id'))
+        # cada votante que voto lo hizo una vez por cargo, en la mesa que le toca
+        por_votante = Voto.objects.values('votante_id').annotate(n=Count('id'), mesas=Count('mesa_id', distinct=True))
+        self.assertTrue(all(v['n'] == 3 and v['mesas'] == 1 for v in por_votante))
+        self.assertTrue(1000 < len(por_votante) < 1800)
+        self.assertEqual({c for _, _, c, cargo in votos if cargo == 2}, set(range(9, 17)))
+
+        Voto.objects.all().delete()
+        call_command('generate_election', '--votantes', '2000', '--semilla', '5', stdout=StringIO())
+        self.assertEqual(
+            list(Voto.objects.order_by('pk').values_list('mesa_id', 'votante_id', 'candidatura_id', 'cargo_id')), votos
+        )
+        # los indices que se borran durante la carga vuelven a estar
+        self.assertIn('voto_mesa_idx', Voto.objects.filter(mesa_id=1).explain())
+
+
+class PerfilSQLiteTest(SimpleTestCase):
+    # sobre un archivo aparte: la base en memoria de los tests no tiene WAL
+    databases = {'default'}
+
+    def conectar(self):
+        directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directorio, True)
+        conexiones = ConnectionHandler({'default': {
+            'ENGINE': 'django.db.backends.sqlite3', 'NAME': os.path.join(directorio, 'db.sqlite3'),
+            'OPTIONS': sqlite.OPCIONES,
+        }})
+        conexion = conexiones['default']
+        self.addCleanup(conexion.close)
+        return conexion
+
+    def pragma(self, conexion, nombre):
+        with conexion.cursor() as cursor:
+            cursor.execute(f'PRAGMA {nombre}')
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_CONCURRENTE=True, SQLITE_WAL=True)
+    def test_perfil_concurrente(self):
+        conexion = self.conectar()
+        self.assertEqual(self.pragma(conexion, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(conexion, 'synchronous'), 1)
+        self.assertEqual(self.pragma(conexion, 'busy_timeout'), sqlite.TIMEOUT * 1000)
+        self.assertEqual(conexion.transaction_mode, 'IMMEDIATE')
+
+    @override_settings(SQLITE_CONCURRENTE=True, SQLITE_WAL=False)
+    def test_sin_wal_no_cambia_el_archivo(self):
+        # el resto del perfil se aplica, pero el archivo sigue sin WAL ni -wal/-shm
+        conexion = self.conectar()
+        self.assertEqual(self.pragma(conexion, 'journal_mode'), 'delete')
+        self.assertEqual(self.pragma(conexion, 'busy_timeout'), sqlite.TIMEOUT * 1000)
+        nombre = conexion.settings_dict['NAME']
+        conexion.close()
+        self.assertFalse(os.path.exists(f'{nombre}-wal') or os.path.exists(f'{nombre}-shm'))
+
+    @override_settings(SQLITE_CONCURRENTE=False)
+    def test_configuracion_de_fabrica(self):
+        self.assertEqual(self.pragma(self.conectar(), 'journal_mode'), 'delete')
+
+
+# copias identicas en los tres servicios, que no comparten un paquete importable
+PROYECTOS = {
+    'sistemaAdministracionElectoral': ('sistemaAdministracionElectoral', 'eleccion'),
+    'SistemaVotacion': ('SistemaVotacion', 'votacion'),
+    'sistemaGestionUsuario': ('sistemaGestionUsuario', 'autenticacion'),
+}
+COPIAS = ('{config}/respuestas.py', '{config}/sqlite.py', '{config}/perfilado.py',
+          '{app}/management/commands/_bench.py')
+
+
+class CopiasCompartidasTest(SimpleTestCase):
+
+    def test_copias_identicas(self):
+        base = Path(settings.BASE_DIR)
+        config, app = PROYECTOS[base.name]
+        for plantilla in COPIAS:
+            propia = base / plantilla.format(config=config, app=app)
+            for proyecto, (otra_config, otra_app) in PROYECTOS.items():
+                otra = base.parent / proyecto / plantilla.format(config=otra_config, app=otra_app)
+                if otra == propia or not otra.exists():
+                    # el servicio puede estar desplegado sin los demas
+                    continue
+                with self.subTest(archivo=f'{proyecto}/{plantilla.format(config=otra_config, app=otra_app)}'):
+                    self.assertEqual(propia.read_bytes(), otra.read_bytes(),
+                                     f'{otra} difiere de {propia}: el cambio va en las tres copias')
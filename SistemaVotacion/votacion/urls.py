@@ -1,10 +1,14 @@
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework import routers
 
+from votacion.apis import asincronas
 from votacion.apis import VotoViewSet
 
 router = routers.DefaultRouter()
 router.register('votos', VotoViewSet)
 urlpatterns = [
+    # version async, delante de la del viewset (ver asincronas.py)
+    re_path(r'^votos/eleccion/(?P<eleccion_id>[^/.]+)/votante/(?P<votante_id>[^/.]+)/$',
+            asincronas.cantidad_votos_votante, name='voto-get-cantidad-votos-eleccion'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -5,7 +5,7 @@ import apiClient from "./interceptors";
 export class CandidaturaService {
   getCandidaturas(): Promise<Candidatura[]> {
     return apiClient
-      .get("eleccion/candidaturas/")
+      .get("eleccion/candidaturas/?expand=cargo,eleccion")
       .then(r => r.data)
       .catch(e => { throw new Error(e.message); });
   }
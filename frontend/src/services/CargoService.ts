@@ -5,7 +5,7 @@ export class CargoService {
     getCargos(): Promise<Array<Cargo>> {
         return new Promise<Array<Cargo>>((resolve, reject) => {
             apiClient
-                .get("eleccion/cargos/")
+                .get("eleccion/cargos/?expand=seccion")
                 .then((response) => {
                     const data = response.data?.results || response.data || [];
                     resolve(Array.isArray(data) ? data : []);
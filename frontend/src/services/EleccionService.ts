@@ -5,7 +5,7 @@ export class EleccionService {
   getElecciones(): Promise<Array<Eleccion>> {
     return new Promise<Array<Eleccion>>((resolve, reject) => {
       apiClient
-        .get("eleccion/elecciones/")
+        .get("eleccion/elecciones/?expand=seccion")
         .then((response) => {
           const data = response.data?.results || response.data || [];
           resolve(Array.isArray(data) ? data : []);
@@ -26,7 +26,7 @@ export class EleccionService {
       formData.append("seccion_id", eleccion.seccion.toString());
 
       apiClient
-        .post("eleccion/elecciones/", formData, {
+        .post("eleccion/elecciones/?expand=seccion", formData, {
           headers: {
             "Content-Type": "multipart/form-data",
           },
@@ -6,7 +6,7 @@ export class RecintoService {
   getRecintos(): Promise<Array<Recinto>> {
     return new Promise<Array<Recinto>>((resolve, reject) => {
       apiClient
-        .get("eleccion/recintos/")
+        .get("eleccion/recintos/?expand=seccion")
         .then((response) => {
           const data = response.data?.results || response.data || [];
           resolve(Array.isArray(data) ? data : []);
@@ -79,7 +79,7 @@ export class RecintoService {
   getRecintoById(id: number): Promise<Recinto> {
     return new Promise<Recinto>((resolve, reject) => {
       apiClient
-        .get(`eleccion/recintos/${id}/`)
+        .get(`eleccion/recintos/${id}/?expand=seccion`)
         .then((response) => {
           resolve(response.data);
         })
@@ -92,7 +92,7 @@ export class RecintoService {
   getRecintosBySeccion(seccionId: number): Promise<Array<Recinto>> {
     return new Promise<Array<Recinto>>((resolve, reject) => {
       apiClient
-        .get(`eleccion/recintos/seccion/${seccionId}`)
+        .get(`eleccion/recintos/seccion/${seccionId}/?expand=seccion`)
         .then((response) => {
           const data = response.data?.results || response.data || [];
           resolve(Array.isArray(data) ? data : []);
@@ -110,7 +110,7 @@ export class RecintoService {
   getRecintosByEleccion(eleccionId: number): Promise<Array<Recinto>> {
     return new Promise<Array<Recinto>>((resolve, reject) => {
       apiClient
-        .get(`eleccion/recintos/eleccion/${eleccionId}`)
+        .get(`eleccion/recintos/eleccion/${eleccionId}/?expand=seccion`)
         .then((response) => {
           const data = response.data?.results || response.data || [];
           resolve(Array.isArray(data) ? data : []);
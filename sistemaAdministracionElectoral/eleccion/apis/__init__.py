@@ -1,4 +1,4 @@
-from .seccion_viewset import SeccionViewSet, SeccionSerializer
+from .seccion_viewset import SeccionViewSet, SeccionSerializer, prefetch_puntos, prefetch_simplificada
 from .punto_viewset import PuntoViewSet, PuntoSerializer
 from .eleccion_viewset import EleccionViewSet, EleccionSerializer
 from .recinto_viewset import RecintoViewSet, RecintoSerializer
@@ -6,3 +6,4 @@ from .mesa_viewset import MesaViewSet, MesaSerializer
 from .cargo_viewset import CargoViewSet, CargoSerializer
 from .candidatura_viewset import CandidaturaViewSet, CandidaturaSerializer
 from .votante_viewset import VotanteViewSet, VotanteSerializer
+from .trabajo_viewset import TrabajoViewSet, TrabajoSerializer
@@ -0,0 +1,46 @@
+"""
+Versiones async de los GET mas pedidos, servidas por eleccion/urls.py en las
+mismas rutas que los @action de los viewsets, que quedan detras.
+
+Bajo ASGI una vista sync corre en el unico hilo de sync_to_async, y todas las
+conexiones de un worker hacen cola ahi. Estas usan el ORM async y responden
+lo mismo que su viewset. Si algo se sale del camino rapido (papeleta que no
+esta en cache, parametros invalidos) delegan en la vista sync.
+Funcionan tambien bajo WSGI, donde Django las corre con async_to_sync.
+"""
+from asgiref.sync import sync_to_async
+from django.views.decorators.http import require_safe
+
+from sistemaAdministracionElectoral.respuestas import respuesta_json
+from eleccion.models import Mesa
+from eleccion.apis.candidatura_viewset import CandidaturaViewSet, variante_papeleta, respuesta_papeleta
+from eleccion.services.papeleta import apapeleta_guardada
+from eleccion.services.simplificacion import nivel_para
+
+# los campos de MesaSerializer (fields='__all__'), en el mismo orden
+CAMPOS_MESA = ('id', 'jefe_id', 'numero', 'cantidad', 'recinto', 'eleccion')
+COLUMNAS_MESA = ('id', 'jefe_id', 'numero', 'cantidad', 'recinto_id', 'eleccion_id')
+
+papeleta_sync = CandidaturaViewSet.as_view({'get': 'get_papeleta_cargo_eleccion'})
+
+
+@require_safe
+async def papeleta(request, cargo_id, eleccion_id):
+    # CandidaturaViewSet.get_papeleta_cargo_eleccion
+    try:
+        nivel = nivel_para(tolerancia=request.GET.get('tolerance'), zoom=request.GET.get('zoom'))
+    except (TypeError, ValueError, OverflowError):
+        guardado = None
+    else:
+        guardado = await apapeleta_guardada(cargo_id, eleccion_id, variante_papeleta(nivel, request.GET))
+    if guardado is None:
+        # la renderiza la vista sync y queda en cache para las siguientes
+        return await sync_to_async(papeleta_sync)(request, cargo_id=cargo_id, eleccion_id=eleccion_id)
+    return respuesta_papeleta(request, *guardado)
+
+
+@require_safe
+async def mesas_por_recinto(request, recinto_id, eleccion_id):
+    # MesaViewSet.get_mesas_por_recinto_y_eleccion
+    filas = Mesa.objects.filter(recinto_id=recinto_id, eleccion_id=eleccion_id).values_list(*COLUMNAS_MESA)
+    return respuesta_json([dict(zip(CAMPOS_MESA, fila)) async for fila in filas])
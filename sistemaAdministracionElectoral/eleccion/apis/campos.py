@@ -0,0 +1,126 @@
+"""
+Campos a pedido en las lecturas de los serializers de eleccion.
+
+  ?fields=id,nombre      solo esos campos en la respuesta
+  ?expand=seccion        anida la relacion; si no se pide sale solo su id
+  ?expand=cargo.seccion  tambien relaciones de relaciones (implica cargo)
+
+El viewset arma la consulta con optimizar(): only() con las columnas que se
+van a leer y select_related / prefetch solo de lo que se anida.
+"""
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _valores(request, param):
+    valor = request.query_params.get(param) if request is not None else None
+    if not valor:
+        return None
+    return {v.strip() for v in valor.split(',') if v.strip()}
+
+
+def _expansiones(request):
+    # 'cargo.seccion' tambien expande 'cargo'
+    expandir = set()
+    for ruta in _valores(request, 'expand') or ():
+        partes = ruta.split('.')
+        expandir.update('.'.join(partes[:i]) for i in range(1, len(partes) + 1))
+    return expandir
+
+
+def _debajo_de(expandir, nombre):
+    prefijo = nombre + '.'
+    return {e[len(prefijo):] for e in expandir if e.startswith(prefijo)}
+
+
+class CamposDinamicosMixin:
+    # campo -> serializer que se usa con ?expand=<campo>; sin expandir sale el id
+    expandibles = {}
+    # campos calculados -> columnas del modelo que necesitan, para only()
+    columnas = {}
+
+    def __init__(self, *args, campos=None, expandir=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._campos = campos
+        self._expandir = expandir
+
+    def pedidos(self):
+        # (campos, expandir); el serializer raiz los lee de la request y los
+        # anidados los reciben de su padre
+        if self._expandir is not None:
+            return self._campos, self._expandir
+        request = self.context.get('request')
+        expandir = _expansiones(request)
+        desconocidos = {e for e in expandir if '.' not in e} - set(self.expandibles)
+        if desconocidos:
+            raise ValidationError({'expand': f'No se puede expandir: {", ".join(sorted(desconocidos))}'})
+        # las escrituras validan siempre todos los campos
+        campos = _valores(request, 'fields') if request is not None and request.method in SAFE_METHODS else None
+        self._campos, self._expandir = campos, expandir
+        return campos, expandir
+
+    def get_fields(self):
+        fields = super().get_fields()
+        campos, expandir = self.pedidos()
+        for nombre, serializer in self.expandibles.items():
+            if nombre not in expandir:
+                fields[nombre] = serializers.PrimaryKeyRelatedField(read_only=True)
+            elif issubclass(serializer, CamposDinamicosMixin):
+                fields[nombre] = serializer(read_only=True, expandir=_debajo_de(expandir, nombre))
+            else:
+                fields[nombre] = serializer(read_only=True)
+        if campos is not None:
+            for nombre in list(fields):
+                if nombre not in campos and not fields[nombre].write_only:
+                    del fields[nombre]
+        return fields
+
+    def prefetches(self, ruta=''):
+        # prefetches propios del serializer (p. ej. los vertices de una seccion)
+        return []
+
+    def relaciones(self, ruta=''):
+        # (select_related, prefetch_related) para los campos que van a salir
+        joins, prefetches = [], list(self.prefetches(ruta))
+        for campo in self.fields.values():
+            if campo.write_only:
+                continue
+            if isinstance(campo, serializers.BaseSerializer):
+                joins.append(ruta + campo.source)
+                if isinstance(campo, CamposDinamicosMixin):
+                    anidados, extra = campo.relaciones(ruta + campo.source + '__')
+                    joins += anidados
+                    prefetches += extra
+            elif isinstance(campo, serializers.ManyRelatedField):
+                prefetches.append(ruta + campo.source)
+        return joins, prefetches
+
+    def optimizar(self, queryset):
+        joins, prefetches = self.relaciones()
+        if joins:
+            # sin argumentos select_related() seguiria todas las FK
+            queryset = queryset.select_related(*joins)
+        queryset = queryset.prefetch_related(*prefetches)
+        campos, _ = self.pedidos()
+        if campos is None:
+            return queryset
+        concretos = {f.name for f in queryset.model._meta.concrete_fields}
+        columnas = {queryset.model._meta.pk.name}
+        for nombre, campo in self.fields.items():
+            if campo.write_only:
+                continue
+            if campo.source in concretos:
+                columnas.add(campo.source)
+            columnas.update(self.columnas.get(nombre, ()))
+        return queryset.only(*columnas)
+
+
+class ConsultaPorCamposMixin:
+    """
+    Para viewsets cuyo serializer usa CamposDinamicosMixin: la consulta
+    sigue a ?fields= y ?expand=.
+    """
+
+    def get_queryset(self):
+        return self.get_serializer().optimizar(super().get_queryset())
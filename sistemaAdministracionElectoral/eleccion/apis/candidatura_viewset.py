@@ -3,15 +3,34 @@ from rest_framework.permissions import IsAuthenticated, DjangoModelPermissions
 from rest_framework.response import Response
 from rest_framework.decorators import action
 from rest_framework import serializers
+from rest_framework.settings import api_settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
 from eleccion.models import Candidatura, Cargo, Eleccion
 from eleccion.apis.cargo_viewset import CargoSerializer
 from eleccion.apis.eleccion_viewset import EleccionSerializer
+from eleccion.apis.seccion_viewset import nivel_de_request
+from eleccion.apis.campos import CamposDinamicosMixin, ConsultaPorCamposMixin
+from eleccion.services.papeleta import papeleta_renderizada
 
 
-class CandidaturaSerializer(serializers.ModelSerializer):
-    # Para mostrar datos anidados de lectura
-    cargo = CargoSerializer(read_only=True)
-    eleccion = EleccionSerializer(read_only=True)
+def variante_papeleta(nivel, parametros):
+    return f"{nivel}:{parametros.get('fields')}:{parametros.get('expand')}"
+
+
+def respuesta_papeleta(request, contenido, etag):
+    # If-None-Match se compara etiqueta por etiqueta, como en condicional.py
+    respuesta = get_conditional_response(request, etag=etag)
+    if respuesta is None:
+        respuesta = HttpResponse(contenido, content_type='application/json', status=status.HTTP_200_OK)
+    respuesta['ETag'] = etag
+    respuesta['Cache-Control'] = 'no-cache'
+    return respuesta
+
+
+class CandidaturaSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    # Se leen como id; anidados con ?expand=cargo,eleccion (o cargo.seccion)
+    expandibles = {'cargo': CargoSerializer, 'eleccion': EleccionSerializer}
 
     # Para permitir elegirlos en el form
     cargo_id = serializers.PrimaryKeyRelatedField(
@@ -31,20 +50,27 @@ class CandidaturaSerializer(serializers.ModelSerializer):
             'sigla',
             'candidato',
             'color',
-            'cargo',  # nested read-only
+            'cargo',  # id, o anidado con ?expand=cargo
             'cargo_id',  # select para escritura
-            'eleccion',  # nested read-only
+            'eleccion',  # id, o anidado con ?expand=eleccion
             'eleccion_id'  # select para escritura
         )
 
 
-class CandidaturaViewSet(viewsets.ModelViewSet):
+class CandidaturaViewSet(ConsultaPorCamposMixin, viewsets.ModelViewSet):
     # permission_classes = [IsAuthenticated, DjangoModelPermissions]
     queryset = Candidatura.objects.all()
     serializer_class = CandidaturaSerializer
 
     @action(detail=False, methods=['get'], url_path='cargo/(?P<cargo_id>[^/.]+)/eleccion/(?P<eleccion_id>[^/.]+)')
     def get_papeleta_cargo_eleccion(self, request, cargo_id=None, eleccion_id=None):
-        candidaturas = self.queryset.filter(cargo_id=cargo_id, eleccion_id=eleccion_id)
-        serializer = self.get_serializer(candidaturas, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+        # la papeleta no cambia durante la eleccion: se sirve ya renderizada
+        # desde cache y las maquinas pueden revalidar con If-None-Match
+        def renderizar():
+            candidaturas = self.get_queryset().filter(cargo_id=cargo_id, eleccion_id=eleccion_id)
+            serializer = self.get_serializer(candidaturas, many=True)
+            return api_settings.DEFAULT_RENDERER_CLASSES[0]().render(serializer.data)
+
+        variante = variante_papeleta(nivel_de_request(request), request.query_params)
+        contenido, etag = papeleta_renderizada(cargo_id, eleccion_id, renderizar, variante=variante)
+        return respuesta_papeleta(request, contenido, etag)
@@ -1,12 +1,14 @@
 from rest_framework import serializers, viewsets
 from rest_framework.permissions import IsAuthenticated, DjangoModelPermissions
 from rest_framework.response import Response
-from eleccion.models import Cargo, Seccion
+from eleccion.models import Cargo, Seccion, Punto
 from eleccion.apis import SeccionSerializer
+from eleccion.apis.campos import CamposDinamicosMixin, ConsultaPorCamposMixin
+from eleccion.apis.condicional import RespuestaCondicionalMixin
 
-class CargoSerializer(serializers.ModelSerializer):
-    # lecturas salen anidadas
-    seccion = SeccionSerializer(read_only=True)
+class CargoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    # lecturas: el id de la seccion, o la seccion anidada con ?expand=seccion
+    expandibles = {'seccion': SeccionSerializer}
     # escribe el id en la FK
     seccion_id = serializers.PrimaryKeyRelatedField(
         queryset=Seccion.objects.all(),
@@ -17,7 +19,8 @@ class CargoSerializer(serializers.ModelSerializer):
         model = Cargo
         fields = '__all__'
 
-class CargoViewSet(viewsets.ModelViewSet):
+class CargoViewSet(RespuestaCondicionalMixin, ConsultaPorCamposMixin, viewsets.ModelViewSet):
     # permission_classes = [IsAuthenticated, DjangoModelPermissions]
     queryset = Cargo.objects.all()
     serializer_class = CargoSerializer
+    modelos_version = (Cargo, Seccion, Punto)
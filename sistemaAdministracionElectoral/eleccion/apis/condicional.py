@@ -0,0 +1,43 @@
+from django.utils.cache import get_conditional_response, patch_vary_headers
+
+from eleccion.services.versiones import etag_de
+
+
+def respuesta_condicional(request, modelos, responder):
+    """
+    Responde 304 si el cliente ya tiene la version actual (If-None-Match);
+    si no, llama a responder() y le agrega el ETag. El ETag sale de las
+    versiones de `modelos` (una consulta a la tabla Version, ver versiones.py)
+    y del tipo de respuesta negociado, asi JSON y la API navegable no lo
+    comparten.
+
+    No se manda Last-Modified: tiene resolucion de segundos y dos cambios en
+    el mismo segundo darian 304 con If-Modified-Since.
+    """
+    tipo = getattr(request, 'accepted_media_type', '')
+    etag = etag_de(modelos, f'{request.get_full_path()}|{tipo}')
+    respuesta = get_conditional_response(request, etag=etag)
+    if respuesta is None:
+        respuesta = responder()
+        if respuesta.status_code != 200:
+            return respuesta
+    respuesta['ETag'] = etag
+    respuesta['Cache-Control'] = 'no-cache'
+    patch_vary_headers(respuesta, ('Accept',))
+    return respuesta
+
+
+class RespuestaCondicionalMixin:
+    """
+    list y retrieve con GET condicional. `modelos_version` son los modelos
+    de los que depende la respuesta, incluidos los que se pueden anidar.
+    """
+    modelos_version = ()
+
+    def list(self, request, *args, **kwargs):
+        listar = super().list
+        return respuesta_condicional(request, self.modelos_version, lambda: listar(request, *args, **kwargs))
+
+    def retrieve(self, request, *args, **kwargs):
+        detalle = super().retrieve
+        return respuesta_condicional(request, self.modelos_version, lambda: detalle(request, *args, **kwargs))
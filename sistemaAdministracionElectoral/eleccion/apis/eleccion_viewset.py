@@ -2,12 +2,14 @@ from rest_framework import serializers, viewsets
 from rest_framework.permissions import IsAuthenticated, DjangoModelPermissions
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from eleccion.models import Eleccion, Seccion
+from eleccion.models import Eleccion, Seccion, Punto
 from eleccion.apis import SeccionSerializer
+from eleccion.apis.campos import CamposDinamicosMixin, ConsultaPorCamposMixin
+from eleccion.apis.condicional import RespuestaCondicionalMixin
 
-class EleccionSerializer(serializers.ModelSerializer):
-    # lecturas salen anidadas
-    seccion = SeccionSerializer(read_only=True)
+class EleccionSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    # lecturas: el id de la seccion, o la seccion anidada con ?expand=seccion
+    expandibles = {'seccion': SeccionSerializer}
     # escribe el id en la FK
     seccion_id = serializers.PrimaryKeyRelatedField(
         queryset=Seccion.objects.all(),
@@ -20,8 +22,9 @@ class EleccionSerializer(serializers.ModelSerializer):
 
 
 
-class EleccionViewSet(viewsets.ModelViewSet):
+class EleccionViewSet(RespuestaCondicionalMixin, ConsultaPorCamposMixin, viewsets.ModelViewSet):
     # permission_classes = [IsAuthenticated]
     queryset = Eleccion.objects.all()
     serializer_class = EleccionSerializer
+    modelos_version = (Eleccion, Seccion, Punto)
 
@@ -1,10 +1,34 @@
-from collections import deque
-from django.db import transaction
+from array import array
+
+import numpy as np
+
+from django.db import transaction, IntegrityError
 from rest_framework import viewsets, status, serializers
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
 from eleccion.models import Mesa, Recinto, Eleccion, Votante
+from eleccion.apis.paginacion import PaginacionPorId, filtrar_por_params
+from eleccion.services import (
+    get_batch_size, repartir_en_mesas, crear_y_distribuir, asignar_por_cercania, distribuir_por_cercania,
+    plan_por_recinto, invalidar_donde_votar, rebalancear, encolar, VotantesRepetidos,
+    planificar_mesas, planificar_por_cercania, topes, resumen_plan, aplicar_plan,
+    formato_stream, leer_votantes, leer_votantes_geo, parsear_recintos,
+    VotantesEnDisco, FormatoInvalido
+)
+from eleccion.apis.trabajo_viewset import en_segundo_plano, respuesta_trabajo
+from eleccion.services.versiones import subir_version
+from eleccion.services.donde_votar import MAXIMO_ID
+
+
+def _entero(valor):
+    # int o texto con un entero -> int; cualquier otra cosa (1.5, True, None) -> None
+    if isinstance(valor, bool) or not isinstance(valor, (int, str)):
+        return None
+    try:
+        return int(valor)
+    except ValueError:
+        return None
 
 
 class MesaSerializer(serializers.ModelSerializer):
@@ -17,6 +41,16 @@ class MesaViewSet(viewsets.ModelViewSet):
     # permission_classes = [IsAuthenticated, DjangoModelPermissions]
     queryset = Mesa.objects.all()
     serializer_class = MesaSerializer
+    pagination_class = PaginacionPorId
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = filtrar_por_params(queryset, self.request.query_params, {
+                'eleccion': 'eleccion_id',
+                'recinto': 'recinto_id',
+            })
+        return queryset
 
     @action(detail=False, methods=['get'], url_path='recinto/(?P<recinto_id>[^/.]+)/eleccion/(?P<eleccion_id>[^/.]+)')
     def get_mesas_por_recinto_y_eleccion(self, request, recinto_id=None, eleccion_id=None):
@@ -42,11 +76,122 @@ class MesaViewSet(viewsets.ModelViewSet):
           "votantes": [<votante_id1>, <votante_id2>, ...]
         }
 
+        Modo streaming: si el Content-Type es NDJSON, CSV o binario
+        (ver eleccion.services.ingesta) el cuerpo es solo la lista de votantes
+        y el resto va en la query:
+          ?eleccion=<eleccion_id>&recintos=<recinto_id>:<n_mesas>,...
+
+        Con ?segundo_plano=1 se encola un trabajo y se responde 202 con su
+        url en /eleccion/jobs/<id>/ (lo ejecuta manage.py procesar_trabajos).
+
         """
-        eleccion_id = request.data.get('eleccion')
-        recintos = request.data.get('recintos', [])
-        votantes = request.data.get('votantes', [])
+        batch_size, error = self._batch_size(request)
+        if error:
+            return error
+        formato = formato_stream(request)
+        if formato:
+            eleccion_id = request.query_params.get('eleccion')
+            try:
+                recintos = parsear_recintos(request.query_params.get('recintos', ''))
+            except ValueError:
+                return Response(
+                    {"error": "recintos debe tener la forma <recinto>:<mesas>,..."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            votantes, error = self._leer_votantes_stream(request, formato)
+            if error:
+                return error
+        else:
+            eleccion_id = request.data.get('eleccion')
+            recintos = request.data.get('recintos', [])
+            votantes = request.data.get('votantes', [])
+
+        try:
+            return self._crear_y_distribuir(request, eleccion_id, recintos, votantes, batch_size)
+        finally:
+            if formato:
+                votantes.close()
+
+    def _batch_size(self, request):
+        # ?batch_size=<n> -> (n o None, None) o (None, respuesta 400)
+        valor = request.query_params.get('batch_size')
+        if valor is None:
+            return None, None
+        try:
+            return get_batch_size(valor), None
+        except ValueError as e:
+            return None, Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    def _eleccion(self, eleccion_id):
+        # (eleccion, None) o (None, 400 si el id no es un numero / 404 si no existe)
+        try:
+            return Eleccion.objects.get(pk=int(eleccion_id)), None
+        except (TypeError, ValueError):
+            return None, Response({"error": "'eleccion' debe ser un id numérico."},
+                                  status=status.HTTP_400_BAD_REQUEST)
+        except Eleccion.DoesNotExist:
+            return None, Response({"error": "Elección no encontrada."},
+                                  status=status.HTTP_404_NOT_FOUND)
 
+    def _plan_recintos(self, recintos):
+        """
+        [{'recinto': <id>, 'mesas': <n>}, ...] -> ([(recinto_id, n), ...], None),
+        o (None, 400 con la posicion de la primera entrada invalida / 404 si
+        un recinto no existe). Valida todo antes de escribir nada.
+        """
+        if not isinstance(recintos, list):
+            return None, Response({"error": "'recintos' debe ser una lista."},
+                                  status=status.HTTP_400_BAD_REQUEST)
+        plan = []
+        for i, r in enumerate(recintos):
+            recinto_id = _entero(r.get('recinto')) if isinstance(r, dict) else None
+            mesas = _entero(r.get('mesas')) if isinstance(r, dict) else None
+            if recinto_id is None or mesas is None or not 0 < recinto_id <= MAXIMO_ID or mesas < 1:
+                return None, Response(
+                    {"error": f"recintos[{i}] debe ser {{'recinto': <id>, 'mesas': <entero mayor a 0>}}."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            plan.append((recinto_id, mesas))
+
+        # todos los recintos en una sola consulta
+        existentes = Recinto.objects.in_bulk([recinto_id for recinto_id, _ in plan])
+        for i, (recinto_id, _) in enumerate(plan):
+            if recinto_id not in existentes:
+                return None, Response(
+                    {"error": f"recintos[{i}]: Recinto {recinto_id} no existe."},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+        return plan, None
+
+    def _leer_votantes_stream(self, request, formato):
+        try:
+            ancho = int(request.query_params.get('ancho', 4))
+            return VotantesEnDisco(leer_votantes(request.stream, formato, ancho)), None
+        except (FormatoInvalido, ValueError) as e:
+            return None, Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+    def _encolar(self, request, tipo, parametros, votantes):
+        # 202 con el trabajo; los repetidos se rechazan aca porque el trabajo
+        # confirma cada paso por separado y no podria deshacer lo ya escrito
+        try:
+            trabajo = encolar(tipo, parametros, votantes=votantes, unicos=True)
+        except VotantesRepetidos as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except (TypeError, ValueError):
+            return Response({"error": "Los votantes deben ser ids numéricos."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return respuesta_trabajo(request, trabajo)
+
+    def _encolar_por_recinto(self, request, eleccion, recintos, mesas_por_recinto, asignacion, ids):
+        # la asignacion ya esta hecha en el request; el trabajo escribe mesas y votantes
+        try:
+            filas, orden, _ = plan_por_recinto([r['recinto'] for r in recintos], mesas_por_recinto, asignacion)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        ids = np.asarray(ids, dtype=np.int64)[orden]
+        return self._encolar(request, 'crear_distribuir', {'eleccion': eleccion.pk, 'mesas': filas}, ids)
+
+    def _crear_y_distribuir(self, request, eleccion_id, recintos, votantes, batch_size):
         # Validaciones básicas
         if not eleccion_id or not recintos or not votantes:
             return Response(
@@ -54,84 +199,327 @@ class MesaViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            eleccion = Eleccion.objects.get(pk=eleccion_id)
-        except Eleccion.DoesNotExist:
-            return Response({"error": "Elección no encontrada."},
-                            status=status.HTTP_404_NOT_FOUND)
+        eleccion, error = self._eleccion(eleccion_id)
+        if error:
+            return error
 
-        total_votantes = len(votantes)
-        total_mesas = sum(r.get('mesas', 0) for r in recintos)
+        plan, error = self._plan_recintos(recintos)
+        if error:
+            return error
 
-        if total_mesas < 1:
-            return Response({"error": "Debe haber al menos una mesa."},
-                            status=status.HTTP_400_BAD_REQUEST)
+        total_votantes = len(votantes)
+        total_mesas = sum(mesas for _, mesas in plan)
         if total_mesas > total_votantes:
             return Response(
                 {"error": "Más mesas que votantes. Ajusta los datos."},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # cálculo equitativo
-        base = total_votantes // total_mesas
-        extra = total_votantes % total_mesas
-        # lista de tamaños: primero `extra` mesas tienen base+1, el resto base
-        tamanos = [base + (1 if i < extra else 0) for i in range(total_mesas)]
-
-        # cola de votantes para asignar
-        cola = deque(votantes)
-
-        with transaction.atomic():
-            # limpiar datos pasados
-            Mesa.objects.filter(eleccion=eleccion).delete()
-            Votante.objects.filter(eleccion=eleccion).delete()
-
-            mesas_creadas = []
-            idx = 0
-            # 1) crear mesas con su cantidad
-            for r in recintos:
-                recinto_id = r['recinto']
-                num_mesas = r['mesas']
-                try:
-                    recinto = Recinto.objects.get(pk=recinto_id)
-                except Recinto.DoesNotExist:
-                    transaction.set_rollback(True)
-                    return Response(
-                        {"error": f"Recinto {recinto_id} no existe."},
-                        status=status.HTTP_404_NOT_FOUND
-                    )
-                for num in range(1, num_mesas + 1):
-                    mesa = Mesa.objects.create(
-                        eleccion=eleccion,
-                        recinto=recinto,
-                        numero=num,
-                        cantidad=tamanos[idx]
-                    )
-                    mesas_creadas.append(mesa)
-                    idx += 1
-
-            # 2) repartir votantes
-            for mesa in mesas_creadas:
-                for _ in range(mesa.cantidad):
-                    vid = cola.popleft()
-                    Votante.objects.create(
-                        eleccion=eleccion,
-                        votante_id=vid,
-                        mesa=mesa
-                    )
-
-            # 3) asignar jefe de mesa (primer votante)
-            for mesa in mesas_creadas:
-                primer = mesa.votantes.first()
-                if primer:
-                    # si quieres el ID del votante (persona), usa primer.votante_id
-                    mesa.jefe_id = primer.votante_id
-                    mesa.save(update_fields=['jefe_id'])
-
-        # devolver las mesas creadas
+        if en_segundo_plano(request):
+            return self._encolar(request, 'crear_distribuir', {'eleccion': eleccion.pk, 'recintos': plan}, votantes)
+
+        try:
+            crear_y_distribuir(
+                eleccion,
+                plan,
+                votantes,
+                total_votantes=total_votantes,
+                batch_size=batch_size
+            )
+        except IntegrityError:
+            return Response(
+                {"error": "Hay votantes repetidos en la lista."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # devolver las mesas creadas (ya con su jefe)
+        mesas_creadas = Mesa.objects.filter(eleccion=eleccion).order_by('pk')
         data = MesaSerializer(mesas_creadas, many=True).data
         return Response(data, status=status.HTTP_201_CREATED)
 
+    @action(detail=False, methods=['post'], url_path='distribuir-cercania')
+    def distribuir_por_cercania(self, request):
+        """
+        Como crear-distribuir, pero cada votante va al recinto mas cercano que
+        todavia tenga lugar y despues se reparte entre las mesas de ese recinto.
+        Payload esperado:
+        {
+          "eleccion": <eleccion_id>,
+          "recintos": [
+            { "recinto": <recinto_id>, "mesas": <n_mesas>, "capacidad": <opcional> },
+            ...
+          ],
+          "votantes_por_mesa": <opcional>,
+          "votantes": [{ "votante_id": <id>, "latitud": <lat>, "longitud": <lng> }, ...]
+        }
+        En modo streaming (NDJSON o CSV votante_id,latitud,longitud) el resto
+        va en la query: ?eleccion=<id>&recintos=<recinto>:<mesas>[:<capacidad>],...
+        Con ?segundo_plano=1 la asignacion se calcula aca y la escritura se
+        encola; responde 202 con el trabajo.
+        """
+        batch_size, error = self._batch_size(request)
+        if error:
+            return error
+        formato = formato_stream(request)
+        try:
+            if formato:
+                datos = request.query_params
+                recintos = parsear_recintos(datos.get('recintos', ''))
+                votantes = leer_votantes_geo(request.stream, formato)
+            else:
+                datos = request.data
+                recintos = datos.get('recintos', [])
+                votantes = (
+                    (v['votante_id'], v['latitud'], v['longitud'])
+                    for v in datos.get('votantes', [])
+                )
+            ids, latitudes, longitudes = self._coordenadas(votantes)
+            votantes_por_mesa = int(datos.get('votantes_por_mesa') or 0)
+            recintos = [dict(
+                r, recinto=int(r['recinto']), mesas=int(r['mesas']), capacidad=int(r.get('capacidad') or 0)
+            ) for r in recintos]
+        except (FormatoInvalido, ValueError, TypeError, KeyError) as e:
+            return Response({"error": f"Datos inválidos: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        for r in recintos:
+            if r['mesas'] < 1 or r['capacidad'] < 0:
+                return Response(
+                    {"error": f"Recinto {r['recinto']}: 'mesas' debe ser al menos 1 y 'capacidad' no puede ser negativa."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        if votantes_por_mesa < 0:
+            return Response({"error": "'votantes_por_mesa' no puede ser negativo."},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        eleccion_id = datos.get('eleccion')
+        if not eleccion_id or not recintos or not ids:
+            return Response(
+                {"error": "Debe enviar 'eleccion', 'recintos' y 'votantes'."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        eleccion, error = self._eleccion(eleccion_id)
+        if error:
+            return error
+
+        error = self._agregar_coordenadas(recintos)
+        if error:
+            return error
+
+        if en_segundo_plano(request):
+            try:
+                asignacion = asignar_por_cercania(recintos, latitudes, longitudes, votantes_por_mesa)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+            return self._encolar_por_recinto(
+                request, eleccion, recintos, [r['mesas'] for r in recintos], asignacion, ids
+            )
+        try:
+            mesas, por_recinto = distribuir_por_cercania(
+                eleccion, recintos, ids, latitudes, longitudes,
+                votantes_por_mesa=votantes_por_mesa,
+                batch_size=batch_size
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except IntegrityError:
+            return Response(
+                {"error": "Hay votantes repetidos en la lista."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response({
+            "votantes": len(ids),
+            "mesas": len(mesas),
+            "votantes_por_recinto": por_recinto,
+        }, status=status.HTTP_201_CREATED)
+
+    def _coordenadas(self, votantes):
+        # (votante_id, latitud, longitud) -> tres arreglos compactos
+        ids, latitudes, longitudes = array('q'), array('d'), array('d')
+        for vid, lat, lng in votantes:
+            lat, lng = float(lat), float(lng)
+            # tambien descarta nan e inf, que romperian la grilla
+            if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+                raise ValueError(f'coordenadas fuera de rango en el votante {vid}')
+            ids.append(int(vid))
+            latitudes.append(lat)
+            longitudes.append(lng)
+        return ids, latitudes, longitudes
+
+    def _agregar_coordenadas(self, recintos):
+        # completa latitud/longitud de cada recinto en una consulta, o 404
+        coordenadas = Recinto.objects.in_bulk([r['recinto'] for r in recintos])
+        for r in recintos:
+            recinto = coordenadas.get(r['recinto'])
+            if recinto is None:
+                return Response(
+                    {"error": f"Recinto {r['recinto']} no existe."},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            r['latitud'], r['longitud'] = recinto.latitud, recinto.longitud
+        return None
+
+    @action(detail=False, methods=['post'], url_path='planificar')
+    def planificar(self, request):
+        """
+        Calcula cuantas mesas necesita cada recinto segun los votantes que le
+        tocan, con un maximo de votantes por mesa y topes por recinto.
+        Por defecto solo devuelve el plan (dry-run); con "aplicar": true
+        ademas crea las mesas y reparte los votantes.
+        Payload esperado:
+        {
+          "eleccion": <eleccion_id>,
+          "max_por_mesa": <n>,
+          "recintos": [
+            { "recinto": <recinto_id>, "capacidad": <opcional>, "mesas_max": <opcional>,
+              "votantes": <opcional, cantidad ya conocida> },
+            ...
+          ],
+          "votantes": [{ "votante_id": <id>, "latitud": <lat>, "longitud": <lng> }, ...],
+          "aplicar": false
+        }
+        Si vienen los votantes con coordenadas cada uno va al recinto mas
+        cercano con lugar; si no, se planifica con la cantidad de cada
+        recinto (y solo se puede hacer dry-run).
+        En modo streaming (NDJSON o CSV votante_id,latitud,longitud) el resto
+        va en la query: ?eleccion=<id>&max_por_mesa=<n>&aplicar=1
+        &recintos=<recinto>:<mesas_max>[:<capacidad>],...
+        Al aplicar, con ?segundo_plano=1 la escritura se encola y responde 202.
+        """
+        batch_size, error = self._batch_size(request)
+        if error:
+            return error
+        formato = formato_stream(request)
+        try:
+            if formato:
+                datos = request.query_params
+                recintos = parsear_recintos(datos.get('recintos', ''))
+                votantes = leer_votantes_geo(request.stream, formato)
+            else:
+                datos = request.data
+                recintos = datos.get('recintos', [])
+                votantes = (
+                    (v['votante_id'], v['latitud'], v['longitud'])
+                    for v in datos.get('votantes', [])
+                )
+            ids, latitudes, longitudes = self._coordenadas(votantes)
+            max_por_mesa = int(datos.get('max_por_mesa') or 0)
+            recintos = [{
+                'recinto': int(r['recinto']),
+                'mesas_max': int(r.get('mesas_max', r.get('mesas')) or 0),
+                'capacidad': int(r.get('capacidad') or 0),
+                'votantes': None if r.get('votantes') is None else int(r['votantes']),
+            } for r in recintos]
+        except (FormatoInvalido, ValueError, TypeError, KeyError) as e:
+            return Response({"error": f"Datos inválidos: {e}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        if max_por_mesa < 1 or not recintos:
+            return Response(
+                {"error": "Debe enviar 'max_por_mesa' y 'recintos'."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        error = self._agregar_coordenadas(recintos)
+        if error:
+            return error
+
+        asignacion = None
+        if ids:
+            try:
+                plan, asignacion = planificar_por_cercania(recintos, latitudes, longitudes, max_por_mesa)
+            except ValueError as e:
+                return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        elif all(r['votantes'] is not None for r in recintos):
+            plan = planificar_mesas([r['votantes'] for r in recintos], max_por_mesa, topes(recintos, max_por_mesa))
+        else:
+            return Response(
+                {"error": "Debe enviar 'votantes' o la cantidad de votantes de cada recinto."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        respuesta = resumen_plan(recintos, plan)
+        if str(datos.get('aplicar', '')).lower() not in ('1', 'true', 'si'):
+            respuesta['aplicado'] = False
+            return Response(respuesta, status=status.HTTP_200_OK)
+
+        if asignacion is None:
+            return Response(
+                {"error": "Para aplicar el plan hacen falta los votantes con coordenadas."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            eleccion = Eleccion.objects.get(pk=datos.get('eleccion'))
+        except (Eleccion.DoesNotExist, ValueError, TypeError):
+            return Response({"error": "Elección no encontrada."},
+                            status=status.HTTP_404_NOT_FOUND)
+        if en_segundo_plano(request):
+            return self._encolar_por_recinto(request, eleccion, recintos, plan['mesas'].tolist(), asignacion, ids)
+        try:
+            aplicar_plan(eleccion, recintos, plan, asignacion, ids, batch_size=batch_size)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except IntegrityError:
+            return Response(
+                {"error": "Hay votantes repetidos en la lista."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        respuesta['aplicado'] = True
+        return Response(respuesta, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'], url_path='rebalancear')
+    def rebalancear(self, request):
+        """
+        Aplica altas y bajas sobre una eleccion ya distribuida moviendo la
+        menor cantidad de votantes posible, sin recrear las mesas.
+        Payload esperado:
+        {
+          "eleccion": <eleccion_id>,
+          "altas": [<votante_id>, ...],
+          "bajas": [<votante_id>, ...]
+        }
+        Devuelve cuantas filas se tocaron de cada tipo, o 202 con el trabajo
+        si se pide ?segundo_plano=1.
+        """
+        batch_size, error = self._batch_size(request)
+        if error:
+            return error
+        eleccion_id = request.data.get('eleccion')
+        altas = request.data.get('altas', [])
+        bajas = request.data.get('bajas', [])
+        if not eleccion_id or not (altas or bajas):
+            return Response(
+                {"error": "Debe enviar 'eleccion' y 'altas' o 'bajas'."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        eleccion, error = self._eleccion(eleccion_id)
+        if error:
+            return error
+        if en_segundo_plano(request):
+            trabajo = encolar('rebalancear', {'eleccion': eleccion.pk, 'altas': altas, 'bajas': bajas})
+            return respuesta_trabajo(request, trabajo)
+        try:
+            resumen = rebalancear(eleccion, altas, bajas, batch_size=batch_size)
+        except (ValueError, TypeError) as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(resumen, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='reiniciar')
+    def reiniciar(self, request):
+        """
+        Borra las mesas y votantes de una eleccion. Siempre corre como
+        trabajo en segundo plano (de a chunks), responde 202.
+        Payload esperado: { "eleccion": <eleccion_id> }
+        """
+        try:
+            eleccion_id = int(request.data.get('eleccion'))
+        except (TypeError, ValueError):
+            return Response({"error": "Debe enviar 'eleccion'."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not Eleccion.objects.filter(pk=eleccion_id).exists():
+            return Response({"error": "Elección no encontrada."},
+                            status=status.HTTP_404_NOT_FOUND)
+        trabajo = encolar('reiniciar_eleccion', {'eleccion': eleccion_id})
+        return respuesta_trabajo(request, trabajo)
+
     @action(detail=False, methods=['post'], url_path='crear-mesas')
     def crear_mesas(self, request):
         # se espera un payload con recinto_id y cantidad_mesas
@@ -266,6 +654,7 @@ class MesaViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
         mesas.update(eleccion=eleccion)
+        subir_version(Mesa)
         return Response(
             {"message": "Mesas asignadas a la elección correctamente."},
             status=status.HTTP_200_OK
@@ -273,14 +662,37 @@ class MesaViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=['post'], url_path='distribuir')
     def ditribuir(self, request):
-        # payload esperado: seccionId, votantes
-        seccion_id = request.data.get('seccionId')
-        habilitados = request.data.get('votantes', [])
+        # payload esperado: seccionId, votantes y opcionalmente eleccionId
+        # (sin eleccionId se usan las mesas de la seccion sin eleccion)
+        # en modo streaming (NDJSON, CSV o binario) los votantes vienen en el
+        # cuerpo y el seccionId/eleccionId en la query
+        # con ?segundo_plano=1 se encola y responde 202 con el trabajo
+        formato = formato_stream(request)
+        if formato:
+            datos = request.query_params
+            habilitados, error = self._leer_votantes_stream(request, formato)
+            if error:
+                return error
+        else:
+            datos = request.data
+            habilitados = datos.get('votantes', [])
+        try:
+            return self._distribuir(request, datos.get('seccionId'), datos.get('eleccionId'), habilitados)
+        finally:
+            if formato:
+                habilitados.close()
+
+    def _distribuir(self, request, seccion_id, eleccion_id, habilitados):
         if not seccion_id or not habilitados:
             return Response(
                 {"error": "Debe enviar 'seccionId' y 'votantes'."},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        try:
+            ids = habilitados.arreglo() if hasattr(habilitados, 'arreglo') else np.asarray(habilitados, dtype=np.int64)
+        except (TypeError, ValueError):
+            return Response({"error": "Los votantes deben ser ids numéricos."},
+                            status=status.HTTP_400_BAD_REQUEST)
         try:
             recintos = Recinto.objects.filter(seccion_id=seccion_id)
             if not recintos.exists():
@@ -288,37 +700,23 @@ class MesaViewSet(viewsets.ModelViewSet):
                     {"error": "No se encontraron recintos para la sección."},
                     status=status.HTTP_404_NOT_FOUND
                 )
-            mesas = Mesa.objects.filter(recinto__in=recintos, eleccion=None)
-            if not mesas.exists():
+            mesas = Mesa.objects.filter(recinto__in=recintos, eleccion_id=eleccion_id or None).order_by('pk')
+            mesas = list(mesas.only('id', 'eleccion_id', 'cantidad'))
+            if not mesas:
                 return Response(
                     {"error": "No hay mesas disponibles para distribuir votantes."},
                     status=status.HTTP_404_NOT_FOUND
                 )
-            total_mesas = mesas.count()
-            total_votantes = len(habilitados)
-            if total_mesas < 1 or total_votantes < 1:
-                return Response(
-                    {"error": "Debe haber al menos una mesa y un votante."},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            base = total_votantes // total_mesas
-            extra = total_votantes % total_mesas
-            tamanos = [base + (1 if i < extra else 0) for i in range(total_mesas)]
-            cola = deque(habilitados)
+            if en_segundo_plano(request):
+                return self._encolar(request, 'distribuir', {
+                    'seccion': int(seccion_id), 'eleccion': mesas[0].eleccion_id,
+                }, ids)
             with transaction.atomic():
                 # limpiar datos pasados
                 Votante.objects.filter(mesa__in=mesas).delete()
-                for mesa, cantidad in zip(mesas, tamanos):
-                    mesa.cantidad = cantidad
-                    mesa.save(update_fields=['cantidad'])
-                    for _ in range(cantidad):
-                        if cola:
-                            vid = cola.popleft()  # obtiene un ID del listado de habilitados
-                            Votante.objects.create(
-                                eleccion=mesa.eleccion,  # se asignará después
-                                votante_id=vid,  # aquí se guarda el ID que viene del otro backend
-                                mesa=mesa
-                            )
+                # tamanos y mesa de cada votante como arreglos, escritura en lote
+                repartir_en_mesas(mesas, ids)
+                transaction.on_commit(lambda: invalidar_donde_votar(*{m.eleccion_id for m in mesas}))
                 # return no asignar jefe de mesa
                 return Response(
                     {"message": "Votantes distribuidos correctamente."},
@@ -328,4 +726,4 @@ class MesaViewSet(viewsets.ModelViewSet):
             return Response(
                 {"error": f"Error al distribuir votantes: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
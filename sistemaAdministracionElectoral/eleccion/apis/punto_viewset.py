@@ -1,12 +1,41 @@
 from rest_framework import serializers, viewsets
 from eleccion.models import Punto
+from eleccion.services.poligonos import invalidar_indices
+from eleccion.services.papeleta import invalidar_papeletas
+from eleccion.services.versiones import subir_version
+from eleccion.services.simplificacion import marcar_seccion
 
 class PuntoSerializer(serializers.ModelSerializer):
     class Meta:
         model = Punto
         fields = '__all__'
 
+    def validate_seccion(self, seccion):
+        # los vertices de una seccion empaquetada viven en Seccion.poligono,
+        # una fila de Punto suelta no se leeria nunca
+        if seccion.poligono is not None:
+            raise serializers.ValidationError(
+                'La sección tiene el polígono empaquetado; se reemplaza entero con '
+                'POST /eleccion/secciones/importar-geojson/ (por nombre).'
+            )
+        return seccion
+
 class PuntoViewSet(viewsets.ModelViewSet):
     # permission_classes = [IsAuthenticated]
     queryset = Punto.objects.all()
     serializer_class = PuntoSerializer
+
+    def perform_update(self, serializer):
+        anterior = serializer.instance.seccion_id
+        super().perform_update(serializer)
+        # el post_save marca la seccion nueva; si el punto se movio, tambien la de antes
+        if serializer.instance.seccion_id != anterior:
+            marcar_seccion(anterior)
+
+    def perform_destroy(self, instance):
+        seccion_id = instance.seccion_id
+        super().perform_destroy(instance)
+        marcar_seccion(seccion_id)
+        invalidar_indices()
+        invalidar_papeletas()
+        subir_version(Punto)
@@ -1,13 +1,19 @@
-from rest_framework import serializers, viewsets
+from django.http import StreamingHttpResponse
+from rest_framework import serializers, viewsets, status
 from rest_framework.permissions import IsAuthenticated, DjangoModelPermissions
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from eleccion.models import Recinto, Seccion
+from eleccion.models import Recinto, Seccion, Punto, Mesa
 from eleccion.apis import SeccionSerializer
+from eleccion.apis.campos import CamposDinamicosMixin, ConsultaPorCamposMixin
+from eleccion.apis.condicional import RespuestaCondicionalMixin, respuesta_condicional
+from eleccion.apis.paginacion import filtrar_por_params
+from eleccion.services.ingesta import FormatoInvalido
+from eleccion.services.geojson import leer_features, es_secuencia, importar_recintos, exportar_recintos
 
-class RecintoSerializer(serializers.ModelSerializer):
-    # lecturas salen anidadas
-    seccion = SeccionSerializer(read_only=True)
+class RecintoSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    # lecturas: el id de la seccion, o la seccion anidada con ?expand=seccion
+    expandibles = {'seccion': SeccionSerializer}
     # escribe el id en la FK
     seccion_id = serializers.PrimaryKeyRelatedField(
         queryset=Seccion.objects.all(),
@@ -23,21 +29,46 @@ class RecintoSerializer(serializers.ModelSerializer):
 
 
 
-class RecintoViewSet(viewsets.ModelViewSet):
+class RecintoViewSet(RespuestaCondicionalMixin, ConsultaPorCamposMixin, viewsets.ModelViewSet):
     # permission_classes = [IsAuthenticated, DjangoModelPermissions]
     queryset = Recinto.objects.all()
     serializer_class = RecintoSerializer
+    modelos_version = (Recinto, Seccion, Punto, Mesa)
 
     @action(detail=False, methods=['get'], url_path='seccion/(?P<seccion_id>[^/.]+)')
     # Esta es la lista usada para mostrar los recintos que quieres anadir a una eleccion
 
     def get_recintos_por_seccion(self, request, seccion_id=None):
-        recintos = Recinto.objects.filter(seccion_id=seccion_id)
-        serializer = self.get_serializer(recintos, many=True)
-        return Response(serializer.data)
+        def responder():
+            recintos = self.get_queryset().filter(seccion_id=seccion_id)
+            serializer = self.get_serializer(recintos, many=True)
+            return Response(serializer.data)
+        return respuesta_condicional(request, self.modelos_version, responder)
 
     @action(detail=False, methods=['get'], url_path='eleccion/(?P<eleccion_id>[^/.]+)')
     def get_recintos_por_eleccion(self, request, eleccion_id=None):
-        recintos = Recinto.objects.filter(eleccion_id=eleccion_id)
-        serializer = self.get_serializer(recintos, many=True)
-        return Response(serializer.data)
+        def responder():
+            recintos = self.get_queryset().filter(eleccion_id=eleccion_id)
+            serializer = self.get_serializer(recintos, many=True)
+            return Response(serializer.data)
+        return respuesta_condicional(request, self.modelos_version, responder)
+
+    @action(detail=False, methods=['get'], url_path='geojson')
+    def exportar_geojson(self, request):
+        # todos los recintos (o los de ?seccion=) como FeatureCollection de Point, enviado de a pedazos
+        recintos = filtrar_por_params(Recinto.objects.all(), request.query_params, {'seccion': 'seccion_id'})
+        return StreamingHttpResponse(exportar_recintos(recintos), content_type='application/geo+json')
+
+    @action(detail=False, methods=['post'], url_path='importar-geojson')
+    def importar_geojson(self, request):
+        """
+        Crea o actualiza (por nombre) los recintos de un FeatureCollection de
+        Point con propiedades nombre y seccion (id) o seccion_nombre. Se lee
+        de a un Feature y se guarda de a lotes, como en secciones.
+        """
+        features = leer_features(request.stream, secuencia=es_secuencia(request))
+        try:
+            resumen = importar_recintos(features, lote=request.query_params.get('lote'))
+        except FormatoInvalido as e:
+            return Response({'error': str(e), **getattr(e, 'resumen', {})}, status=400)
+        return Response(resumen, status=status.HTTP_201_CREATED)
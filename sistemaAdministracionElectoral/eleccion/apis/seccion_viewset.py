@@ -2,28 +2,89 @@ from rest_framework import serializers, viewsets, status
 from rest_framework.permissions import IsAuthenticated, DjangoModelPermissions
 from rest_framework.response import Response
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
 import json
-from eleccion.models import Seccion, Punto
+from django.conf import settings
+from django.db import transaction
+from eleccion.models import Seccion, Punto, SeccionSimplificada
+from eleccion.services.poligonos import indice_secciones
+from eleccion.services.simplificacion import nivel_para, actualizar_simplificaciones
+from eleccion.services.ingesta import FormatoInvalido
+from eleccion.services.geojson import leer_features, es_secuencia, importar_secciones, exportar_secciones
+from eleccion.apis.campos import CamposDinamicosMixin, ConsultaPorCamposMixin
+from eleccion.apis.condicional import RespuestaCondicionalMixin
 
 
-class SeccionSerializer(serializers.ModelSerializer):
+def prefetch_puntos(ruta='puntos'):
+    # solo hace falta traer los Punto de las secciones que no estan empaquetadas
+    return Prefetch(
+        ruta,
+        queryset=Punto.objects.filter(seccion__poligono__isnull=True).order_by('id')
+    )
+
+
+def nivel_de_request(request):
+    # ?tolerance=<grados> o ?zoom=<nivel>, None si no se pidio simplificar
+    if request is None:
+        return None
+    try:
+        return nivel_para(
+            tolerancia=request.query_params.get('tolerance'),
+            zoom=request.query_params.get('zoom')
+        )
+    except (TypeError, ValueError, OverflowError):
+        raise ValidationError({'tolerance': 'tolerance y zoom deben ser números'})
+
+
+def prefetch_simplificada(request, ruta='simplificadas'):
+    nivel = nivel_de_request(request)
+    if nivel is None:
+        return []
+    return [Prefetch(
+        ruta,
+        queryset=SeccionSimplificada.objects.filter(tolerancia=nivel),
+        to_attr='simplificada_pedida'
+    )]
+
+
+class SeccionSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     puntos = serializers.SerializerMethodField()
+    columnas = {'puntos': ('poligono',)}
 
     class Meta:
         model  = Seccion
         fields = ('id', 'nombre','tipo', 'puntos')
 
+    def prefetches(self, ruta=''):
+        if 'puntos' not in self.fields:
+            return []
+        return [prefetch_puntos(ruta + 'puntos'), *prefetch_simplificada(self.context.get('request'), ruta + 'simplificadas')]
+
     def get_puntos(self, obj):
+        nivel = nivel_de_request(self.context.get('request'))
+        if nivel is not None:
+            if hasattr(obj, 'simplificada_pedida'):
+                simplificada = next(iter(obj.simplificada_pedida), None)
+            else:
+                simplificada = obj.simplificadas.filter(tolerancia=nivel).first()
+            if simplificada is not None:
+                return [{'latitud': lat, 'longitud': lng} for lat, lng in simplificada.get_poligono()]
+        empaquetado = obj.get_poligono()
+        if empaquetado is not None:
+            return [{'latitud': lat, 'longitud': lng} for lat, lng in empaquetado]
         return [
             {'latitud': p.latitud, 'longitud': p.longitud}
             for p in obj.puntos.all()
         ]
 
 
-class SeccionViewSet(viewsets.ModelViewSet):
+class SeccionViewSet(RespuestaCondicionalMixin, ConsultaPorCamposMixin, viewsets.ModelViewSet):
     #permission_classes = [IsAuthenticated]
     queryset = Seccion.objects.all()
     serializer_class = SeccionSerializer
+    modelos_version = (Seccion, Punto)
 
     @action(detail=False, methods=['post'], url_path='crear')
     def crear_seccion_con_puntos(self, request):
@@ -47,24 +108,97 @@ class SeccionViewSet(viewsets.ModelViewSet):
         else:
             puntos_list = puntos_raw
 
-        # Crea la sección
-        seccion = Seccion.objects.create(nombre=nombre, tipo=tipo)
-
-        # Recorre y crea cada Punto
+        # Primero se validan todas las coordenadas, asi no queda nada a medias
+        latitudes, longitudes = [], []
         for idx, punto in enumerate(puntos_list):
             lat_s = str(punto.get('latitud', '')).replace(',', '.')
             lng_s = str(punto.get('longitud', '')).replace(',', '.')
             try:
-                lat = float(lat_s)
-                lng = float(lng_s)
+                latitudes.append(float(lat_s))
+                longitudes.append(float(lng_s))
             except ValueError:
-                # si falla el parseo, borra la sección y aborta
-                seccion.delete()
                 return Response(
                     {'error': f'Coordenadas inválidas en el punto #{idx + 1}'},
                     status=400
                 )
-            Punto.objects.create(seccion=seccion, latitud=lat, longitud=lng)
+
+        with transaction.atomic():
+            seccion = Seccion(nombre=nombre, tipo=tipo)
+            if getattr(settings, 'SECCION_POLIGONO_EMPAQUETADO', True):
+                # un solo INSERT con todos los vertices en Seccion.poligono
+                seccion.set_poligono(latitudes, longitudes)
+                seccion.save()
+            else:
+                seccion.save()
+                Punto.objects.bulk_create([
+                    Punto(seccion=seccion, latitud=lat, longitud=lng)
+                    for lat, lng in zip(latitudes, longitudes)
+                ])
+                # bulk_create no dispara el post_save que arma los niveles
+                actualizar_simplificaciones(seccion, list(zip(latitudes, longitudes)))
 
         serializer = SeccionSerializer(seccion)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['post'], url_path='clasificar')
+    def clasificar_puntos(self, request):
+        """
+        Devuelve la seccion en la que cae cada coordenada (null si ninguna).
+        Payload esperado:
+        {
+          "tipo": <opcional, solo secciones de ese tipo>,
+          "puntos": [{ "latitud": <lat>, "longitud": <lng> }, ...]
+        }
+        """
+        tipo = request.data.get('tipo')
+        puntos = request.data.get('puntos')
+        if not puntos:
+            return Response({'error': 'Debe enviar puntos'}, status=400)
+        try:
+            latitudes = [float(str(p['latitud']).replace(',', '.')) for p in puntos]
+            longitudes = [float(str(p['longitud']).replace(',', '.')) for p in puntos]
+        except (KeyError, TypeError, ValueError):
+            return Response({'error': 'Coordenadas inválidas'}, status=400)
+
+        secciones = Seccion.objects.all()
+        if tipo:
+            secciones = secciones.filter(tipo=tipo)
+        indice = indice_secciones(secciones, clave=('tipo', tipo))
+        resultado = indice.clasificar(latitudes, longitudes)
+        return Response({
+            'secciones': [s if s >= 0 else None for s in resultado.tolist()]
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='geojson')
+    def exportar_geojson(self, request):
+        """
+        Todas las secciones (o las de ?tipo=) como FeatureCollection, armado
+        y enviado de a pedazos. Acepta ?tolerance= / ?zoom= como el listado.
+        """
+        secciones = Seccion.objects.all()
+        tipo = request.query_params.get('tipo')
+        if tipo:
+            secciones = secciones.filter(tipo=tipo)
+        return StreamingHttpResponse(
+            exportar_secciones(secciones, nivel=nivel_de_request(request)),
+            content_type='application/geo+json'
+        )
+
+    @action(detail=False, methods=['post'], url_path='importar-geojson')
+    def importar_geojson(self, request):
+        """
+        Crea o actualiza (por nombre) las secciones de un FeatureCollection
+        de Polygon/MultiPolygon con propiedades nombre y tipo. El cuerpo se
+        lee de a un Feature; con Content-Type application/geo+json-seq o
+        NDJSON va un Feature por linea. Se guarda de a lotes (?lote=).
+        Con ?simplificar=0 no se calculan los niveles simplificados.
+        """
+        features = leer_features(request.stream, secuencia=es_secuencia(request))
+        try:
+            resumen = importar_secciones(
+                features, lote=request.query_params.get('lote'),
+                simplificar=request.query_params.get('simplificar') != '0'
+            )
+        except FormatoInvalido as e:
+            return Response({'error': str(e), **getattr(e, 'resumen', {})}, status=400)
+        return Response(resumen, status=status.HTTP_201_CREATED)
@@ -0,0 +1,44 @@
+from rest_framework import serializers, viewsets, status
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+from eleccion.models import Trabajo
+from eleccion.apis.paginacion import PaginacionPorId
+
+
+class TrabajoSerializer(serializers.ModelSerializer):
+    progreso = serializers.FloatField(read_only=True)
+    por_segundo = serializers.FloatField(read_only=True)
+    eta_segundos = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = Trabajo
+        exclude = ['datos']
+
+
+class TrabajoViewSet(viewsets.ReadOnlyModelViewSet):
+    # permission_classes = [IsAuthenticated, DjangoModelPermissions]
+    queryset = Trabajo.objects.defer('datos')
+    serializer_class = TrabajoSerializer
+    pagination_class = PaginacionPorId
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            estado = self.request.query_params.get('estado')
+            if estado:
+                queryset = queryset.filter(estado=estado)
+        return queryset
+
+
+def en_segundo_plano(request):
+    # ?segundo_plano=1 hace que una accion pesada se encole en vez de correr en el request
+    return request.query_params.get('segundo_plano', '').lower() in ('1', 'true', 'si')
+
+
+def respuesta_trabajo(request, trabajo):
+    url = reverse('trabajo-detail', args=[trabajo.pk], request=request)
+    return Response(
+        {"trabajo": trabajo.pk, "estado": trabajo.estado, "url": url},
+        status=status.HTTP_202_ACCEPTED,
+        headers={'Location': url}
+    )
@@ -1,8 +1,14 @@
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
 from rest_framework import serializers, viewsets
 from rest_framework.permissions import IsAuthenticated, DjangoModelPermissions
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from eleccion.models import Votante
+from rest_framework.exceptions import ValidationError
+from eleccion.models import Votante, Eleccion
+from eleccion.apis.paginacion import PaginacionPorId, filtrar_por_params
+from eleccion.services.donde_votar import buscar_donde_votar, invalidar_donde_votar
+from eleccion.services.snapshot import armar_snapshot
 
 
 class VotanteSerializer(serializers.ModelSerializer):
@@ -15,3 +21,59 @@ class VotanteViewSet(viewsets.ModelViewSet):
     # permission_classes = [IsAuthenticated, DjangoModelPermissions]
     queryset = Votante.objects.all()
     serializer_class = VotanteSerializer
+    pagination_class = PaginacionPorId
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            queryset = filtrar_por_params(queryset, self.request.query_params, {
+                'eleccion': 'eleccion_id',
+                'mesa': 'mesa_id',
+                'recinto': 'mesa__recinto_id',
+            })
+        return queryset
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        invalidar_donde_votar(instance.eleccion_id)
+
+    @action(detail=False, methods=['get'], url_path='donde-votar/(?P<eleccion_id>\d+)/(?P<votante_id>\d+)')
+    def donde_votar(self, request, eleccion_id=None, votante_id=None):
+        # se responde desde el indice en memoria, sin consultar la base
+        try:
+            resultado = buscar_donde_votar(eleccion_id, votante_id)
+        except Eleccion.DoesNotExist:
+            return Response({'error': 'Elección no encontrada.'}, status=404)
+        if resultado is None:
+            return Response({'error': 'Votante no habilitado en esta elección.'}, status=404)
+        return Response(resultado)
+
+    @action(detail=False, methods=['get'], url_path='snapshot/(?P<eleccion_id>\d+)')
+    def snapshot(self, request, eleccion_id=None):
+        """
+        Asignacion votante -> mesa de la eleccion (o de ?recinto=) como
+        archivo binario de ancho fijo, ordenado por votante_id, para mapear
+        en memoria en las maquinas de jurado (ver eleccion.services.snapshot).
+        El ETag es el sha256 de los registros.
+        """
+        recinto_id = request.query_params.get('recinto') or None
+        if recinto_id is not None:
+            try:
+                recinto_id = int(recinto_id)
+            except ValueError:
+                raise ValidationError({'recinto': 'Debe ser un número válido'})
+        if not Eleccion.objects.filter(pk=eleccion_id).exists():
+            return Response({'error': 'Elección no encontrada.'}, status=404)
+        datos, checksum = armar_snapshot(eleccion_id, recinto_id)
+        etag = f'"{checksum}"'
+        # acepta W/"..." (lo marca asi CompresionMiddleware), listas y *
+        no_modificado = get_conditional_response(request, etag=etag)
+        if no_modificado is not None:
+            no_modificado['ETag'] = etag
+            return no_modificado
+        nombre = f'eleccion-{eleccion_id}' + (f'-recinto-{recinto_id}' if recinto_id else '') + '.asig'
+        return HttpResponse(datos, content_type='application/octet-stream', headers={
+            'ETag': etag,
+            'X-Checksum-Sha256': checksum,
+            'Content-Disposition': f'attachment; filename="{nombre}"',
+        })
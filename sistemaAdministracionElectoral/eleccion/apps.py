@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class EleccionConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'eleccion'
+
+    def ready(self):
+        from eleccion import signals
+        signals.conectar()
@@ -0,0 +1,48 @@
+import random
+from datetime import date
+
+from django.urls import path, re_path, include
+
+from eleccion.apis import CandidaturaViewSet, MesaViewSet
+from eleccion.management.commands._bench import ComandoBenchmarkAsgi, Escenario
+from eleccion.management.commands.benchmark_carga import preparar_papeleta, MESAS_POR_RECINTO
+from eleccion.models import Seccion, Eleccion, Recinto, Mesa
+
+# modo sync: las mismas rutas servidas por los @action de los viewsets
+urlpatterns = [
+    re_path(r'^eleccion/candidaturas/cargo/(?P<cargo_id>[^/.]+)/eleccion/(?P<eleccion_id>[^/.]+)/$',
+            CandidaturaViewSet.as_view({'get': 'get_papeleta_cargo_eleccion'})),
+    re_path(r'^eleccion/mesas/recinto/(?P<recinto_id>[^/.]+)/eleccion/(?P<eleccion_id>[^/.]+)/$',
+            MesaViewSet.as_view({'get': 'get_mesas_por_recinto_y_eleccion'})),
+    path('', include('sistemaAdministracionElectoral.urls')),
+]
+
+
+def preparar_mesas(tamano):
+    # `tamano` mesas de a MESAS_POR_RECINTO por recinto, se piden recintos al azar
+    seccion = Seccion.objects.create(nombre='Benchmark', tipo='municipio')
+    eleccion = Eleccion.objects.create(nombre='Benchmark', fecha=date.today(), seccion=seccion)
+    recintos = Recinto.objects.bulk_create([
+        Recinto(nombre=f'Recinto {r}', latitud=-17, longitud=-63, seccion=seccion)
+        for r in range(max(1, tamano // MESAS_POR_RECINTO))
+    ])
+    Mesa.objects.bulk_create([
+        Mesa(numero=m // len(recintos) + 1, cantidad=250, recinto=recintos[m % len(recintos)], eleccion=eleccion)
+        for m in range(tamano)
+    ], batch_size=5000)
+    ids = [r.pk for r in recintos]
+    azar = random.Random(0)
+
+    def operacion(cliente, i):
+        return cliente.get(f'/eleccion/mesas/recinto/{azar.choice(ids)}/eleccion/{eleccion.pk}/')
+    return operacion
+
+
+class Command(ComandoBenchmarkAsgi):
+    help = 'Papeleta y mesas por recinto bajo ASGI, vistas async contra las de los viewsets'
+    servicio = 'eleccion'
+    urlconf_sync = __name__
+    escenarios = {
+        'papeleta': Escenario(preparar_papeleta),
+        'mesas': Escenario(preparar_mesas),
+    }
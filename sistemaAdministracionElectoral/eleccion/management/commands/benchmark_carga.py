@@ -0,0 +1,66 @@
+import random
+from datetime import date
+
+import numpy as np
+
+from eleccion.management.commands._bench import ComandoBenchmark, Escenario
+from eleccion.models import Seccion, Eleccion, Cargo, Candidatura, Recinto
+
+VOTANTES_POR_MESA = 250
+MESAS_POR_RECINTO = 10
+CANDIDATURAS_POR_PAPELETA = 12
+
+
+def preparar_distribucion(tamano):
+    # cada iteracion reemplaza la distribucion completa de `tamano` votantes
+    seccion = Seccion.objects.create(nombre='Benchmark', tipo='municipio')
+    eleccion = Eleccion.objects.create(nombre='Benchmark', fecha=date.today(), seccion=seccion)
+    mesas = max(1, tamano // VOTANTES_POR_MESA)
+    recintos = Recinto.objects.bulk_create([
+        Recinto(nombre=f'Recinto {r}', latitud=-17, longitud=-63, seccion=seccion)
+        for r in range(-(-mesas // MESAS_POR_RECINTO))
+    ])
+    plan = ','.join(
+        f'{r.pk}:{min(MESAS_POR_RECINTO, mesas - i * MESAS_POR_RECINTO)}' for i, r in enumerate(recintos)
+    )
+    cuerpo = np.arange(1, tamano + 1, dtype='<u4').tobytes()
+    url = f'/eleccion/mesas/crear-distribuir/?eleccion={eleccion.pk}&recintos={plan}'
+
+    def operacion(cliente, i):
+        return cliente.post(url, cuerpo, content_type='application/octet-stream')
+    return operacion
+
+
+def preparar_papeleta(tamano):
+    # `tamano` candidaturas repartidas en papeletas de 12, se piden al azar
+    seccion = Seccion(nombre='Benchmark', tipo='municipio')
+    seccion.set_poligono([0, 0, 1, 1], [0, 1, 1, 0])
+    seccion.save()
+    papeletas = max(1, tamano // CANDIDATURAS_POR_PAPELETA)
+    elecciones = Eleccion.objects.bulk_create([
+        Eleccion(nombre=f'Eleccion {e}', fecha=date.today(), seccion=seccion)
+        for e in range(-(-papeletas // 10))
+    ])
+    cargos = Cargo.objects.bulk_create([Cargo(nombre=f'Cargo {c}', seccion=seccion) for c in range(10)])
+    pares = [(c.pk, e.pk) for e in elecciones for c in cargos][:papeletas]
+    for inicio in range(0, tamano, 10_000):
+        Candidatura.objects.bulk_create([
+            Candidatura(partido_politico=f'Partido {i}', sigla=f'P{i % 100}', candidato=f'Candidato {i}',
+                        color='#336699', cargo_id=pares[i % len(pares)][0], eleccion_id=pares[i % len(pares)][1])
+            for i in range(inicio, min(tamano, inicio + 10_000))
+        ])
+    azar = random.Random(0)
+
+    def operacion(cliente, i):
+        cargo_id, eleccion_id = azar.choice(pares)
+        return cliente.get(f'/eleccion/candidaturas/cargo/{cargo_id}/eleccion/{eleccion_id}/?expand=cargo,eleccion')
+    return operacion
+
+
+class Command(ComandoBenchmark):
+    help = 'Carga contra distribucion (MesaViewSet) y papeleta; reporte JSON comparable entre commits'
+    servicio = 'eleccion'
+    escenarios = {
+        'distribucion': Escenario(preparar_distribucion, concurrente=False, escala=0.01),
+        'papeleta': Escenario(preparar_papeleta),
+    }
@@ -0,0 +1,60 @@
+import json
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from eleccion.management.commands._bench import base_de_prueba, medir
+from eleccion.models import Seccion, Eleccion, Recinto
+from eleccion.services import crear_y_distribuir
+
+
+class Command(BaseCommand):
+    help = 'Mide tiempo y cantidad de queries de crear_y_distribuir para distintos tamaños de padrón'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--votantes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+        parser.add_argument('--votantes-por-mesa', type=int, default=250)
+        parser.add_argument('--mesas-por-recinto', type=int, default=10)
+        parser.add_argument('--batch-size', type=int, default=None)
+        parser.add_argument('--json', action='store_true', help='Imprime el resultado como JSON')
+
+    def handle(self, *args, **options):
+        resultados = []
+        with base_de_prueba():
+            seccion = Seccion.objects.create(nombre='Benchmark', tipo='pais')
+            for i, total in enumerate(options['votantes']):
+                eleccion = Eleccion.objects.create(
+                    nombre=f'Benchmark {i}', fecha=date.today(), seccion=seccion
+                )
+                total_mesas = max(1, total // options['votantes_por_mesa'])
+                por_recinto = options['mesas_por_recinto']
+                n_recintos = -(-total_mesas // por_recinto)
+                recintos = Recinto.objects.bulk_create([
+                    Recinto(nombre=f'B{i}-R{r}', latitud=0, longitud=0, seccion=seccion)
+                    for r in range(n_recintos)
+                ])
+                plan = []
+                restantes = total_mesas
+                for recinto in recintos:
+                    n = min(por_recinto, restantes)
+                    plan.append((recinto.pk, n))
+                    restantes -= n
+
+                with medir() as m:
+                    crear_y_distribuir(
+                        eleccion, plan, range(1, total + 1),
+                        total_votantes=total, batch_size=options['batch_size']
+                    )
+                resultados.append({
+                    'votantes': total,
+                    'mesas': total_mesas,
+                    'segundos': round(m['segundos'], 3),
+                    'queries': m['queries'],
+                })
+
+        if options['json']:
+            self.stdout.write(json.dumps(resultados, indent=2))
+            return
+        self.stdout.write(f"{'votantes':>10} {'mesas':>7} {'segundos':>9} {'queries':>8}")
+        for r in resultados:
+            self.stdout.write(f"{r['votantes']:>10} {r['mesas']:>7} {r['segundos']:>9} {r['queries']:>8}")
@@ -0,0 +1,92 @@
+import json
+import time
+from datetime import date
+from itertools import islice
+
+import numpy as np
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from eleccion.management.commands._bench import base_de_prueba, medir
+from eleccion.models import Seccion, Eleccion, Recinto, Mesa, Votante
+from eleccion.services import tamanos_parejos, insertar_votantes, repartir_en_mesas
+
+
+def tamanos_con_bucle(total_votantes, total_mesas):
+    # como se calculaba antes: una lista armada elemento por elemento
+    base = total_votantes // total_mesas
+    extra = total_votantes % total_mesas
+    return [base + (1 if i < extra else 0) for i in range(total_mesas)]
+
+
+def asignar_con_bucle(ids, total_mesas):
+    tamanos = tamanos_con_bucle(len(ids), total_mesas)
+    cola = iter(ids)
+    asignacion = []
+    for mesa, cantidad in enumerate(tamanos):
+        for vid in islice(cola, cantidad):
+            asignacion.append((vid, mesa))
+    return asignacion
+
+
+def asignar_vectorizado(ids, total_mesas):
+    tamanos = tamanos_parejos(len(ids), total_mesas)
+    return ids, np.repeat(np.arange(total_mesas), tamanos)
+
+
+def distribuir_con_bucle(mesas, ids):
+    # la version anterior de MesaViewSet._distribuir
+    tamanos = tamanos_con_bucle(len(ids), len(mesas))
+    for mesa, cantidad in zip(mesas, tamanos):
+        mesa.cantidad = cantidad
+        mesa.save(update_fields=['cantidad'])
+    insertar_votantes(mesas, tamanos, ids.tolist())
+
+
+class Command(BaseCommand):
+    help = 'Compara el reparto de ditribuir con bucles contra la version con arreglos numpy'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--votantes', type=int, default=1_000_000)
+        parser.add_argument('--mesas', type=int, default=4000)
+        parser.add_argument('--repeticiones', type=int, default=3, help='para el calculo en memoria')
+        parser.add_argument('--sin-base', action='store_true', help='medir solo el calculo, sin escribir')
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        total, total_mesas = options['votantes'], options['mesas']
+        ids = np.arange(1, total + 1, dtype=np.int64)
+        resultado = {'votantes': total, 'mesas': total_mesas, 'calculo': {}, 'escritura': {}}
+
+        for nombre, funcion in (('bucle', asignar_con_bucle), ('vectorizado', asignar_vectorizado)):
+            tiempos = []
+            for _ in range(options['repeticiones']):
+                inicio = time.perf_counter()
+                funcion(ids, total_mesas)
+                tiempos.append(time.perf_counter() - inicio)
+            resultado['calculo'][nombre] = round(min(tiempos), 4)
+
+        if not options['sin_base']:
+            with base_de_prueba():
+                seccion = Seccion.objects.create(nombre='Benchmark')
+                eleccion = Eleccion.objects.create(nombre='Benchmark', fecha=date.today(), seccion=seccion)
+                recinto = Recinto.objects.create(nombre='Benchmark', latitud=0, longitud=0, seccion=seccion)
+                Mesa.objects.bulk_create([
+                    Mesa(numero=n, cantidad=0, recinto=recinto, eleccion=eleccion) for n in range(total_mesas)
+                ])
+                for nombre, funcion in (('bucle', distribuir_con_bucle), ('vectorizado', repartir_en_mesas)):
+                    mesas = list(Mesa.objects.filter(eleccion=eleccion).order_by('pk'))
+                    Votante.objects.filter(eleccion=eleccion).delete()
+                    with medir() as m, transaction.atomic():
+                        funcion(mesas, ids)
+                    resultado['escritura'][nombre] = {'segundos': round(m['segundos'], 3), 'queries': m['queries']}
+
+        if options['json']:
+            self.stdout.write(json.dumps(resultado, indent=2))
+            return
+        self.stdout.write(f"{total} votantes en {total_mesas} mesas")
+        for nombre, segundos in resultado['calculo'].items():
+            self.stdout.write(f"calculo   {nombre:>12}: {segundos} s")
+        for nombre, m in resultado['escritura'].items():
+            self.stdout.write(f"escritura {nombre:>12}: {m['segundos']} s, {m['queries']} queries")
@@ -0,0 +1,90 @@
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from rest_framework.test import APIClient
+
+from eleccion.management.commands._bench import base_de_prueba, medir
+from eleccion.models import Seccion, Eleccion, Recinto
+from eleccion.services import crear_y_distribuir
+from eleccion.services.donde_votar import indice_donde_votar, buscar_donde_votar, invalidar_donde_votar
+
+
+def percentiles(tiempos):
+    tiempos = sorted(tiempos)
+    def p(q):
+        return round(tiempos[min(len(tiempos) - 1, int(q * len(tiempos)))] * 1e6, 1)
+    return {'p50_us': p(0.50), 'p95_us': p(0.95), 'p99_us': p(0.99)}
+
+
+class Command(BaseCommand):
+    help = 'Carga contra el indice "donde voto": armado, latencia por consulta y consultas por segundo'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--votantes', type=int, default=200_000)
+        parser.add_argument('--consultas', type=int, default=100_000)
+        parser.add_argument('--hilos', type=int, nargs='+', default=[1, 4, 8])
+        parser.add_argument('--http', type=int, default=2000, help='consultas por el endpoint completo')
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        total = options['votantes']
+        resultado = {'votantes': total}
+        with base_de_prueba():
+            seccion = Seccion.objects.create(nombre='Benchmark')
+            eleccion = Eleccion.objects.create(nombre='Benchmark', fecha=date.today(), seccion=seccion)
+            recintos = Recinto.objects.bulk_create([
+                Recinto(nombre=f'R{r}', latitud=-17 - r / 1000, longitud=-63, seccion=seccion)
+                for r in range(max(1, total // 2500))
+            ])
+            crear_y_distribuir(eleccion, [(r.pk, 10) for r in recintos], range(1, total + 1))
+
+            invalidar_donde_votar()
+            with medir() as m:
+                indice_donde_votar(eleccion.pk)
+            resultado['armado'] = {'segundos': round(m['segundos'], 3), 'queries': m['queries']}
+
+            ids = [random.randint(1, total) for _ in range(options['consultas'])]
+            tiempos = []
+            with medir() as m:
+                for vid in ids:
+                    inicio = time.perf_counter()
+                    buscar_donde_votar(eleccion.pk, vid)
+                    tiempos.append(time.perf_counter() - inicio)
+            resultado['consulta'] = dict(percentiles(tiempos), queries=m['queries'])
+
+            resultado['qps'] = {}
+            for hilos in options['hilos']:
+                inicio = time.perf_counter()
+                with ThreadPoolExecutor(hilos) as pool:
+                    list(pool.map(lambda vid: buscar_donde_votar(eleccion.pk, vid), ids))
+                resultado['qps'][hilos] = round(len(ids) / (time.perf_counter() - inicio))
+
+            if options['http']:
+                if '*' not in settings.ALLOWED_HOSTS:
+                    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+                cliente = APIClient()
+                tiempos = []
+                with medir() as m:
+                    for vid in ids[:options['http']]:
+                        inicio = time.perf_counter()
+                        cliente.get(f'/eleccion/votantes/donde-votar/{eleccion.pk}/{vid}/')
+                        tiempos.append(time.perf_counter() - inicio)
+                resultado['http'] = dict(percentiles(tiempos), queries=m['queries'])
+
+        if options['json']:
+            self.stdout.write(json.dumps(resultado, indent=2))
+            return
+        self.stdout.write(f"votantes: {total}")
+        self.stdout.write(f"armado del indice: {resultado['armado']['segundos']} s, {resultado['armado']['queries']} queries")
+        c = resultado['consulta']
+        self.stdout.write(f"consulta directa: p50 {c['p50_us']} us, p95 {c['p95_us']} us, p99 {c['p99_us']} us, {c['queries']} queries")
+        for hilos, qps in resultado['qps'].items():
+            self.stdout.write(f"{hilos} hilos: {qps} consultas/s")
+        if 'http' in resultado:
+            h = resultado['http']
+            self.stdout.write(f"endpoint: p50 {h['p50_us']} us, p95 {h['p95_us']} us, p99 {h['p99_us']} us, {h['queries']} queries")
@@ -0,0 +1,96 @@
+import json
+import math
+import time
+from datetime import date
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from rest_framework.renderers import JSONRenderer
+from rest_framework.settings import api_settings
+from rest_framework.test import APIClient
+
+from eleccion.management.commands._bench import base_de_prueba
+from eleccion.models import Seccion, Eleccion, Cargo, Candidatura, Recinto
+from eleccion.services import crear_y_distribuir
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def mejor_tiempo(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+class Command(BaseCommand):
+    help = 'Tiempo de serializacion (json vs el renderer configurado) y bytes enviados con y sin compresion'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--secciones', type=int, default=100)
+        parser.add_argument('--vertices', type=int, default=2000)
+        parser.add_argument('--candidaturas', type=int, default=500)
+        parser.add_argument('--votantes', type=int, default=20_000)
+        parser.add_argument('--repeticiones', type=int, default=5)
+        parser.add_argument('--json', action='store_true')
+
+    def handle(self, *args, **options):
+        renderer = api_settings.DEFAULT_RENDERER_CLASSES[0]()
+        codificaciones = ['identity', 'gzip'] + (['br'] if brotli is not None else [])
+        resultado = {'renderer': type(renderer).__name__, 'endpoints': {}}
+
+        with base_de_prueba():
+            angulos = [2 * math.pi * i / options['vertices'] for i in range(options['vertices'])]
+            secciones = []
+            for s in range(options['secciones']):
+                seccion = Seccion(nombre=f'Seccion {s}', tipo='municipio')
+                seccion.set_poligono([s + math.sin(a) for a in angulos], [math.cos(a) for a in angulos])
+                secciones.append(seccion)
+            Seccion.objects.bulk_create(secciones)
+            seccion = Seccion.objects.first()
+            eleccion = Eleccion.objects.create(nombre='Benchmark', fecha=date.today(), seccion=seccion)
+            cargo = Cargo.objects.create(nombre='Benchmark', seccion=seccion)
+            Candidatura.objects.bulk_create([
+                Candidatura(partido_politico=f'Partido {i}', sigla=f'P{i}', candidato=f'Candidato {i}',
+                            color='#336699', cargo=cargo, eleccion=eleccion)
+                for i in range(options['candidaturas'])
+            ])
+            recinto = Recinto.objects.create(nombre='Benchmark', latitud=0, longitud=0, seccion=seccion)
+            crear_y_distribuir(eleccion, [(recinto.pk, max(1, options['votantes'] // 200))],
+                               range(1, options['votantes'] + 1))
+
+            endpoints = {
+                'secciones': '/eleccion/secciones/',
+                'papeleta': f'/eleccion/candidaturas/cargo/{cargo.pk}/eleccion/{eleccion.pk}/'
+                            '?expand=cargo,eleccion',
+                'votantes': '/eleccion/votantes/?page_size=1000',
+            }
+            if '*' not in settings.ALLOWED_HOSTS:
+                settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+            client = APIClient()
+            for nombre, url in endpoints.items():
+                datos = client.get(url).json()
+                medicion = {
+                    'serializar_json_s': round(mejor_tiempo(lambda: JSONRenderer().render(datos), options['repeticiones']), 4),
+                    'serializar_configurado_s': round(mejor_tiempo(lambda: renderer.render(datos), options['repeticiones']), 4),
+                    'bytes': {},
+                }
+                for codificacion in codificaciones:
+                    respuesta = client.get(url, HTTP_ACCEPT_ENCODING=codificacion)
+                    medicion['bytes'][respuesta.get('Content-Encoding', 'identity')] = len(respuesta.content)
+                resultado['endpoints'][nombre] = medicion
+
+        if options['json']:
+            self.stdout.write(json.dumps(resultado, indent=2))
+            return
+        self.stdout.write(f"renderer configurado: {resultado['renderer']}")
+        for nombre, m in resultado['endpoints'].items():
+            bytes_ = ', '.join(f'{k} {v}' for k, v in m['bytes'].items())
+            self.stdout.write(
+                f"{nombre:>10}: json {m['serializar_json_s']} s, configurado {m['serializar_configurado_s']} s; bytes: {bytes_}"
+            )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from eleccion.models import Seccion, Recinto
+from eleccion.services.geojson import exportar_secciones, exportar_recintos
+from eleccion.services.simplificacion import nivel_para
+
+
+class Command(BaseCommand):
+    help = 'Escribe las secciones o recintos como FeatureCollection GeoJSON, de a pedazos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=['secciones', 'recintos'])
+        parser.add_argument('archivo', nargs='?', help='por defecto la salida estandar')
+        parser.add_argument('--tolerance', type=float, help='exportar las secciones simplificadas')
+
+    def handle(self, *args, **options):
+        if options['tipo'] == 'secciones':
+            pedazos = exportar_secciones(Seccion.objects.all(), nivel=nivel_para(tolerancia=options['tolerance']))
+        else:
+            pedazos = exportar_recintos(Recinto.objects.all())
+        if not options['archivo']:
+            for pedazo in pedazos:
+                self.stdout.write(pedazo, ending='')
+            return
+        with open(options['archivo'], 'w', encoding='utf-8') as archivo:
+            archivo.writelines(pedazos)
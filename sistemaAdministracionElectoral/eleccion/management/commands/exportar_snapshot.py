@@ -0,0 +1,36 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from eleccion.models import Eleccion, Mesa
+from eleccion.services.snapshot import escribir_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Escribe el snapshot binario votante -> mesa de una eleccion, completo o uno por recinto'
+
+    def add_arguments(self, parser):
+        parser.add_argument('eleccion', type=int)
+        parser.add_argument('--directorio', default='.')
+        parser.add_argument('--recinto', type=int, action='append', help='solo estos recintos (se puede repetir)')
+        parser.add_argument('--por-recinto', action='store_true', help='un archivo por cada recinto de la eleccion')
+
+    def handle(self, *args, **options):
+        eleccion_id = options['eleccion']
+        if not Eleccion.objects.filter(pk=eleccion_id).exists():
+            raise CommandError(f'No existe la elección {eleccion_id}')
+        os.makedirs(options['directorio'], exist_ok=True)
+
+        recintos = options['recinto'] or []
+        if options['por_recinto']:
+            recintos = (
+                Mesa.objects.filter(eleccion_id=eleccion_id)
+                .values_list('recinto_id', flat=True).distinct().order_by('recinto_id')
+            )
+        destinos = [(None, f'eleccion-{eleccion_id}.asig')] if not recintos else [
+            (recinto_id, f'eleccion-{eleccion_id}-recinto-{recinto_id}.asig') for recinto_id in recintos
+        ]
+        for recinto_id, nombre in destinos:
+            ruta = os.path.join(options['directorio'], nombre)
+            checksum = escribir_snapshot(ruta, eleccion_id, recinto_id)
+            self.stdout.write(f'{ruta} sha256={checksum}')
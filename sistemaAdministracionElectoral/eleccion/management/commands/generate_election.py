@@ -0,0 +1,47 @@
+import json
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from eleccion.services.sinteticos import generar_eleccion
+
+
+class Command(BaseCommand):
+    help = 'Genera una eleccion sintetica reproducible (secciones, recintos, candidaturas, mesas y votantes)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--semilla', type=int, default=0)
+        parser.add_argument('--votantes', type=int, default=100_000)
+        parser.add_argument('--secciones', type=int, default=20, help='municipios dentro del departamento')
+        parser.add_argument('--recintos', type=int, default=500)
+        parser.add_argument('--elecciones', type=int, default=1)
+        parser.add_argument('--cargos', type=int, default=3)
+        parser.add_argument('--candidaturas', type=int, default=8, help='candidaturas por cargo')
+        parser.add_argument('--por-mesa', type=int, default=250, help='votantes por mesa')
+        parser.add_argument('--vertices', type=int, default=64, help='vertices del poligono de cada municipio')
+        parser.add_argument('--fecha', type=date.fromisoformat, help='fecha de las elecciones (AAAA-MM-DD)')
+        parser.add_argument('--prefijo', help='prefijo de los nombres, por defecto "Sintetica <semilla>"')
+        parser.add_argument('--lote', type=int, help='filas por INSERT (DISTRIBUCION_BATCH_SIZE)')
+        parser.add_argument('--sin-simplificar', action='store_true',
+                            help='no calcular los niveles simplificados (ver simplificar_secciones)')
+        parser.add_argument('--manifiesto', help='archivo JSON con los ids generados, para votacion generate_election')
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        try:
+            resumen, manifiesto = generar_eleccion(
+                semilla=options['semilla'], votantes=options['votantes'], secciones=options['secciones'],
+                recintos=options['recintos'], elecciones=options['elecciones'], cargos=options['cargos'],
+                candidaturas=options['candidaturas'], por_mesa=options['por_mesa'],
+                vertices=options['vertices'], fecha=options['fecha'], prefijo=options['prefijo'],
+                simplificar=not options['sin_simplificar'], batch_size=options['lote'],
+            )
+        except ValueError as e:
+            raise CommandError(e)
+        if options['manifiesto']:
+            with open(options['manifiesto'], 'w') as archivo:
+                json.dump(manifiesto, archivo)
+        self.stdout.write(
+            ', '.join(f'{k}: {v}' for k, v in resumen.items()) + f' ({time.perf_counter() - inicio:.1f}s)'
+        )
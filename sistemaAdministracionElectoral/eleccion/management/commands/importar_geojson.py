@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from eleccion.services.ingesta import FormatoInvalido
+from eleccion.services.geojson import leer_features, importar_secciones, importar_recintos
+
+IMPORTADORES = {'secciones': importar_secciones, 'recintos': importar_recintos}
+EXTENSIONES_SECUENCIA = ('.geojsonl', '.geojsons', '.geojsonseq', '.ndjson', '.jsonl')
+
+
+class Command(BaseCommand):
+    help = 'Carga secciones o recintos desde un GeoJSON, leyendo de a un Feature y guardando por lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tipo', choices=sorted(IMPORTADORES))
+        parser.add_argument('archivo')
+        parser.add_argument('--lote', type=int, help='features por transaccion')
+        parser.add_argument('--secuencia', action='store_true',
+                            help='un Feature por linea (se deduce de la extension .geojsonl/.ndjson)')
+        parser.add_argument('--sin-simplificar', action='store_true',
+                            help='secciones: no calcular los niveles simplificados (ver simplificar_secciones)')
+
+    def handle(self, *args, **options):
+        secuencia = options['secuencia'] or options['archivo'].lower().endswith(EXTENSIONES_SECUENCIA)
+        extra = {'simplificar': not options['sin_simplificar']} if options['tipo'] == 'secciones' else {}
+        with open(options['archivo'], 'rb') as archivo:
+            try:
+                resumen = IMPORTADORES[options['tipo']](
+                    leer_features(archivo, secuencia=secuencia), lote=options['lote'], **extra
+                )
+            except FormatoInvalido as e:
+                raise CommandError(f"{e} (ya guardados: {getattr(e, 'resumen', {})})")
+        self.stdout.write(', '.join(f'{k}: {v}' for k, v in resumen.items()))
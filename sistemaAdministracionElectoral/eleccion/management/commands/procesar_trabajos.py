@@ -0,0 +1,35 @@
+import os
+import socket
+import time
+
+from django.core.management.base import BaseCommand
+
+from eleccion.services.trabajos import tomar, ejecutar
+
+
+class Command(BaseCommand):
+    help = 'Worker de la cola de trabajos: toma trabajos pendientes (o abandonados) y los ejecuta de a pasos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help='procesar lo pendiente y salir')
+        parser.add_argument('--intervalo', type=float, default=1.0, help='segundos entre consultas a la cola vacia')
+        parser.add_argument('--nombre', default=f'{socket.gethostname()}:{os.getpid()}')
+
+    def handle(self, *args, **options):
+        nombre = options['nombre']
+        self.stdout.write(f'worker {nombre} esperando trabajos')
+        while True:
+            trabajo = tomar(nombre)
+            if trabajo is None:
+                if options['una_vez']:
+                    return
+                time.sleep(options['intervalo'])
+                continue
+            inicio = time.perf_counter()
+            terminado = ejecutar(trabajo)
+            trabajo.refresh_from_db(fields=['estado', 'procesados', 'error'])
+            self.stdout.write(
+                f'trabajo {trabajo.pk} ({trabajo.tipo}): {trabajo.estado}, '
+                f'{trabajo.procesados} procesados en {time.perf_counter() - inicio:.2f} s'
+                + ('' if terminado else f' {trabajo.error}')
+            )
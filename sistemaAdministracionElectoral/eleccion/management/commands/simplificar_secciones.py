@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from eleccion.models import Seccion
+from eleccion.services.simplificacion import actualizar_simplificaciones
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los poligonos simplificados de todas las secciones (o de las indicadas)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('secciones', type=int, nargs='*', help='ids de seccion, por defecto todas')
+
+    def handle(self, *args, **options):
+        secciones = Seccion.objects.all()
+        if options['secciones']:
+            secciones = secciones.filter(pk__in=options['secciones'])
+        total = 0
+        for seccion in secciones.iterator():
+            total += actualizar_simplificaciones(seccion)
+        self.stdout.write(f'{total} poligonos simplificados guardados')
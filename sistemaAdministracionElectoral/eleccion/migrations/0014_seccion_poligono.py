@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eleccion', '0013_alter_mesa_eleccion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seccion',
+            name='poligono',
+            field=models.BinaryField(blank=True, editable=False, null=True),
+        ),
+    ]
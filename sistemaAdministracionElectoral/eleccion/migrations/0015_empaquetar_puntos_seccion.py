@@ -0,0 +1,55 @@
+import sys
+from array import array
+from itertools import groupby
+
+from django.db import migrations
+
+
+def empaquetar(apps, schema_editor):
+    # copia los Punto existentes de cada seccion a Seccion.poligono,
+    # las filas de Punto las borra 0019_borrar_puntos_empaquetados
+    Seccion = apps.get_model('eleccion', 'Seccion')
+    Punto = apps.get_model('eleccion', 'Punto')
+    filas = (
+        Punto.objects
+        .filter(seccion__poligono__isnull=True)
+        .order_by('seccion_id', 'id')
+        .values_list('seccion_id', 'latitud', 'longitud')
+        .iterator()
+    )
+    for seccion_id, puntos in groupby(filas, key=lambda f: f[0]):
+        valores = array('d')
+        for _, lat, lng in puntos:
+            valores.append(lat)
+            valores.append(lng)
+        if sys.byteorder == 'big':
+            valores.byteswap()
+        Seccion.objects.filter(pk=seccion_id).update(poligono=valores.tobytes())
+
+
+def desempaquetar(apps, schema_editor):
+    # las secciones que solo existen empaquetadas vuelven a tener sus Punto
+    Seccion = apps.get_model('eleccion', 'Seccion')
+    Punto = apps.get_model('eleccion', 'Punto')
+    sin_puntos = Seccion.objects.filter(poligono__isnull=False, puntos__isnull=True)
+    for seccion in sin_puntos.iterator():
+        valores = array('d')
+        valores.frombytes(bytes(seccion.poligono))
+        if sys.byteorder == 'big':
+            valores.byteswap()
+        Punto.objects.bulk_create([
+            Punto(seccion_id=seccion.pk, latitud=lat, longitud=lng)
+            for lat, lng in zip(valores[0::2], valores[1::2])
+        ])
+    Seccion.objects.update(poligono=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eleccion', '0014_seccion_poligono'),
+    ]
+
+    operations = [
+        migrations.RunPython(empaquetar, desempaquetar),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eleccion', '0015_empaquetar_puntos_seccion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeccionSimplificada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tolerancia', models.FloatField()),
+                ('poligono', models.BinaryField()),
+                ('seccion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='simplificadas', to='eleccion.seccion')),
+            ],
+            options={
+                'unique_together': {('seccion', 'tolerancia')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eleccion', '0016_seccionsimplificada'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='votante',
+            constraint=models.UniqueConstraint(fields=('eleccion', 'votante_id'), name='votante_unico_por_eleccion'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:45
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eleccion', '0017_votante_unico_por_eleccion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trabajo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(max_length=50)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_curso', 'En curso'), ('terminado', 'Terminado'), ('error', 'Error')], default='pendiente', max_length=20)),
+                ('parametros', models.JSONField(default=dict)),
+                ('datos', models.BinaryField(blank=True, null=True)),
+                ('checkpoint', models.JSONField(default=dict)),
+                ('total', models.BigIntegerField(default=0)),
+                ('procesados', models.BigIntegerField(default=0)),
+                ('resultado', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('worker', models.CharField(blank=True, default='', max_length=100)),
+                ('creado', models.DateTimeField(default=django.utils.timezone.now)),
+                ('iniciado', models.DateTimeField(blank=True, null=True)),
+                ('actualizado', models.DateTimeField(blank=True, null=True)),
+                ('terminado', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['estado', 'id'], name='trabajo_estado_idx')],
+            },
+        ),
+    ]
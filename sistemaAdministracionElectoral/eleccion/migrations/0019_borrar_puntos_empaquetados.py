@@ -0,0 +1,38 @@
+import sys
+from array import array
+
+from django.db import migrations
+
+
+def borrar_puntos(apps, schema_editor):
+    # con Seccion.poligono presente las filas de Punto no se leen mas y
+    # PuntoViewSet no las deja editar: se borran para que no queden viejas
+    Punto = apps.get_model('eleccion', 'Punto')
+    Punto.objects.filter(seccion__poligono__isnull=False).delete()
+
+
+def recrear_puntos(apps, schema_editor):
+    # los Punto de las secciones empaquetadas salen del blob, como en 0015
+    Seccion = apps.get_model('eleccion', 'Seccion')
+    Punto = apps.get_model('eleccion', 'Punto')
+    sin_puntos = Seccion.objects.filter(poligono__isnull=False, puntos__isnull=True)
+    for seccion in sin_puntos.iterator():
+        valores = array('d')
+        valores.frombytes(bytes(seccion.poligono))
+        if sys.byteorder == 'big':
+            valores.byteswap()
+        Punto.objects.bulk_create([
+            Punto(seccion_id=seccion.pk, latitud=lat, longitud=lng)
+            for lat, lng in zip(valores[0::2], valores[1::2])
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eleccion', '0018_trabajo'),
+    ]
+
+    operations = [
+        migrations.RunPython(borrar_puntos, recrear_puntos),
+    ]
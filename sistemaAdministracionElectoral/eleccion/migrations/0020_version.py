@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('eleccion', '0019_borrar_puntos_empaquetados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Version',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=100, unique=True)),
+                ('valor', models.FloatField()),
+            ],
+        ),
+    ]
@@ -1,8 +1,10 @@
-from .seccion import Seccion
+from .seccion import Seccion, SeccionSimplificada
 from .punto import Punto
 from .eleccion import Eleccion
 from .cargo import Cargo
 from .candidatura import Candidatura
 from .recinto import Recinto
 from .mesa import Mesa
-from .votante import Votante
\ No newline at end of file
+from .votante import Votante
+from .trabajo import Trabajo
+from .version import Version
@@ -1,8 +1,70 @@
+import sys
+from array import array
+
 from django.db import models
+
+
+def empaquetar_puntos(latitudes, longitudes):
+    # float64 little-endian [lat0, lng0, lat1, lng1, ...]
+    valores = array('d')
+    for lat, lng in zip(latitudes, longitudes):
+        valores.append(lat)
+        valores.append(lng)
+    if sys.byteorder == 'big':
+        valores.byteswap()
+    return valores.tobytes()
+
+
+def desempaquetar_puntos(blob):
+    # [(lat, lng), ...]
+    valores = array('d')
+    valores.frombytes(bytes(blob))
+    if sys.byteorder == 'big':
+        valores.byteswap()
+    return list(zip(valores[0::2], valores[1::2]))
+
+
 class Seccion(models.Model):
     nombre = models.CharField(max_length=100, unique=True)
     tipo = models.CharField(null= True, blank=True, max_length=50)
+    # vertices empaquetados con empaquetar_puntos(); cuando esta presente la
+    # seccion no tiene filas de Punto y el poligono se reemplaza entero
+    poligono = models.BinaryField(null=True, blank=True, editable=False)
 
     def __str__(self):
         return self.nombre
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        # el poligono tal como se leyo, para saber al guardar si cambio
+        instancia = super().from_db(db, field_names, values)
+        instancia._poligono_guardado = instancia.__dict__.get('poligono')
+        return instancia
+
+    def poligono_cambio(self):
+        # True si poligono no es el que se leyo de la base (o nunca se leyo)
+        if not hasattr(self, '_poligono_guardado'):
+            return True
+        return self.poligono != self._poligono_guardado
+
+    def set_poligono(self, latitudes, longitudes):
+        self.poligono = empaquetar_puntos(latitudes, longitudes)
+
+    def get_poligono(self):
+        # sin pasar por el ORM; None si no esta empaquetado
+        if self.poligono is None:
+            return None
+        return desempaquetar_puntos(self.poligono)
+
+
+class SeccionSimplificada(models.Model):
+    # poligono de la seccion simplificado con Douglas-Peucker a `tolerancia` grados
+    seccion = models.ForeignKey(Seccion, on_delete=models.CASCADE, related_name='simplificadas')
+    tolerancia = models.FloatField()
+    poligono = models.BinaryField()
+
+    class Meta:
+        unique_together = ('seccion', 'tolerancia')
+
+    def get_poligono(self):
+        return desempaquetar_puntos(self.poligono)
@@ -0,0 +1,62 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Trabajo(models.Model):
+    # operacion larga que corre un worker (manage.py procesar_trabajos) de a pasos
+    PENDIENTE = 'pendiente'
+    EN_CURSO = 'en_curso'
+    TERMINADO = 'terminado'
+    ERROR = 'error'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_CURSO, 'En curso'),
+        (TERMINADO, 'Terminado'),
+        (ERROR, 'Error'),
+    ]
+
+    tipo = models.CharField(max_length=50)
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE)
+    parametros = models.JSONField(default=dict)
+    # ids de votantes como int64 little-endian, para no inflar el JSON
+    datos = models.BinaryField(null=True, blank=True, editable=False)
+    # donde retomar si el worker se corta; se guarda junto con cada paso
+    checkpoint = models.JSONField(default=dict)
+    total = models.BigIntegerField(default=0)
+    procesados = models.BigIntegerField(default=0)
+    resultado = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    worker = models.CharField(max_length=100, blank=True, default='')
+    creado = models.DateTimeField(default=timezone.now)
+    iniciado = models.DateTimeField(null=True, blank=True)
+    actualizado = models.DateTimeField(null=True, blank=True)
+    terminado = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['estado', 'id'], name='trabajo_estado_idx'),
+        ]
+
+    def __str__(self):
+        return f"Trabajo {self.pk} ({self.tipo}) - {self.estado}"
+
+    @property
+    def progreso(self):
+        if not self.total:
+            return 1.0 if self.estado == self.TERMINADO else 0.0
+        return min(1.0, self.procesados / self.total)
+
+    @property
+    def por_segundo(self):
+        # procesados desde que arranco, contando las reanudaciones
+        if not self.iniciado or not self.procesados:
+            return None
+        fin = self.terminado or self.actualizado or timezone.now()
+        segundos = (fin - self.iniciado).total_seconds()
+        return self.procesados / segundos if segundos > 0 else None
+
+    @property
+    def eta_segundos(self):
+        if self.estado != self.EN_CURSO or not self.por_segundo:
+            return None
+        return max(0, self.total - self.procesados) / self.por_segundo
@@ -0,0 +1,12 @@
+from django.db import models
+
+
+class Version(models.Model):
+    # hora del ultimo cambio de algo que se cachea por proceso (ETag de los
+    # listados, papeleta, indice donde_votar); en la base la ven todos los
+    # procesos, incluido el worker de procesar_trabajos
+    clave = models.CharField(max_length=100, unique=True)
+    valor = models.FloatField()
+
+    def __str__(self):
+        return f"{self.clave} = {self.valor}"
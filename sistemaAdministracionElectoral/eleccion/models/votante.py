@@ -10,6 +10,13 @@ class Votante(models.Model):
         'eleccion.Mesa', on_delete=models.CASCADE, related_name='votantes'
     )
 
+    class Meta:
+        constraints = [
+            # un votante aparece una sola vez por eleccion, y el indice sirve
+            # para buscar la mesa de un votante
+            models.UniqueConstraint(fields=['eleccion', 'votante_id'], name='votante_unico_por_eleccion'),
+        ]
+
     def __str__(self):
         return f"Votante ID: {self.votante_id} - Elección ID: {self.eleccion_id} - Mesa ID: {self.mesa_id} - Voto: {'Sí' if self.voto else 'No'}"
 
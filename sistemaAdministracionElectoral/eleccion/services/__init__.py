@@ -0,0 +1,19 @@
+from .distribucion import (
+    get_batch_size, calcular_tamanos, tamanos_parejos, insertar_votantes, insertar_asignacion, repartir_en_mesas,
+    asignar_jefes, escribir_distribucion,
+    crear_y_distribuir, asignar_por_cercania, distribuir_por_cercania, plan_por_recinto, escribir_por_recinto
+)
+from .ingesta import (
+    formato_stream, leer_votantes, leer_votantes_geo, parsear_recintos,
+    VotantesEnDisco, FormatoInvalido
+)
+from .geo import asignar_mas_cercano, IndiceGrilla
+from .donde_votar import buscar_donde_votar, reconstruir_donde_votar, invalidar_donde_votar
+from .papeleta import papeleta_renderizada, papeleta_guardada, apapeleta_guardada, invalidar_papeletas, calcular_etag
+from .rebalanceo import rebalancear, tamanos_objetivo
+from .trabajos import encolar, tomar, ejecutar, tarea, TAREAS, VotantesRepetidos
+from .planificacion import planificar_mesas, planificar_por_cercania, topes, resumen_plan, aplicar_plan
+from .geojson import leer_features, importar_secciones, importar_recintos, exportar_secciones, exportar_recintos
+from .snapshot import armar_snapshot, escribir_snapshot, LectorSnapshot, SnapshotInvalido
+from .versiones import version, subir_version, etag_de
+from .sinteticos import generar_eleccion, ids_votantes
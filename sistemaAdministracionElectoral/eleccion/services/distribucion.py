@@ -0,0 +1,256 @@
+from itertools import islice
+
+import numpy as np
+
+from django.conf import settings
+from django.db import transaction, connections, router
+from django.db.models import OuterRef, Subquery
+
+from eleccion.models import Mesa, Votante
+from eleccion.services.geo import asignar_mas_cercano
+from eleccion.services.donde_votar import reconstruir_donde_votar
+from eleccion.services.versiones import subir_version
+
+# tamaño por defecto de cada INSERT en lote, se puede cambiar en settings
+BATCH_SIZE_DEFECTO = 5000
+
+
+def get_batch_size(batch_size=None):
+    # None usa el de settings; cualquier otro valor tiene que ser un entero positivo
+    if batch_size is None:
+        return getattr(settings, 'DISTRIBUCION_BATCH_SIZE', BATCH_SIZE_DEFECTO)
+    try:
+        batch_size = int(batch_size)
+    except (TypeError, ValueError):
+        batch_size = 0
+    if batch_size < 1:
+        raise ValueError('batch_size debe ser un entero positivo')
+    return batch_size
+
+
+def tamanos_parejos(total_votantes, total_mesas):
+    # arreglo: las primeras `extra` mesas tienen base+1, el resto base
+    tamanos = np.full(total_mesas, total_votantes // total_mesas, dtype=np.int64)
+    tamanos[:total_votantes % total_mesas] += 1
+    return tamanos
+
+
+def calcular_tamanos(total_votantes, total_mesas):
+    return tamanos_parejos(total_votantes, total_mesas).tolist()
+
+
+def insertar_filas(filas):
+    """
+    Inserta votantes a partir de tuplas (votante_id, eleccion_id, mesa_id)
+    con un executemany directo, sin instanciar modelos: con millones de
+    filas armar los Votante para bulk_create es la mayor parte del tiempo.
+    No dispara señales, igual que bulk_create.
+    """
+    conexion = connections[router.db_for_write(Votante)]
+    q = conexion.ops.quote_name
+    opts = Votante._meta
+    columnas = ', '.join(q(opts.get_field(n).column) for n in ('voto', 'votante_id', 'eleccion', 'mesa'))
+    sql = f'INSERT INTO {q(opts.db_table)} ({columnas}) VALUES (%s, %s, %s, %s)'
+    with conexion.cursor() as cursor:
+        cursor.executemany(sql, [(False, v, e, m) for v, e, m in filas])
+
+
+def insertar_votantes(mesas, tamanos, votantes, batch_size=None):
+    """
+    Recorre los ids de `votantes` (cualquier iterable) y los asigna en orden a
+    `mesas` segun `tamanos`, escribiendo en lotes de `batch_size`. Nunca
+    arma mas de un lote en memoria.
+    Devuelve la cantidad de votantes insertados.
+    """
+    batch_size = get_batch_size(batch_size)
+    cola = iter(votantes)
+    lote = []
+    insertados = 0
+    for mesa, cantidad in zip(mesas, tamanos):
+        for vid in islice(cola, cantidad):
+            lote.append((vid, mesa.eleccion_id, mesa.pk))
+            if len(lote) >= batch_size:
+                insertar_filas(lote)
+                insertados += len(lote)
+                lote = []
+    if lote:
+        insertar_filas(lote)
+        insertados += len(lote)
+    return insertados
+
+
+def insertar_asignacion(mesas, posicion, ids, batch_size=None):
+    """
+    Inserta el votante ids[i] en mesas[posicion[i]] (arreglos paralelos),
+    de a `batch_size`. Devuelve la cantidad insertada.
+    """
+    batch_size = get_batch_size(batch_size)
+    mesa_ids = np.array([m.pk for m in mesas], dtype=np.int64)
+    elecciones = [m.eleccion_id for m in mesas]
+    for inicio in range(0, len(ids), batch_size):
+        lote = posicion[inicio:inicio + batch_size]
+        insertar_filas(zip(
+            ids[inicio:inicio + batch_size].tolist(),
+            [elecciones[p] for p in lote.tolist()],
+            mesa_ids[lote].tolist(),
+        ))
+    return len(ids)
+
+
+def repartir_en_mesas(mesas, ids, batch_size=None):
+    """
+    Reparte `ids` (arreglo) parejo entre `mesas` ya guardadas, en orden.
+    Los tamanos y la mesa de cada votante salen de operaciones sobre
+    arreglos; Mesa.cantidad se escribe con un bulk_update y los votantes
+    por lotes. Devuelve los tamanos.
+    """
+    batch_size = get_batch_size(batch_size)
+    ids = np.asarray(ids, dtype=np.int64)
+    tamanos = tamanos_parejos(len(ids), len(mesas))
+    for mesa, cantidad in zip(mesas, tamanos.tolist()):
+        mesa.cantidad = cantidad
+    Mesa.objects.bulk_update(mesas, ['cantidad'], batch_size=batch_size)
+    # posicion[i] = mesa del votante i: 0,0,..,1,1,..
+    posicion = np.repeat(np.arange(len(mesas)), tamanos)
+    insertar_asignacion(mesas, posicion, ids, batch_size)
+    return tamanos
+
+
+def asignar_jefes(mesas):
+    # un solo UPDATE: el jefe es el primer votante (menor pk) de cada mesa
+    primer_votante = (
+        Votante.objects
+        .filter(mesa=OuterRef('pk'))
+        .order_by('pk')
+        .values('votante_id')[:1]
+    )
+    return mesas.update(jefe_id=Subquery(primer_votante))
+
+
+def escribir_distribucion(eleccion, mesas, tamanos, votantes, batch_size=None):
+    """
+    Reemplaza las mesas y votantes de `eleccion` por `mesas` (instancias aun
+    no guardadas) con `tamanos[i]` votantes cada una, tomados en orden de
+    `votantes`. Todo en una transaccion.
+    """
+    batch_size = get_batch_size(batch_size)
+    with transaction.atomic():
+        # limpiar datos pasados, votantes primero para que el borrado de
+        # mesas no tenga que recorrer la cascada
+        Votante.objects.filter(eleccion=eleccion).delete()
+        Mesa.objects.filter(eleccion=eleccion).delete()
+
+        mesas = Mesa.objects.bulk_create(mesas, batch_size=batch_size)
+        insertar_votantes(mesas, tamanos, votantes, batch_size)
+        asignar_jefes(Mesa.objects.filter(eleccion=eleccion))
+        transaction.on_commit(lambda: reconstruir_donde_votar(eleccion.pk))
+        transaction.on_commit(lambda: subir_version(Mesa))
+
+    return mesas
+
+
+def crear_y_distribuir(eleccion, recintos, votantes, total_votantes=None, batch_size=None):
+    """
+    Version en lote de MesaViewSet.crear_y_distribuir.
+    `recintos` es una lista de (recinto_id, n_mesas) ya validada,
+    `votantes` un iterable de ids. Si no se pasa `total_votantes`
+    se usa len(votantes).
+    Las mesas se crean en memoria y se insertan con bulk_create, los votantes
+    se insertan en lotes y los jefes se asignan con un unico UPDATE.
+    """
+    if total_votantes is None:
+        total_votantes = len(votantes)
+    total_mesas = sum(n for _, n in recintos)
+    tamanos = calcular_tamanos(total_votantes, total_mesas)
+
+    mesas = []
+    idx = 0
+    for recinto_id, num_mesas in recintos:
+        for num in range(1, num_mesas + 1):
+            mesas.append(Mesa(
+                eleccion=eleccion,
+                recinto_id=recinto_id,
+                numero=num,
+                cantidad=tamanos[idx]
+            ))
+            idx += 1
+
+    return escribir_distribucion(eleccion, mesas, tamanos, votantes, batch_size)
+
+
+def _en_bloques(arreglo, n=8192):
+    # numpy -> int de python por bloques, el ORM no acepta np.int64
+    for i in range(0, len(arreglo), n):
+        yield from arreglo[i:i + n].tolist()
+
+
+def asignar_por_cercania(recintos, latitudes, longitudes, votantes_por_mesa=None):
+    """
+    Indice (en `recintos`) del recinto mas cercano con lugar para cada
+    votante. `recintos` es una lista de dicts {recinto, mesas, latitud,
+    longitud, capacidad?}. La capacidad por defecto de un recinto es
+    mesas * votantes_por_mesa; si no se pasa votantes_por_mesa se usa el
+    minimo que alcanza para todos.
+    """
+    n_mesas = np.array([r['mesas'] for r in recintos], dtype=np.int64)
+    if not len(n_mesas) or (n_mesas < 1).any():
+        raise ValueError('Cada recinto necesita al menos una mesa')
+    if not votantes_por_mesa:
+        votantes_por_mesa = -(-len(latitudes) // int(n_mesas.sum()))
+    capacidad = np.array([
+        r.get('capacidad') or r['mesas'] * votantes_por_mesa for r in recintos
+    ], dtype=np.int64)
+    return asignar_mas_cercano(
+        latitudes, longitudes,
+        [r['latitud'] for r in recintos], [r['longitud'] for r in recintos],
+        capacidad
+    )
+
+
+def distribuir_por_cercania(eleccion, recintos, ids, latitudes, longitudes,
+                            votantes_por_mesa=None, batch_size=None):
+    """
+    Asigna cada votante al recinto mas cercano con lugar (ver
+    asignar_por_cercania) y lo reparte entre las mesas de ese recinto.
+    Devuelve (mesas, votantes por recinto).
+    """
+    asignacion = asignar_por_cercania(recintos, latitudes, longitudes, votantes_por_mesa)
+    mesas, por_recinto = escribir_por_recinto(
+        eleccion, [r['recinto'] for r in recintos], [r['mesas'] for r in recintos], asignacion, ids, batch_size
+    )
+    return mesas, {r['recinto']: c for r, c in zip(recintos, por_recinto.tolist())}
+
+
+def plan_por_recinto(recinto_ids, mesas_por_recinto, asignacion):
+    """
+    Mesas de una distribucion donde el votante i ya tiene recinto
+    (recinto_ids[asignacion[i]]) y se reparte parejo entre las
+    mesas_por_recinto de su recinto. Los recintos sin votantes no tienen mesas.
+    Devuelve (filas (recinto_id, numero, cantidad), orden de los votantes
+    para llenarlas, votantes por recinto).
+    """
+    por_recinto = np.bincount(asignacion, minlength=len(recinto_ids))
+    orden = np.argsort(asignacion, kind='stable')
+    filas = []
+    for recinto_id, cantidad, mesas_recinto in zip(recinto_ids, por_recinto.tolist(), mesas_por_recinto):
+        if not cantidad:
+            continue
+        usadas = min(mesas_recinto, cantidad)
+        if usadas < 1:
+            raise ValueError(f'El recinto {recinto_id} tiene votantes y ninguna mesa')
+        filas.extend(
+            (recinto_id, num, tamano) for num, tamano in enumerate(calcular_tamanos(cantidad, usadas), start=1)
+        )
+    return filas, orden, por_recinto
+
+
+def escribir_por_recinto(eleccion, recinto_ids, mesas_por_recinto, asignacion, ids, batch_size=None):
+    """
+    Escribe la distribucion de plan_por_recinto.
+    Devuelve (mesas, votantes por recinto).
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    filas, orden, por_recinto = plan_por_recinto(recinto_ids, mesas_por_recinto, asignacion)
+    mesas = [Mesa(eleccion=eleccion, recinto_id=r, numero=n, cantidad=c) for r, n, c in filas]
+    mesas = escribir_distribucion(eleccion, mesas, [c for _, _, c in filas], _en_bloques(ids[orden]), batch_size)
+    return mesas, por_recinto
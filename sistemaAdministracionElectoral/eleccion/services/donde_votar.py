@@ -0,0 +1,152 @@
+"""
+Indice en memoria "donde voto": votante_id -> mesa y recinto, por eleccion.
+
+Se arma con tres consultas (votantes, mesas, recintos) y queda como arreglos
+numpy ordenados por votante_id; cada busqueda es un searchsorted sin tocar la
+base salvo para leer la version. La version (en la tabla Version, ver
+versiones.py) avisa que el indice quedo viejo, por ejemplo despues de una
+distribucion, y cada proceso lo rearma en la proxima busqueda. Hay una por
+eleccion, asi un cambio en una no obliga a rearmar las demas, y una global
+para cuando no se sabe a que elecciones afecta el cambio. Al estar en la
+base tambien la ven los procesos web cuando el cambio lo hizo el worker de
+procesar_trabajos.
+"""
+import threading
+
+import numpy as np
+
+from eleccion.models import Votante, Mesa, Eleccion
+from eleccion.services.versiones import leer, subir
+
+CLAVE_VERSION = 'donde_votar:version'
+
+
+class IndiceDondeVotar:
+
+    def __init__(self, eleccion_id, version=None):
+        self.eleccion_id = eleccion_id
+        self.version = version
+
+        filas = Votante.objects.filter(eleccion_id=eleccion_id).values_list('votante_id', 'mesa_id')
+        datos = np.array(list(filas), dtype=np.int64).reshape(-1, 2)
+        orden = np.argsort(datos[:, 0], kind='stable')
+        self.votantes = datos[orden, 0]
+
+        mesas = list(
+            Mesa.objects
+            .filter(eleccion_id=eleccion_id)
+            .select_related('recinto')
+            .only('id', 'numero', 'recinto__nombre', 'recinto__latitud', 'recinto__longitud')
+        )
+        self.mesas = [
+            (m.pk, m.numero, m.recinto.pk, m.recinto.nombre, m.recinto.latitud, m.recinto.longitud)
+            for m in mesas
+        ]
+        # posicion en self.mesas de la mesa de cada votante
+        ids_mesas = np.array([m.pk for m in mesas], dtype=np.int64)
+        por_id = np.argsort(ids_mesas)
+        self.mesa_de = por_id[np.searchsorted(ids_mesas[por_id], datos[orden, 1])].astype(np.int32)
+
+    def __len__(self):
+        return len(self.votantes)
+
+    def buscar(self, votante_id):
+        i = int(np.searchsorted(self.votantes, votante_id))
+        if i == len(self.votantes) or self.votantes[i] != votante_id:
+            return None
+        mesa_id, numero, recinto_id, nombre, latitud, longitud = self.mesas[self.mesa_de[i]]
+        return {
+            'votante_id': int(votante_id),
+            'eleccion': self.eleccion_id,
+            'mesa_id': mesa_id,
+            'mesa': numero,
+            'recinto_id': recinto_id,
+            'recinto': nombre,
+            'latitud': latitud,
+            'longitud': longitud,
+        }
+
+
+_indices = {}
+_lock = threading.Lock()
+
+# votante_id y eleccion_id fuera de int64 no pueden estar en la base
+MAXIMO_ID = int(np.iinfo(np.int64).max)
+
+
+def _clave(eleccion_id):
+    return f'{CLAVE_VERSION}:{eleccion_id}'
+
+
+def version_actual(eleccion_id):
+    # (version global, version de la eleccion), en una consulta
+    valores = leer([CLAVE_VERSION, _clave(eleccion_id)])
+    return valores[CLAVE_VERSION], valores[_clave(eleccion_id)]
+
+
+def invalidar_donde_votar(*elecciones, **kwargs):
+    # solo el indice de `elecciones`; sin argumentos, el de todas
+    ids = {int(e) for e in elecciones if e is not None}
+    if ids:
+        subir(*(_clave(e) for e in sorted(ids)))
+    else:
+        subir(CLAVE_VERSION)
+
+
+def invalidar_por_mesa(sender, instance, **kwargs):
+    invalidar_donde_votar(instance.eleccion_id)
+
+
+def invalidar_por_recinto(sender, instance, **kwargs):
+    # nombre y coordenadas del recinto van en el indice de cada eleccion con mesas ahi;
+    # si se borro, sus mesas ya invalidaron al borrarse en cascada
+    elecciones = Mesa.objects.filter(recinto_id=instance.pk).values_list('eleccion_id', flat=True).distinct()
+    elecciones = list(elecciones)
+    if elecciones:
+        invalidar_donde_votar(*elecciones)
+
+
+def invalidar_por_votante(sender, instance, update_fields=None, **kwargs):
+    # marcar el voto no cambia la mesa, no hace falta rearmar nada
+    if update_fields is not None and set(update_fields) <= {'voto'}:
+        return
+    invalidar_donde_votar(instance.eleccion_id)
+
+
+def indice_donde_votar(eleccion_id):
+    """
+    Indice de la eleccion, armado de nuevo si su version cambio. Levanta
+    Eleccion.DoesNotExist si la eleccion no existe, y en ese caso no guarda
+    nada.
+    """
+    eleccion_id = int(eleccion_id)
+    if not 0 < eleccion_id <= MAXIMO_ID:
+        raise Eleccion.DoesNotExist
+    version = version_actual(eleccion_id)
+    indice = _indices.get(eleccion_id)
+    if indice is not None and indice.version == version:
+        return indice
+    with _lock:
+        indice = _indices.get(eleccion_id)
+        if indice is None or indice.version != version:
+            if not Eleccion.objects.filter(pk=eleccion_id).exists():
+                _indices.pop(eleccion_id, None)
+                raise Eleccion.DoesNotExist
+            indice = IndiceDondeVotar(eleccion_id, version)
+            _indices[eleccion_id] = indice
+    return indice
+
+
+def reconstruir_donde_votar(eleccion_id):
+    # llamado al terminar una distribucion: invalida la version y arma el indice local
+    invalidar_donde_votar(eleccion_id)
+    return indice_donde_votar(eleccion_id)
+
+
+def buscar_donde_votar(eleccion_id, votante_id):
+    # None si el votante no esta; Eleccion.DoesNotExist si no existe la eleccion
+    indice = indice_donde_votar(eleccion_id)
+    votante_id = int(votante_id)
+    if not 0 <= votante_id <= MAXIMO_ID:
+        return None
+    return indice.buscar(votante_id)
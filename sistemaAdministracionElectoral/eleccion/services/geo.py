@@ -0,0 +1,202 @@
+"""
+Asignacion de votantes al recinto mas cercano con capacidad.
+
+Las coordenadas se proyectan a un plano equirectangular (longitud escalada por
+el coseno de la latitud media), suficiente para comparar distancias dentro de
+un pais. Los recintos se indexan en una grilla regular; cada votante solo mide
+distancia contra los recintos de su celda y las 8 vecinas, y todo se calcula
+con numpy por bloques de votantes.
+"""
+import numpy as np
+
+# recintos promedio por celda de la grilla
+RECINTOS_POR_CELDA = 4
+# candidatos que se guardan por votante, en orden de cercania
+K_CANDIDATOS = 8
+# tope de elementos de las matrices de distancia por bloque
+ELEMENTOS_POR_BLOQUE = 4_000_000
+
+
+def proyectar(latitud, longitud, lat_ref):
+    latitud = np.asarray(latitud, dtype=np.float64)
+    longitud = np.asarray(longitud, dtype=np.float64)
+    x = longitud * np.cos(np.radians(lat_ref))
+    return x, latitud
+
+
+class IndiceGrilla:
+    """
+    Grilla regular sobre un conjunto de puntos. Para cada celda guarda, en una
+    tabla rellenada con -1, los puntos de la celda y de sus 8 vecinas.
+    """
+
+    def __init__(self, x, y, por_celda=RECINTOS_POR_CELDA):
+        self.x = x
+        self.y = y
+        n = len(x)
+        self.xmin, self.ymin = float(x.min()), float(y.min())
+        ancho = max(float(x.max()) - self.xmin, 1e-9)
+        alto = max(float(y.max()) - self.ymin, 1e-9)
+        self.celda = max(np.sqrt(ancho * alto * por_celda / n), 1e-9)
+        self.nx = int(ancho // self.celda) + 1
+        self.ny = int(alto // self.celda) + 1
+
+        celdas = self.celda_de(x, y)
+        self.orden = np.argsort(celdas, kind='stable')
+        cuentas = np.bincount(celdas, minlength=self.nx * self.ny)
+        inicios = np.concatenate(([0], np.cumsum(cuentas)[:-1]))
+        self.tabla = self._armar_tabla(cuentas, inicios)
+
+    def celda_de(self, x, y):
+        cx = np.clip(((x - self.xmin) // self.celda).astype(np.int64), 0, self.nx - 1)
+        cy = np.clip(((y - self.ymin) // self.celda).astype(np.int64), 0, self.ny - 1)
+        return cy * self.nx + cx
+
+    def _armar_tabla(self, cuentas, inicios):
+        total = self.nx * self.ny
+        cx = np.arange(total) % self.nx
+        cy = np.arange(total) // self.nx
+        vecinas = []
+        for dy in (-1, 0, 1):
+            for dx in (-1, 0, 1):
+                vx, vy = cx + dx, cy + dy
+                valida = (vx >= 0) & (vx < self.nx) & (vy >= 0) & (vy < self.ny)
+                vecina = np.where(valida, vy * self.nx + vx, 0)
+                vecinas.append((vecina, np.where(valida, cuentas[vecina], 0)))
+
+        ancho = int(sum(c for _, c in vecinas).max())
+        tabla = np.full((total, max(ancho, 1)), -1, dtype=np.int64)
+        llenos = np.zeros(total, dtype=np.int64)
+        for vecina, cuenta in vecinas:
+            inicio = inicios[vecina]
+            for j in range(int(cuenta.max())):
+                m = cuenta > j
+                tabla[m, llenos[m]] = self.orden[inicio[m] + j]
+                llenos[m] += 1
+        return tabla
+
+    def candidatos(self, x, y, k=K_CANDIDATOS):
+        """
+        Devuelve (indices, distancias², exacto) de los k puntos mas cercanos
+        entre la celda y sus vecinas. `exacto` indica que el primero es
+        seguro el mas cercano de todo el conjunto.
+        """
+        tabla = self.tabla[self.celda_de(x, y)]
+        validos = tabla >= 0
+        seguro = np.where(validos, tabla, 0)
+        d2 = (self.x[seguro] - x[:, None]) ** 2 + (self.y[seguro] - y[:, None]) ** 2
+        d2[~validos] = np.inf
+        indices, d2 = _k_menores(tabla, d2, k)
+        exacto = d2[:, 0] <= self.celda ** 2
+        return indices, d2, exacto
+
+
+def _k_menores(indices, d2, k):
+    k = min(k, d2.shape[1])
+    if k < d2.shape[1]:
+        parte = np.argpartition(d2, k - 1, axis=1)[:, :k]
+    else:
+        parte = np.broadcast_to(np.arange(d2.shape[1]), d2.shape)
+    d2 = np.take_along_axis(d2, parte, axis=1)
+    indices = np.take_along_axis(indices, parte, axis=1)
+    orden = np.argsort(d2, axis=1)
+    d2 = np.take_along_axis(d2, orden, axis=1)
+    indices = np.take_along_axis(indices, orden, axis=1)
+    indices[np.isinf(d2)] = -1
+    return indices, d2
+
+
+def _fuerza_bruta(x, y, px, py, disponibles, k=K_CANDIDATOS):
+    # k mas cercanos entre los puntos `disponibles`, por bloques de votantes
+    ax, ay = px[disponibles], py[disponibles]
+    bloque = max(1, ELEMENTOS_POR_BLOQUE // max(len(disponibles), 1))
+    todos_i, todos_d = [], []
+    for i in range(0, len(x), bloque):
+        bx, by = x[i:i + bloque], y[i:i + bloque]
+        d2 = (ax[None, :] - bx[:, None]) ** 2 + (ay[None, :] - by[:, None]) ** 2
+        indices = np.broadcast_to(disponibles, d2.shape)
+        indices, d2 = _k_menores(indices, d2, k)
+        todos_i.append(indices)
+        todos_d.append(d2)
+    return np.vstack(todos_i), np.vstack(todos_d)
+
+
+def _asignar_por_rondas(pendientes, candidatos, d2, capacidad, asignacion):
+    """
+    Ronda r: cada votante pendiente pide su r-esimo candidato. Cada recinto
+    acepta, de los que lo piden, a los mas cercanos hasta llenar su capacidad.
+    `candidatos`/`d2` estan alineados con `pendientes`.
+    Devuelve las posiciones (en `pendientes`) que quedaron sin recinto.
+    """
+    abiertos = np.arange(len(pendientes))
+    for r in range(candidatos.shape[1]):
+        if not len(abiertos):
+            break
+        rec = candidatos[abiertos, r]
+        validos = rec >= 0
+        validos[validos] = capacidad[rec[validos]] > 0
+        if validos.any():
+            pos, rec = abiertos[validos], rec[validos]
+            orden = np.lexsort((d2[pos, r], rec))
+            pos, rec = pos[orden], rec[orden]
+            rango = np.arange(len(rec)) - np.searchsorted(rec, rec, side='left')
+            acepta = rango < capacidad[rec]
+            asignacion[pendientes[pos[acepta]]] = rec[acepta]
+            capacidad -= np.bincount(rec[acepta], minlength=len(capacidad))
+        abiertos = abiertos[asignacion[pendientes[abiertos]] < 0]
+    return abiertos
+
+
+def asignar_mas_cercano(lat, lon, rec_lat, rec_lon, capacidad, k=K_CANDIDATOS):
+    """
+    Asigna cada votante (lat, lon) al recinto mas cercano que aun tenga lugar.
+    Devuelve un arreglo con el indice de recinto de cada votante.
+    Lanza ValueError si la capacidad total no alcanza.
+    """
+    capacidad = np.array(capacidad, dtype=np.int64)
+    n = len(lat)
+    if capacidad.sum() < n:
+        raise ValueError('La capacidad de los recintos no alcanza para todos los votantes')
+
+    lat_ref = float(np.mean(rec_lat))
+    x, y = proyectar(lat, lon, lat_ref)
+    px, py = proyectar(rec_lat, rec_lon, lat_ref)
+    indice = IndiceGrilla(px, py)
+
+    asignacion = np.full(n, -1, dtype=np.int64)
+    bloque = max(1, ELEMENTOS_POR_BLOQUE // indice.tabla.shape[1])
+    partes_i, partes_d = [], []
+    for i in range(0, n, bloque):
+        indices, d2, exacto = indice.candidatos(x[i:i + bloque], y[i:i + bloque], k)
+        if not exacto.all():
+            # el mas cercano puede estar fuera de las celdas vecinas
+            inexactos = np.flatnonzero(~exacto) + i
+            bi, bd = _fuerza_bruta(x[inexactos], y[inexactos], px, py, np.arange(len(px)), k)
+            indices = _rellenar(indices, bi.shape[1])
+            d2 = _rellenar(d2, bd.shape[1], np.inf)
+            indices[~exacto] = bi
+            d2[~exacto] = bd
+        partes_i.append(_rellenar(indices, k))
+        partes_d.append(_rellenar(d2, k, np.inf))
+
+    pendientes = np.arange(n)
+    sin_lugar = _asignar_por_rondas(
+        pendientes, np.vstack(partes_i), np.vstack(partes_d), capacidad, asignacion
+    )
+    pendientes = pendientes[sin_lugar]
+
+    # los que quedaron afuera buscan entre los recintos que todavia tienen lugar
+    while len(pendientes):
+        disponibles = np.flatnonzero(capacidad > 0)
+        indices, d2 = _fuerza_bruta(x[pendientes], y[pendientes], px, py, disponibles, k)
+        sin_lugar = _asignar_por_rondas(pendientes, indices, d2, capacidad, asignacion)
+        pendientes = pendientes[sin_lugar]
+
+    return asignacion
+
+
+def _rellenar(matriz, ancho, valor=-1):
+    if matriz.shape[1] >= ancho:
+        return matriz
+    extra = np.full((matriz.shape[0], ancho - matriz.shape[1]), valor, dtype=matriz.dtype)
+    return np.hstack((matriz, extra))
@@ -0,0 +1,386 @@
+"""
+Importacion y exportacion de secciones y recintos como GeoJSON.
+
+La lectura es incremental: de un FeatureCollection se decodifica un Feature
+a la vez sin cargar el documento completo, y tambien se acepta una
+secuencia de Features, uno por linea (GeoJSONSeq / NDJSON). Las filas se
+escriben por lotes, cada lote en su propia transaccion, asi la memoria
+queda acotada por el lote y no por el archivo. Si un Feature es invalido
+los lotes anteriores ya quedaron guardados; el error dice cuantos.
+
+La exportacion es un generador de texto pensado para StreamingHttpResponse.
+"""
+import codecs
+import json
+import re
+
+import numpy as np
+
+from django.conf import settings
+from django.db import transaction
+
+from eleccion.models import Seccion, Punto, Recinto, SeccionSimplificada
+from eleccion.services.ingesta import FormatoInvalido
+from eleccion.services.simplificacion import niveles_de
+from eleccion.services.poligonos import invalidar_indices
+from eleccion.services.papeleta import invalidar_papeletas
+from eleccion.services.donde_votar import invalidar_donde_votar
+from eleccion.services.versiones import subir_version
+
+BYTES_POR_LECTURA = 1 << 16
+# features por transaccion, se puede cambiar en settings
+LOTE_DEFECTO = 500
+# un lote entero se tiene en memoria y en una transaccion
+LOTE_MAXIMO = 10000
+
+CONTENT_TYPES_SECUENCIA = ('application/geo+json-seq', 'application/x-ndjson', 'application/ndjson')
+_INICIO_FEATURES = re.compile(r'"features"\s*:\s*\[')
+_SEPARADORES = re.compile(r'[\s,]*')
+
+
+def get_lote(lote=None):
+    # None o '' usan el de settings; cualquier otro valor, un entero entre 1 y LOTE_MAXIMO
+    if lote is None or lote == '':
+        return getattr(settings, 'GEOJSON_LOTE', LOTE_DEFECTO)
+    try:
+        lote = int(lote)
+    except (TypeError, ValueError):
+        lote = 0
+    if not 1 <= lote <= LOTE_MAXIMO:
+        raise FormatoInvalido(f'lote debe ser un entero entre 1 y {LOTE_MAXIMO}')
+    return lote
+
+
+def es_secuencia(request):
+    return request.content_type.split(';')[0].strip().lower() in CONTENT_TYPES_SECUENCIA
+
+
+class _Lector:
+    # texto de un stream binario, leyendo de a pedazos y sin cortar caracteres utf-8
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.decoder = codecs.getincrementaldecoder('utf-8')()
+        self.fin = stream is None
+
+    def leer(self, n=BYTES_POR_LECTURA):
+        if self.fin:
+            return ''
+        datos = self.stream.read(n)
+        if not datos:
+            self.fin = True
+            return self.decoder.decode(b'', final=True)
+        if isinstance(datos, str):
+            return datos
+        return self.decoder.decode(datos)
+
+
+def leer_features(stream, secuencia=False):
+    """
+    Genera los Features (dicts) de `stream`. Con secuencia=True cada linea
+    es un Feature (se ignora el separador RS de GeoJSONSeq); si no, el
+    stream es un FeatureCollection y se recorre su arreglo "features".
+    """
+    if secuencia:
+        yield from _leer_secuencia(stream)
+        return
+
+    lector = _Lector(stream)
+    decoder = json.JSONDecoder()
+    buffer = ''
+    while True:
+        inicio = _INICIO_FEATURES.search(buffer)
+        if inicio:
+            break
+        if lector.fin:
+            raise FormatoInvalido('No es un FeatureCollection con "features"')
+        # se guarda la cola por si la clave quedo cortada entre dos lecturas
+        buffer = buffer[-32:] + lector.leer()
+    pos = inicio.end()
+
+    num = 0
+    while True:
+        pos = _SEPARADORES.match(buffer, pos).end()
+        if pos == len(buffer):
+            if lector.fin:
+                raise FormatoInvalido(f'FeatureCollection incompleto despues del feature {num}')
+            buffer, pos = lector.leer(), 0
+            continue
+        if buffer[pos] == ']':
+            return
+        try:
+            feature, fin = decoder.raw_decode(buffer, pos)
+        except json.JSONDecodeError:
+            if lector.fin:
+                raise FormatoInvalido(f'Feature {num + 1} no es JSON válido')
+            # feature incompleto: se lee al menos lo mismo que ya hay, asi
+            # un feature enorme no se intenta decodificar muchas veces
+            buffer = buffer[pos:]
+            buffer, pos = buffer + lector.leer(max(BYTES_POR_LECTURA, len(buffer))), 0
+            continue
+        num += 1
+        yield feature
+        pos = fin
+        if pos > BYTES_POR_LECTURA:
+            buffer, pos = buffer[pos:], 0
+
+
+def _leer_secuencia(stream):
+    lector = _Lector(stream)
+    pendiente = ''
+    num = 0
+    while True:
+        texto = lector.leer()
+        lineas = (pendiente + texto).split('\n')
+        pendiente = lineas.pop() if not lector.fin else ''
+        for linea in lineas:
+            linea = linea.strip().lstrip('\x1e')
+            if not linea:
+                continue
+            num += 1
+            try:
+                yield json.loads(linea)
+            except ValueError:
+                raise FormatoInvalido(f'Feature {num} no es JSON válido')
+        if lector.fin:
+            return
+
+
+def _lotes(iterable, n):
+    lote = []
+    for elemento in iterable:
+        lote.append(elemento)
+        if len(lote) >= n:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _anillo(num, geometria):
+    """
+    Anillo exterior de un Polygon (o del MultiPolygon mas grande) como
+    (latitudes, longitudes), sin repetir el vertice de cierre.
+    """
+    tipo = geometria.get('type') if isinstance(geometria, dict) else None
+    if tipo not in ('Polygon', 'MultiPolygon'):
+        raise FormatoInvalido(f'Feature {num}: la geometría debe ser Polygon o MultiPolygon')
+    try:
+        if tipo == 'Polygon':
+            anillo = geometria['coordinates'][0]
+        else:
+            anillo = max((p[0] for p in geometria['coordinates']), key=len)
+        coordenadas = np.array([c[:2] for c in anillo], dtype=np.float64).reshape(-1, 2)
+    except (KeyError, IndexError, TypeError, ValueError):
+        raise FormatoInvalido(f'Feature {num}: geometría inválida')
+    if len(coordenadas) > 1 and (coordenadas[0] == coordenadas[-1]).all():
+        coordenadas = coordenadas[:-1]
+    if len(coordenadas) < 3:
+        raise FormatoInvalido(f'Feature {num}: el polígono necesita al menos 3 vértices')
+    return coordenadas[:, 1], coordenadas[:, 0]
+
+
+def _propiedades(num, feature):
+    if not isinstance(feature, dict) or feature.get('type') != 'Feature':
+        raise FormatoInvalido(f'Feature {num}: no es un Feature')
+    propiedades = feature.get('properties') or {}
+    if not propiedades.get('nombre'):
+        raise FormatoInvalido(f'Feature {num}: falta la propiedad nombre')
+    return propiedades
+
+
+def importar_secciones(features, lote=None, simplificar=True):
+    """
+    Crea o actualiza (por nombre) una Seccion por Feature. Propiedades:
+    nombre, tipo (opcional). Devuelve {features, creadas, actualizadas}.
+    Calcular los niveles simplificados es la mayor parte del costo; con
+    simplificar=False se dejan para manage.py simplificar_secciones.
+    """
+    resumen = {'features': 0, 'creadas': 0, 'actualizadas': 0}
+    empaquetar = getattr(settings, 'SECCION_POLIGONO_EMPAQUETADO', True)
+    try:
+        for bloque in _lotes(enumerate(features, start=1), get_lote(lote)):
+            # si un nombre se repite en el lote gana el ultimo
+            filas = {}
+            for num, feature in bloque:
+                propiedades = _propiedades(num, feature)
+                filas[str(propiedades['nombre'])] = (propiedades.get('tipo'), *_anillo(num, feature.get('geometry')))
+
+            with transaction.atomic():
+                existentes = Seccion.objects.in_bulk(list(filas), field_name='nombre')
+                nuevas, actualizadas = [], []
+                for nombre, (tipo, latitudes, longitudes) in filas.items():
+                    seccion = existentes.get(nombre) or Seccion(nombre=nombre)
+                    if tipo is not None:
+                        seccion.tipo = tipo
+                    if empaquetar:
+                        seccion.set_poligono(latitudes.tolist(), longitudes.tolist())
+                    else:
+                        seccion.poligono = None
+                    (actualizadas if seccion.pk else nuevas).append(seccion)
+                Seccion.objects.bulk_create(nuevas)
+                Seccion.objects.bulk_update(actualizadas, ['tipo', 'poligono'])
+
+                secciones = nuevas + actualizadas
+                Punto.objects.filter(seccion__in=actualizadas).delete()
+                SeccionSimplificada.objects.filter(seccion__in=actualizadas).delete()
+                puntos, niveles = [], []
+                for seccion in secciones:
+                    _, latitudes, longitudes = filas[seccion.nombre]
+                    vertices = list(zip(latitudes.tolist(), longitudes.tolist()))
+                    if not empaquetar:
+                        puntos.extend(Punto(seccion=seccion, latitud=lat, longitud=lng) for lat, lng in vertices)
+                    if simplificar:
+                        niveles.extend(niveles_de(seccion, vertices))
+                Punto.objects.bulk_create(puntos, batch_size=5000)
+                SeccionSimplificada.objects.bulk_create(niveles, batch_size=500)
+
+                # bulk_create no dispara señales
+                transaction.on_commit(invalidar_indices)
+                transaction.on_commit(invalidar_papeletas)
+                transaction.on_commit(lambda: subir_version(Seccion))
+
+            resumen['features'] += len(bloque)
+            resumen['creadas'] += len(nuevas)
+            resumen['actualizadas'] += len(actualizadas)
+    except FormatoInvalido as e:
+        e.resumen = resumen
+        raise
+    return resumen
+
+
+def importar_recintos(features, lote=None):
+    """
+    Crea o actualiza (por nombre) un Recinto por Feature de tipo Point.
+    Propiedades: nombre, seccion (id) o seccion_nombre.
+    Devuelve {features, creados, actualizados}.
+    """
+    resumen = {'features': 0, 'creados': 0, 'actualizados': 0}
+    try:
+        for bloque in _lotes(enumerate(features, start=1), get_lote(lote)):
+            filas = {}
+            for num, feature in bloque:
+                propiedades = _propiedades(num, feature)
+                try:
+                    geometria = feature['geometry']
+                    if geometria['type'] != 'Point':
+                        raise ValueError
+                    longitud, latitud = (float(c) for c in geometria['coordinates'][:2])
+                except (KeyError, IndexError, TypeError, ValueError):
+                    raise FormatoInvalido(f'Feature {num}: la geometría debe ser un Point válido')
+                seccion_id = propiedades.get('seccion')
+                try:
+                    seccion_id = None if seccion_id is None else int(seccion_id)
+                except (TypeError, ValueError):
+                    raise FormatoInvalido(f'Feature {num}: seccion debe ser un id')
+                filas[str(propiedades['nombre'])] = (
+                    num, latitud, longitud, seccion_id, propiedades.get('seccion_nombre')
+                )
+
+            with transaction.atomic():
+                por_nombre = Seccion.objects.in_bulk(
+                    [f[4] for f in filas.values() if f[4]], field_name='nombre'
+                )
+                validas = set(Seccion.objects.filter(
+                    pk__in=[f[3] for f in filas.values() if f[3] is not None]
+                ).values_list('pk', flat=True))
+                existentes = Recinto.objects.in_bulk(list(filas), field_name='nombre')
+                nuevos, actualizados = [], []
+                for nombre, (num, latitud, longitud, seccion_id, seccion_nombre) in filas.items():
+                    if seccion_nombre:
+                        if seccion_nombre not in por_nombre:
+                            raise FormatoInvalido(f'Feature {num}: no existe la sección {seccion_nombre}')
+                        seccion_id = por_nombre[seccion_nombre].pk
+                    elif seccion_id is not None and seccion_id not in validas:
+                        raise FormatoInvalido(f'Feature {num}: no existe la sección {seccion_id}')
+                    recinto = existentes.get(nombre) or Recinto(nombre=nombre)
+                    recinto.latitud, recinto.longitud = latitud, longitud
+                    if seccion_id is not None:
+                        recinto.seccion_id = seccion_id
+                    (actualizados if recinto.pk else nuevos).append(recinto)
+                Recinto.objects.bulk_create(nuevos)
+                Recinto.objects.bulk_update(actualizados, ['latitud', 'longitud', 'seccion'])
+                transaction.on_commit(invalidar_donde_votar)
+                transaction.on_commit(lambda: subir_version(Recinto))
+
+            resumen['features'] += len(bloque)
+            resumen['creados'] += len(nuevos)
+            resumen['actualizados'] += len(actualizados)
+    except FormatoInvalido as e:
+        e.resumen = resumen
+        raise
+    return resumen
+
+
+def _coleccion(features):
+    yield '{"type":"FeatureCollection","features":['
+    separador = ''
+    for feature in features:
+        yield separador + json.dumps(feature, separators=(',', ':'), ensure_ascii=False)
+        separador = ','
+    yield ']}\n'
+
+
+def _cerrar(coordenadas):
+    # [[lat, lng], ...] -> anillo GeoJSON [[lng, lat], ..., primero]
+    if not len(coordenadas):
+        return None
+    anillo = coordenadas[:, ::-1].tolist()
+    anillo.append(anillo[0])
+    return {'type': 'Polygon', 'coordinates': [anillo]}
+
+
+def exportar_secciones(secciones, nivel=None, lote=None):
+    """
+    Genera el FeatureCollection de `secciones` de a pedazos de texto. Con
+    `nivel` se exporta el poligono simplificado a esa tolerancia cuando existe.
+    Hace pocas consultas por lote de secciones, nunca una por seccion.
+    """
+    return _coleccion(_features_secciones(secciones, nivel, get_lote(lote)))
+
+
+def _features_secciones(secciones, nivel, lote):
+    filas = secciones.order_by('pk').values_list('id', 'nombre', 'tipo', 'poligono').iterator(chunk_size=lote)
+    for bloque in _lotes(filas, lote):
+        ids = [f[0] for f in bloque]
+        simplificadas = {}
+        if nivel is not None:
+            simplificadas = dict(
+                SeccionSimplificada.objects.filter(seccion_id__in=ids, tolerancia=nivel)
+                .values_list('seccion_id', 'poligono')
+            )
+        sueltos = {}
+        sin_blob = [f[0] for f in bloque if f[3] is None]
+        if sin_blob:
+            for seccion_id, lat, lng in (
+                Punto.objects.filter(seccion_id__in=sin_blob).order_by('seccion_id', 'id')
+                .values_list('seccion_id', 'latitud', 'longitud')
+            ):
+                sueltos.setdefault(seccion_id, []).append((lat, lng))
+
+        for seccion_id, nombre, tipo, poligono in bloque:
+            blob = simplificadas.get(seccion_id, poligono)
+            if blob is not None:
+                coordenadas = np.frombuffer(bytes(blob), dtype='<f8').reshape(-1, 2)
+            else:
+                coordenadas = np.array(sueltos.get(seccion_id, []), dtype=np.float64).reshape(-1, 2)
+            yield {
+                'type': 'Feature',
+                'id': seccion_id,
+                'properties': {'nombre': nombre, 'tipo': tipo},
+                'geometry': _cerrar(coordenadas),
+            }
+
+
+def exportar_recintos(recintos, lote=None):
+    filas = (
+        recintos.order_by('pk')
+        .values_list('id', 'nombre', 'latitud', 'longitud', 'seccion_id')
+        .iterator(chunk_size=get_lote(lote))
+    )
+    return _coleccion({
+        'type': 'Feature',
+        'id': recinto_id,
+        'properties': {'nombre': nombre, 'seccion': seccion_id},
+        'geometry': {'type': 'Point', 'coordinates': [longitud, latitud]},
+    } for recinto_id, nombre, latitud, longitud, seccion_id in filas)
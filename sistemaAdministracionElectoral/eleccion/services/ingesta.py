@@ -0,0 +1,227 @@
+"""
+Lectura incremental de listas de votantes enviadas en el cuerpo del request.
+
+Formatos soportados (segun Content-Type):
+  application/x-ndjson      un id por linea, o un objeto {"votante_id": n}
+  text/csv                  el id en la primera columna, el encabezado es opcional
+  application/octet-stream  arreglo de enteros little-endian de 4 bytes
+                            (8 bytes con ?ancho=8)
+
+El cuerpo nunca se carga entero en memoria: se lee en bloques de
+CHUNK_BYTES y los ids se guardan en un archivo temporal como arreglo binario,
+asi se conoce el total antes de repartir.
+"""
+import codecs
+import csv
+import json
+import sys
+import tempfile
+from array import array
+
+import numpy as np
+
+CHUNK_BYTES = 64 * 1024
+# ids que se devuelven por cada lectura del archivo temporal
+CHUNK_IDS = 8192
+
+FORMATOS = {
+    'application/x-ndjson': 'ndjson',
+    'application/ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'text/csv': 'csv',
+    'application/octet-stream': 'binario',
+}
+
+
+class FormatoInvalido(ValueError):
+    pass
+
+
+def formato_stream(request):
+    # None si el request es el JSON de siempre
+    content_type = request.content_type.split(';')[0].strip().lower()
+    return FORMATOS.get(content_type)
+
+
+def _bloques(stream):
+    while True:
+        bloque = stream.read(CHUNK_BYTES)
+        if not bloque:
+            return
+        yield bloque
+
+
+def _lineas(stream):
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    resto = ''
+    for bloque in _bloques(stream):
+        texto = resto + decoder.decode(bloque)
+        lineas = texto.split('\n')
+        resto = lineas.pop()
+        yield from lineas
+    resto += decoder.decode(b'', final=True)
+    if resto:
+        yield resto
+
+
+def leer_ndjson(stream):
+    for num, linea in enumerate(_lineas(stream), start=1):
+        linea = linea.strip()
+        if not linea:
+            continue
+        try:
+            valor = json.loads(linea)
+            if isinstance(valor, dict):
+                valor = valor.get('votante_id', valor.get('id'))
+            yield int(valor)
+        except (ValueError, TypeError):
+            raise FormatoInvalido(f'Linea {num} no es un id de votante válido')
+
+
+def leer_csv(stream):
+    for num, fila in enumerate(csv.reader(_lineas(stream)), start=1):
+        if not fila or not fila[0].strip():
+            continue
+        try:
+            yield int(fila[0])
+        except ValueError:
+            if num == 1:
+                # encabezado
+                continue
+            raise FormatoInvalido(f'Fila {num} no es un id de votante válido')
+
+
+def leer_binario(stream, ancho=4):
+    if ancho not in (4, 8):
+        raise FormatoInvalido('ancho debe ser 4 u 8')
+    tipo = 'i' if ancho == 4 else 'q'
+    resto = b''
+    for bloque in _bloques(stream):
+        bloque = resto + bloque
+        corte = len(bloque) - len(bloque) % ancho
+        resto = bloque[corte:]
+        valores = array(tipo)
+        valores.frombytes(bloque[:corte])
+        if sys.byteorder == 'big':
+            valores.byteswap()
+        yield from valores
+    if resto:
+        raise FormatoInvalido('El cuerpo no es múltiplo del ancho de los enteros')
+
+
+def leer_votantes(stream, formato, ancho=4):
+    if stream is None:
+        return iter(())
+    if formato == 'ndjson':
+        return leer_ndjson(stream)
+    if formato == 'csv':
+        return leer_csv(stream)
+    if formato == 'binario':
+        return leer_binario(stream, ancho)
+    raise FormatoInvalido(f'Formato {formato} no soportado')
+
+
+class VotantesEnDisco:
+    """
+    Guarda los ids en un archivo temporal como int64 y permite recorrerlos
+    las veces que haga falta leyendo de a CHUNK_IDS.
+    Uso:
+        with VotantesEnDisco(leer_votantes(...)) as votantes:
+            votantes.total
+            for vid in votantes: ...
+    """
+
+    def __init__(self, ids):
+        self.archivo = tempfile.TemporaryFile()
+        self.total = 0
+        lote = array('q')
+        for vid in ids:
+            lote.append(vid)
+            if len(lote) >= CHUNK_IDS:
+                self._escribir(lote)
+                lote = array('q')
+        if lote:
+            self._escribir(lote)
+
+    def _escribir(self, lote):
+        lote.tofile(self.archivo)
+        self.total += len(lote)
+
+    def chunks(self):
+        self.archivo.seek(0)
+        itemsize = array('q').itemsize
+        while True:
+            datos = self.archivo.read(CHUNK_IDS * itemsize)
+            if not datos:
+                return
+            lote = array('q')
+            lote.frombytes(datos)
+            yield lote
+
+    def __iter__(self):
+        for lote in self.chunks():
+            yield from lote
+
+    def arreglo(self):
+        # todos los ids como un arreglo numpy int64, leido de una vez del archivo
+        self.archivo.seek(0)
+        return np.fromfile(self.archivo, dtype=np.int64, count=self.total)
+
+    def __len__(self):
+        return self.total
+
+    def close(self):
+        self.archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def leer_votantes_geo(stream, formato):
+    """
+    Igual que leer_votantes pero cada votante trae coordenadas, devuelve
+    tuplas (votante_id, latitud, longitud).
+      NDJSON: {"votante_id": n, "latitud": x, "longitud": y}
+      CSV:    votante_id,latitud,longitud
+    """
+    if stream is None:
+        return
+    if formato == 'ndjson':
+        for num, linea in enumerate(_lineas(stream), start=1):
+            linea = linea.strip()
+            if not linea:
+                continue
+            try:
+                valor = json.loads(linea)
+                yield int(valor['votante_id']), float(valor['latitud']), float(valor['longitud'])
+            except (ValueError, TypeError, KeyError):
+                raise FormatoInvalido(f'Linea {num} no es un votante con coordenadas válido')
+    elif formato == 'csv':
+        for num, fila in enumerate(csv.reader(_lineas(stream)), start=1):
+            if not fila or not fila[0].strip():
+                continue
+            try:
+                yield int(fila[0]), float(fila[1]), float(fila[2])
+            except (ValueError, IndexError):
+                if num == 1:
+                    continue
+                raise FormatoInvalido(f'Fila {num} no es un votante con coordenadas válido')
+    else:
+        raise FormatoInvalido(f'Formato {formato} no soportado con coordenadas')
+
+
+def parsear_recintos(valor):
+    # "3:2,5:4:900" -> [{'recinto': 3, 'mesas': 2}, {'recinto': 5, 'mesas': 4, 'capacidad': 900}]
+    recintos = []
+    for par in filter(None, (p.strip() for p in valor.split(','))):
+        partes = [int(p) for p in par.split(':')]
+        if len(partes) not in (2, 3):
+            raise ValueError(par)
+        recinto = {'recinto': partes[0], 'mesas': partes[1]}
+        if len(partes) == 3:
+            recinto['capacidad'] = partes[2]
+        recintos.append(recinto)
+    return recintos
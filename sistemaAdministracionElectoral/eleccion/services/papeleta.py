@@ -0,0 +1,64 @@
+"""
+Cache de la papeleta ya renderizada por (cargo, eleccion).
+
+Se guardan los bytes JSON listos para enviar junto con su ETag. Cualquier
+cambio en candidaturas, cargos, elecciones o secciones sube la version y deja
+todas las papeletas viejas sin uso. La version vive en la tabla Version
+(versiones.py), asi un cambio hecho por el worker de procesar_trabajos o por
+otro proceso web tambien deja viejas las papeletas que tiene cada proceso en
+su cache. Los bytes si quedan en la cache de cada proceso: su clave lleva la
+version.
+"""
+import hashlib
+
+from django.core.cache import cache, caches, DEFAULT_CACHE_ALIAS
+from django.core.cache.backends.locmem import LocMemCache
+
+from eleccion.services.versiones import leer, aleer, subir
+
+CLAVE_VERSION = 'papeleta:version'
+
+
+def _version():
+    return leer([CLAVE_VERSION])[CLAVE_VERSION]
+
+
+def _clave(version, cargo_id, eleccion_id, variante):
+    return f'papeleta:{version}:{cargo_id}:{eleccion_id}:{variante}'
+
+
+def invalidar_papeletas(**kwargs):
+    subir(CLAVE_VERSION)
+
+
+def calcular_etag(contenido):
+    return '"%s"' % hashlib.sha1(contenido).hexdigest()
+
+
+def papeleta_renderizada(cargo_id, eleccion_id, renderizar, variante=None):
+    """
+    Devuelve (contenido, etag). `renderizar` se llama solo si no esta en cache
+    y debe devolver los bytes JSON de la papeleta. `variante` separa
+    renderizados distintos de la misma papeleta (p. ej. nivel de detalle).
+    """
+    clave = _clave(_version(), cargo_id, eleccion_id, variante)
+    guardado = cache.get(clave)
+    if guardado is None:
+        contenido = renderizar()
+        guardado = (contenido, calcular_etag(contenido))
+        cache.set(clave, guardado, None)
+    return guardado
+
+
+def papeleta_guardada(cargo_id, eleccion_id, variante=None):
+    # lo que papeleta_renderizada tiene en cache, (contenido, etag), o None
+    return cache.get(_clave(_version(), cargo_id, eleccion_id, variante))
+
+
+async def apapeleta_guardada(cargo_id, eleccion_id, variante=None):
+    version = (await aleer([CLAVE_VERSION]))[CLAVE_VERSION]
+    clave = _clave(version, cargo_id, eleccion_id, variante)
+    if isinstance(caches[DEFAULT_CACHE_ALIAS], LocMemCache):
+        # un dict del proceso: no bloquea, y aget() pasaria por el hilo de sync_to_async
+        return cache.get(clave)
+    return await cache.aget(clave)
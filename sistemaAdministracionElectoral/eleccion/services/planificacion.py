@@ -0,0 +1,89 @@
+"""
+Planificacion de la cantidad de mesas de cada recinto.
+
+En vez de elegir a mano cuantas mesas tiene cada recinto, se fija un maximo
+de votantes por mesa y topes por recinto (capacidad en votantes y/o
+mesas_max) y la cantidad de mesas sale de los votantes que le tocan a cada
+recinto: los que se le pasan contados o los que quedan mas cerca de el segun
+sus coordenadas. Todo es aritmetica sobre arreglos, miles de recintos se
+planifican de una vez.
+"""
+import numpy as np
+
+from eleccion.services.geo import asignar_mas_cercano
+from eleccion.services.distribucion import escribir_por_recinto
+
+
+def topes(recintos, max_por_mesa):
+    """
+    Votantes que puede recibir cada recinto: el menor entre su capacidad y
+    mesas_max * max_por_mesa; sin ninguno de los dos no tiene tope (-1).
+    """
+    sin_tope = np.iinfo(np.int64).max
+    capacidad = np.array([r.get('capacidad') or sin_tope for r in recintos], dtype=np.int64)
+    por_mesas = np.array([
+        r['mesas_max'] * max_por_mesa if r.get('mesas_max') else sin_tope for r in recintos
+    ], dtype=np.int64)
+    tope = np.minimum(capacidad, por_mesas)
+    return np.where(tope == sin_tope, -1, tope)
+
+
+def planificar_mesas(votantes, max_por_mesa, tope=None):
+    """
+    Mesas por recinto para `votantes` (votantes por recinto) con a lo sumo
+    `max_por_mesa` por mesa. Lo que pasa el `tope` de un recinto queda como
+    excedente. Devuelve un dict de arreglos: votantes, mesas, por_mesa_min,
+    por_mesa_max y excedente.
+    """
+    votantes = np.asarray(votantes, dtype=np.int64)
+    if tope is None:
+        tope = np.full(len(votantes), -1, dtype=np.int64)
+    atendidos = np.where(tope < 0, votantes, np.minimum(votantes, tope))
+    mesas = -(-atendidos // max_por_mesa)
+    divisor = np.maximum(mesas, 1)
+    return {
+        'votantes': atendidos,
+        'mesas': mesas,
+        'por_mesa_min': atendidos // divisor,
+        'por_mesa_max': -(-atendidos // divisor),
+        'excedente': votantes - atendidos,
+    }
+
+
+def planificar_por_cercania(recintos, latitudes, longitudes, max_por_mesa):
+    """
+    Asigna cada votante al recinto mas cercano que no paso su tope y
+    planifica las mesas con esa carga. Devuelve (plan, asignacion).
+    """
+    tope = topes(recintos, max_por_mesa)
+    capacidad = np.where(tope < 0, len(latitudes), tope)
+    asignacion = asignar_mas_cercano(
+        latitudes, longitudes,
+        [r['latitud'] for r in recintos], [r['longitud'] for r in recintos],
+        capacidad
+    )
+    votantes = np.bincount(asignacion, minlength=len(recintos))
+    return planificar_mesas(votantes, max_por_mesa, tope), asignacion
+
+
+def resumen_plan(recintos, plan):
+    columnas = {k: v.tolist() for k, v in plan.items()}
+    detalle = [
+        dict(recinto=r['recinto'], **{k: columnas[k][i] for k in columnas})
+        for i, r in enumerate(recintos)
+    ]
+    return {
+        'votantes': int(plan['votantes'].sum()),
+        'mesas': int(plan['mesas'].sum()),
+        'excedente': int(plan['excedente'].sum()),
+        'recintos_usados': int(np.count_nonzero(plan['mesas'])),
+        'recintos': detalle,
+    }
+
+
+def aplicar_plan(eleccion, recintos, plan, asignacion, ids, batch_size=None):
+    # escribe la distribucion planificada; reemplaza las mesas de la eleccion
+    mesas, _ = escribir_por_recinto(
+        eleccion, [r['recinto'] for r in recintos], plan['mesas'].tolist(), asignacion, ids, batch_size
+    )
+    return mesas
@@ -0,0 +1,169 @@
+"""
+Clasificacion de puntos dentro de los poligonos de las secciones.
+
+Cada seccion es un poligono cerrado, empaquetado en Seccion.poligono o como
+sus Punto en orden de id (x=longitud, y=latitud). El indice guarda el
+bounding box de cada poligono y una grilla donde cada celda conoce los
+poligonos cuyo bounding box la toca. Para
+clasificar, los puntos se agrupan por celda y cada poligono solo prueba los
+puntos de sus celdas, con ray casting vectorizado sobre todas sus aristas.
+"""
+import threading
+
+import numpy as np
+
+from eleccion.models import Punto
+
+# poligonos promedio por celda
+POLIGONOS_POR_CELDA = 2
+# tope de elementos de la matriz puntos x aristas
+ELEMENTOS_POR_BLOQUE = 4_000_000
+
+
+class IndicePoligonos:
+
+    def __init__(self, poligonos):
+        """
+        `poligonos` es una lista de (seccion_id, xs, ys). Si un punto cae en
+        varias secciones gana la de menor area (la mas especifica).
+        """
+        poligonos = [p for p in poligonos if len(p[1]) >= 3]
+        poligonos.sort(key=lambda p: _area(p[1], p[2]))
+        self.ids = [p[0] for p in poligonos]
+        self.xs = [np.asarray(p[1], dtype=np.float64) for p in poligonos]
+        self.ys = [np.asarray(p[2], dtype=np.float64) for p in poligonos]
+        if not poligonos:
+            return
+
+        self.cajas = np.array([(x.min(), y.min(), x.max(), y.max()) for x, y in zip(self.xs, self.ys)])
+        self.xmin, self.ymin = self.cajas[:, 0].min(), self.cajas[:, 1].min()
+        ancho = max(self.cajas[:, 2].max() - self.xmin, 1e-9)
+        alto = max(self.cajas[:, 3].max() - self.ymin, 1e-9)
+        self.celda = np.sqrt(ancho * alto * POLIGONOS_POR_CELDA / len(poligonos))
+        self.nx = int(ancho // self.celda) + 1
+        self.ny = int(alto // self.celda) + 1
+        # rango de celdas (cx0, cy0, cx1, cy1) que cubre cada poligono
+        self.rangos = np.column_stack((
+            self._cx(self.cajas[:, 0]), self._cy(self.cajas[:, 1]),
+            self._cx(self.cajas[:, 2]), self._cy(self.cajas[:, 3]),
+        ))
+
+    def _cx(self, x):
+        return np.clip(((x - self.xmin) // self.celda).astype(np.int64), 0, self.nx - 1)
+
+    def _cy(self, y):
+        return np.clip(((y - self.ymin) // self.celda).astype(np.int64), 0, self.ny - 1)
+
+    def clasificar(self, latitudes, longitudes):
+        """
+        Devuelve un arreglo con el seccion_id de cada punto, o -1 si no cae
+        en ninguna.
+        """
+        y = np.asarray(latitudes, dtype=np.float64)
+        x = np.asarray(longitudes, dtype=np.float64)
+        resultado = np.full(len(x), -1, dtype=np.int64)
+        if not self.ids or not len(x):
+            return resultado
+
+        # puntos ordenados por celda para sacar los de un rango con slices
+        cx, cy = self._cx(x), self._cy(y)
+        celdas = cy * self.nx + cx
+        orden = np.argsort(celdas, kind='stable')
+        celdas_ordenadas = celdas[orden]
+
+        for i, seccion_id in enumerate(self.ids):
+            cx0, cy0, cx1, cy1 = self.rangos[i]
+            filas = np.arange(cy0, cy1 + 1) * self.nx
+            inicios = np.searchsorted(celdas_ordenadas, filas + cx0, side='left')
+            fines = np.searchsorted(celdas_ordenadas, filas + cx1, side='right')
+            if not (fines > inicios).any():
+                continue
+            candidatos = orden[np.concatenate([np.arange(a, b) for a, b in zip(inicios, fines)])]
+            xmin, ymin, xmax, ymax = self.cajas[i]
+            px, py = x[candidatos], y[candidatos]
+            dentro_caja = (
+                (resultado[candidatos] < 0)
+                & (px >= xmin) & (px <= xmax) & (py >= ymin) & (py <= ymax)
+            )
+            candidatos = candidatos[dentro_caja]
+            if not len(candidatos):
+                continue
+            dentro = dentro_poligono(x[candidatos], y[candidatos], self.xs[i], self.ys[i])
+            resultado[candidatos[dentro]] = seccion_id
+        return resultado
+
+
+def dentro_poligono(px, py, xs, ys):
+    # ray casting: cuenta cruces de un rayo horizontal hacia +x
+    x1, y1 = xs, ys
+    x2, y2 = np.roll(xs, -1), np.roll(ys, -1)
+    cruza_y = y1 != y2
+    x1, y1, x2, y2 = x1[cruza_y], y1[cruza_y], x2[cruza_y], y2[cruza_y]
+    pendiente = (x2 - x1) / (y2 - y1)
+
+    dentro = np.zeros(len(px), dtype=bool)
+    bloque = max(1, ELEMENTOS_POR_BLOQUE // max(len(x1), 1))
+    for i in range(0, len(px), bloque):
+        bx, by = px[i:i + bloque, None], py[i:i + bloque, None]
+        cruces = ((y1 > by) != (y2 > by)) & (bx < x1 + (by - y1) * pendiente)
+        dentro[i:i + bloque] = np.count_nonzero(cruces, axis=1) % 2 == 1
+    return dentro
+
+
+def _area(xs, ys):
+    xs, ys = np.asarray(xs, dtype=np.float64), np.asarray(ys, dtype=np.float64)
+    return abs(np.dot(xs, np.roll(ys, -1)) - np.dot(ys, np.roll(xs, -1))) / 2
+
+
+def cargar_poligonos(secciones):
+    poligonos = []
+    # las empaquetadas se decodifican directo del blob
+    empaquetadas = secciones.filter(poligono__isnull=False).values_list('id', 'poligono')
+    for seccion_id, blob in empaquetadas:
+        valores = np.frombuffer(bytes(blob), dtype='<f8')
+        poligonos.append((seccion_id, valores[1::2], valores[0::2]))
+
+    # el resto, una sola consulta para todos los vertices en el orden en que se crearon
+    filas = (
+        Punto.objects
+        .filter(seccion__in=secciones.filter(poligono__isnull=True))
+        .order_by('seccion_id', 'id')
+        .values_list('seccion_id', 'longitud', 'latitud')
+    )
+    datos = np.array(list(filas), dtype=np.float64).reshape(-1, 3)
+    if len(datos):
+        cortes = np.flatnonzero(np.diff(datos[:, 0])) + 1
+        poligonos.extend(
+            (int(bloque[0, 0]), bloque[:, 1], bloque[:, 2])
+            for bloque in np.split(datos, cortes)
+        )
+    return poligonos
+
+
+_indices = {}
+_generacion = 0
+_lock = threading.Lock()
+
+
+def indice_secciones(secciones, clave):
+    """
+    Devuelve el IndicePoligonos de `secciones`, construido una vez por
+    `clave` y guardado en memoria hasta que se llame a invalidar_indices().
+    """
+    with _lock:
+        indice = _indices.get(clave)
+        generacion = _generacion
+    if indice is None:
+        indice = IndicePoligonos(cargar_poligonos(secciones))
+        with _lock:
+            # si algo cambio mientras se construia, no se guarda
+            if generacion == _generacion:
+                _indices[clave] = indice
+    return indice
+
+
+def invalidar_indices(**kwargs):
+    global _generacion
+    with _lock:
+        _generacion += 1
+        _indices.clear()
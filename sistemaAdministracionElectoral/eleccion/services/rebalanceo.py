@@ -0,0 +1,130 @@
+"""
+Rebalanceo incremental de una eleccion ya distribuida.
+
+En lugar de borrar y volver a crear todas las mesas y votantes, aplica las
+bajas y altas y mueve la menor cantidad posible de votantes para que las
+mesas queden con tamanos que difieren a lo sumo en 1. Solo se escriben las
+filas que cambian.
+"""
+from django.db import transaction
+from django.db.models import Count
+
+from eleccion.models import Mesa, Votante
+from eleccion.services.distribucion import get_batch_size, asignar_jefes
+from eleccion.services.donde_votar import invalidar_donde_votar
+
+# ids por cada `__in`, por debajo del limite de parametros de SQLite
+IDS_POR_CONSULTA = 900
+
+
+def _en_partes(valores, n=IDS_POR_CONSULTA):
+    valores = list(valores)
+    for i in range(0, len(valores), n):
+        yield valores[i:i + n]
+
+
+def tamanos_objetivo(actuales, total):
+    """
+    Reparte `total` votantes entre las mesas con tamanos base o base+1. Las
+    base+1 van a las mesas que hoy tienen mas votantes, asi sale la menor
+    cantidad posible de cada mesa.
+    """
+    base, extra = divmod(total, len(actuales))
+    objetivo = [base] * len(actuales)
+    mas_llenas = sorted(range(len(actuales)), key=lambda i: -actuales[i])
+    for i in mas_llenas[:extra]:
+        objetivo[i] += 1
+    return objetivo
+
+
+def rebalancear(eleccion, altas=(), bajas=(), batch_size=None):
+    """
+    Da de baja los votantes `bajas`, agrega `altas` y mueve los votantes
+    justos para que todas las mesas de `eleccion` queden con tamanos +-1.
+    Los que se mueven salen de las mesas sobrantes (los ultimos en entrar,
+    nunca el jefe) y las altas van primero a las mesas que faltan.
+    Devuelve un resumen con las filas tocadas de cada tipo.
+    """
+    batch_size = get_batch_size(batch_size)
+    bajas = {int(v) for v in bajas}
+    altas = [v for v in dict.fromkeys(int(v) for v in altas)]
+
+    with transaction.atomic():
+        mesas = list(Mesa.objects.filter(eleccion=eleccion).order_by('pk').only('id', 'jefe_id', 'cantidad'))
+        if not mesas:
+            raise ValueError('La elección no tiene mesas.')
+
+        eliminados = 0
+        for parte in _en_partes(bajas):
+            eliminados += Votante.objects.filter(eleccion=eleccion, votante_id__in=parte).delete()[0]
+
+        # las altas que ya estan en la eleccion no se vuelven a insertar
+        existentes = set()
+        for parte in _en_partes(altas):
+            existentes.update(
+                Votante.objects.filter(eleccion=eleccion, votante_id__in=parte).values_list('votante_id', flat=True)
+            )
+        nuevos = [v for v in altas if v not in existentes]
+
+        conteo = dict(
+            Votante.objects.filter(eleccion=eleccion)
+            .values_list('mesa_id').annotate(n=Count('pk')).order_by()
+        )
+        actuales = [conteo.get(m.pk, 0) for m in mesas]
+        objetivo = tamanos_objetivo(actuales, sum(actuales) + len(nuevos))
+
+        # votantes que salen de cada mesa sobrante
+        salientes = []
+        for mesa, actual, meta in zip(mesas, actuales, objetivo):
+            if actual > meta:
+                salientes.extend(
+                    Votante.objects.filter(mesa_id=mesa.pk)
+                    .exclude(votante_id=mesa.jefe_id)
+                    .order_by('-pk')
+                    .values_list('pk', flat=True)[:actual - meta]
+                )
+
+        # llenar las mesas que faltan: primero altas, despues movidos
+        pendientes_altas = iter(nuevos)
+        pendientes_movidos = iter(salientes)
+        insertar = []
+        mover = {}
+        for mesa, actual, meta in zip(mesas, actuales, objetivo):
+            faltan = meta - actual
+            while faltan > 0:
+                vid = next(pendientes_altas, None)
+                if vid is not None:
+                    insertar.append(Votante(eleccion_id=eleccion.pk, votante_id=vid, mesa_id=mesa.pk))
+                else:
+                    mover.setdefault(mesa.pk, []).append(next(pendientes_movidos))
+                faltan -= 1
+
+        Votante.objects.bulk_create(insertar, batch_size=batch_size)
+        movidos = 0
+        for mesa_id, pks in mover.items():
+            for parte in _en_partes(pks):
+                movidos += Votante.objects.filter(pk__in=parte).update(mesa_id=mesa_id)
+
+        cambiadas = []
+        for mesa, meta in zip(mesas, objetivo):
+            if mesa.cantidad != meta:
+                mesa.cantidad = meta
+                cambiadas.append(mesa)
+        Mesa.objects.bulk_update(cambiadas, ['cantidad'], batch_size=batch_size)
+
+        # solo las mesas que perdieron al jefe o todavia no tenian
+        sin_jefe = [m.pk for m in mesas if m.jefe_id is None or m.jefe_id in bajas]
+        jefes = asignar_jefes(Mesa.objects.filter(pk__in=sin_jefe)) if sin_jefe else 0
+
+        transaction.on_commit(lambda: invalidar_donde_votar(eleccion.pk))
+
+    resumen = {
+        'eliminados': eliminados,
+        'insertados': len(insertar),
+        'movidos': movidos,
+        'mesas_actualizadas': len(cambiadas),
+        'jefes_reasignados': jefes,
+        'repetidos': len(existentes),
+    }
+    resumen['filas'] = sum(v for k, v in resumen.items() if k != 'repetidos')
+    return resumen
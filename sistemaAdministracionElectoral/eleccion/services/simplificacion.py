@@ -0,0 +1,180 @@
+"""
+Niveles de detalle de los poligonos de las secciones.
+
+Cada seccion guarda, al guardarse, una version simplificada con
+Douglas-Peucker por cada tolerancia de NIVELES (en grados). Los listados
+eligen el nivel con ?tolerance=<grados> o ?zoom=<nivel de zoom del mapa>;
+si una seccion no tiene el nivel pedido se devuelve el poligono completo.
+
+Los receptores no recalculan en el momento: marcar_seccion() anota la
+seccion y los niveles se rearman una vez al confirmar la transaccion, asi
+guardar muchos Punto de una seccion en una transaccion no rearma todo por
+cada vertice. Las empaquetadas se marcan en el post_save de Seccion, solo si
+cambio el poligono (renombrar no recalcula). Las que usan filas de Punto se
+marcan en el post_save de Punto y al borrar uno desde PuntoViewSet; las altas
+en lote (bulk_create) llaman a actualizar_simplificaciones() a mano.
+"""
+import threading
+
+import numpy as np
+
+from django.db import transaction
+
+from eleccion.models import Punto, Seccion, SeccionSimplificada
+from eleccion.models.seccion import empaquetar_puntos
+
+NIVELES = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05)
+
+
+def douglas_peucker(xs, ys, tolerancia):
+    """
+    Devuelve la mascara de vertices que se conservan en la polilinea
+    (xs, ys) simplificada a `tolerancia`.
+    """
+    n = len(xs)
+    conservar = np.zeros(n, dtype=bool)
+    if n < 3:
+        conservar[:] = True
+        return conservar
+    conservar[0] = conservar[-1] = True
+    pila = [(0, n - 1)]
+    while pila:
+        inicio, fin = pila.pop()
+        if fin - inicio < 2:
+            continue
+        x0, y0, x1, y1 = xs[inicio], ys[inicio], xs[fin], ys[fin]
+        px, py = xs[inicio + 1:fin], ys[inicio + 1:fin]
+        dx, dy = x1 - x0, y1 - y0
+        largo = np.hypot(dx, dy)
+        if largo == 0:
+            distancias = np.hypot(px - x0, py - y0)
+        else:
+            distancias = np.abs(dy * (px - x0) - dx * (py - y0)) / largo
+        i = int(np.argmax(distancias))
+        if distancias[i] > tolerancia:
+            medio = inicio + 1 + i
+            conservar[medio] = True
+            pila.append((inicio, medio))
+            pila.append((medio, fin))
+    return conservar
+
+
+def simplificar_poligono(latitudes, longitudes, tolerancia):
+    """
+    Simplifica un poligono cerrado. Se parte en el primer vertice y en el mas
+    lejano a el, asi ninguna de las dos mitades tiene extremos iguales, y
+    nunca queda con menos de 3 vertices.
+    """
+    ys = np.asarray(latitudes, dtype=np.float64)
+    xs = np.asarray(longitudes, dtype=np.float64)
+    if len(xs) <= 3:
+        return ys, xs
+    lejano = int(np.argmax(np.hypot(xs - xs[0], ys - ys[0])))
+    conservar = np.zeros(len(xs), dtype=bool)
+    conservar[:lejano + 1] = douglas_peucker(xs[:lejano + 1], ys[:lejano + 1], tolerancia)
+    cola_x = np.append(xs[lejano:], xs[0])
+    cola_y = np.append(ys[lejano:], ys[0])
+    conservar[lejano:] |= douglas_peucker(cola_x, cola_y, tolerancia)[:-1]
+    if conservar.sum() < 3:
+        return ys, xs
+    return ys[conservar], xs[conservar]
+
+
+def nivel_para(tolerancia=None, zoom=None):
+    """
+    Devuelve la tolerancia precalculada a usar, o None si se piden todos los
+    vertices. Con zoom se toma aprox. un pixel de un tile de 256px.
+    """
+    if tolerancia is None and zoom is None:
+        return None
+    if tolerancia is None:
+        tolerancia = 360.0 / (256 * 2 ** float(zoom))
+    tolerancia = float(tolerancia)
+    candidatos = [n for n in NIVELES if n <= tolerancia]
+    return max(candidatos) if candidatos else None
+
+
+def puntos_de(seccion):
+    empaquetado = seccion.get_poligono()
+    if empaquetado is not None:
+        return empaquetado
+    return list(
+        Punto.objects.filter(seccion=seccion).order_by('id').values_list('latitud', 'longitud')
+    )
+
+
+def niveles_de(seccion, puntos):
+    # un SeccionSimplificada sin guardar por cada tolerancia de NIVELES
+    if not puntos:
+        return []
+    latitudes, longitudes = zip(*puntos)
+    niveles = []
+    for tolerancia in NIVELES:
+        lat, lng = simplificar_poligono(latitudes, longitudes, tolerancia)
+        niveles.append(SeccionSimplificada(
+            seccion=seccion, tolerancia=tolerancia, poligono=empaquetar_puntos(lat, lng)
+        ))
+    return niveles
+
+
+def actualizar_simplificaciones(seccion, puntos=None):
+    # recalcula todos los niveles de una seccion, devuelve cuantos guardo
+    if puntos is None:
+        puntos = puntos_de(seccion)
+    nuevas = niveles_de(seccion, puntos)
+    with transaction.atomic():
+        SeccionSimplificada.objects.filter(seccion=seccion).delete()
+        SeccionSimplificada.objects.bulk_create(nuevas)
+    return len(nuevas)
+
+
+# secciones marcadas cuyo rearmado todavia no corrio, por hilo
+_pendientes = threading.local()
+
+
+def _secciones_pendientes():
+    if not hasattr(_pendientes, 'secciones'):
+        _pendientes.secciones = set()
+    return _pendientes.secciones
+
+
+def _rearmar(seccion_id):
+    pendientes = _secciones_pendientes()
+    if seccion_id not in pendientes:
+        # ya la rearmo otra marca de la misma transaccion
+        return
+    pendientes.discard(seccion_id)
+    seccion = Seccion.objects.filter(pk=seccion_id).first()
+    if seccion is not None:
+        actualizar_simplificaciones(seccion)
+
+
+def marcar_seccion(seccion_id):
+    """
+    Rearma los niveles de la seccion al confirmar la transaccion en curso
+    (fuera de una, en el momento). Varias marcas de la misma seccion en una
+    transaccion la rearman una sola vez. Si la transaccion se revierte no
+    se rearma nada.
+    """
+    _secciones_pendientes().add(seccion_id)
+    transaction.on_commit(lambda: _rearmar(seccion_id))
+
+
+def simplificar_al_guardar(sender, instance, created=False, update_fields=None, raw=False, **kwargs):
+    # receptor de post_save de Seccion, solo para las empaquetadas y si cambio el poligono
+    if raw or instance.poligono is None:
+        return
+    if update_fields is not None:
+        cambio = 'poligono' in update_fields
+    else:
+        cambio = created or instance.poligono_cambio()
+    instance._poligono_guardado = instance.poligono
+    if cambio:
+        marcar_seccion(instance.pk)
+
+
+def simplificar_por_punto(sender, instance, raw=False, **kwargs):
+    # receptor de post_save de Punto: marca su seccion para rearmar los niveles
+    if raw:
+        return
+    marcar_seccion(instance.seccion_id)
@@ -0,0 +1,214 @@
+"""
+Datos sinteticos para ensayos y benchmarks (manage.py generate_election).
+
+Todo sale de generadores numpy sembrados con `semilla`: con los mismos
+parametros se generan las mismas secciones, recintos, candidaturas, mesas y
+votantes. Se escribe con bulk_create y, para los votantes, con
+insertar_filas por lotes, dentro de una sola transaccion.
+"""
+from datetime import date
+
+import numpy as np
+
+from django.conf import settings
+from django.db import transaction
+
+from eleccion.models import Seccion, SeccionSimplificada, Punto, Eleccion, Cargo, Candidatura, Recinto, Mesa
+from eleccion.services.distribucion import get_batch_size, tamanos_parejos, insertar_asignacion
+from eleccion.services.simplificacion import niveles_de
+from eleccion.services.poligonos import invalidar_indices
+from eleccion.services.papeleta import invalidar_papeletas
+from eleccion.services.donde_votar import invalidar_donde_votar
+from eleccion.services.versiones import subir_version
+
+# los municipios se reparten en una grilla de ANCHO_GRADOS alrededor de CENTRO
+CENTRO = (-17.78, -63.18)
+ANCHO_GRADOS = 2.0
+# radio minimo de cada vertice, como fraccion del radio del municipio; los
+# recintos caen a menos de RADIO_RECINTOS y por eso siempre quedan adentro
+RADIO_MINIMO = 0.7
+RADIO_RECINTOS = 0.6
+BASE_VOTANTES = 1_000_000
+
+CARGOS = ('Gobernador', 'Asambleista', 'Alcalde', 'Concejal', 'Presidente', 'Diputado', 'Senador')
+PARTIDOS = (
+    ('Alianza Popular', 'AP'), ('Frente Amplio', 'FA'), ('Movimiento Ciudadano', 'MC'),
+    ('Unidad Nacional', 'UN'), ('Partido Verde', 'PV'), ('Renovacion', 'REN'),
+    ('Democracia Social', 'DS'), ('Libertad y Progreso', 'LP'), ('Comunidad', 'CC'),
+    ('Accion Regional', 'AR'), ('Nueva Generacion', 'NG'), ('Poder Vecinal', 'PVE'),
+)
+NOMBRES = ('Ana', 'Luis', 'Maria', 'Jorge', 'Carmen', 'Pedro', 'Rosa', 'Juan', 'Elena', 'Carlos')
+APELLIDOS = ('Rojas', 'Vargas', 'Flores', 'Mamani', 'Quispe', 'Gutierrez', 'Lopez', 'Suarez', 'Choque', 'Paz')
+
+
+def ids_votantes(semilla, total, base=BASE_VOTANTES):
+    """
+    Ids de padron de los `total` votantes, en el orden en que se asignan a las
+    mesas. votacion generate_election hace la misma cuenta para que los votos
+    sean de estos votantes.
+    """
+    return base + np.random.default_rng([semilla, 1]).permutation(total).astype(np.int64)
+
+
+def repartir(total, pesos):
+    # `total` en enteros proporcionales a `pesos` (mayor resto)
+    cuota = total * pesos / pesos.sum()
+    enteros = np.floor(cuota).astype(np.int64)
+    enteros[np.argsort(enteros - cuota, kind='stable')[:total - enteros.sum()]] += 1
+    return enteros
+
+
+def _poligono(azar, lat, lng, radio, vertices):
+    angulos = np.linspace(0, 2 * np.pi, vertices, endpoint=False)
+    radios = radio * azar.uniform(RADIO_MINIMO, 1.0, vertices)
+    return lat + radios * np.sin(angulos), lng + radios * np.cos(angulos)
+
+
+def _secciones(azar, prefijo, cantidad, vertices, simplificar):
+    # un departamento que cubre todo y `cantidad` municipios adentro
+    empaquetar = getattr(settings, 'SECCION_POLIGONO_EMPAQUETADO', True)
+    columnas = int(np.ceil(np.sqrt(cantidad)))
+    celda = ANCHO_GRADOS / columnas
+    lat0, lng0 = CENTRO[0] - ANCHO_GRADOS / 2, CENTRO[1] - ANCHO_GRADOS / 2
+
+    poligonos = [(
+        np.array([lat0, lat0 + ANCHO_GRADOS, lat0 + ANCHO_GRADOS, lat0]),
+        np.array([lng0, lng0, lng0 + ANCHO_GRADOS, lng0 + ANCHO_GRADOS]),
+    )]
+    centros = []
+    for i in range(cantidad):
+        centro = (lat0 + (i // columnas + 0.5) * celda, lng0 + (i % columnas + 0.5) * celda)
+        centros.append(centro)
+        poligonos.append(_poligono(azar, *centro, celda / 2, vertices))
+
+    secciones = [Seccion(nombre=f'{prefijo} Departamento', tipo='departamento')]
+    secciones += [Seccion(nombre=f'{prefijo} Municipio {i + 1}', tipo='municipio') for i in range(cantidad)]
+    for seccion, (latitudes, longitudes) in zip(secciones, poligonos):
+        if empaquetar:
+            seccion.set_poligono(latitudes.tolist(), longitudes.tolist())
+    Seccion.objects.bulk_create(secciones)
+
+    puntos, niveles = [], []
+    for seccion, (latitudes, longitudes) in zip(secciones, poligonos):
+        vertices_seccion = list(zip(latitudes.tolist(), longitudes.tolist()))
+        if not empaquetar:
+            puntos.extend(Punto(seccion=seccion, latitud=lat, longitud=lng) for lat, lng in vertices_seccion)
+        if simplificar:
+            niveles.extend(niveles_de(seccion, vertices_seccion))
+    Punto.objects.bulk_create(puntos, batch_size=5000)
+    SeccionSimplificada.objects.bulk_create(niveles, batch_size=500)
+    return secciones[0], secciones[1:], np.array(centros), celda / 2
+
+
+def _recintos(azar, prefijo, cantidad, municipios, centros, radio):
+    # mas recintos en los municipios mas poblados, en un disco alrededor del centro
+    pesos = azar.lognormal(0.0, 1.0, len(municipios))
+    donde = azar.choice(len(municipios), size=cantidad, p=pesos / pesos.sum())
+    angulos = azar.uniform(0, 2 * np.pi, cantidad)
+    distancias = radio * RADIO_RECINTOS * np.sqrt(azar.uniform(0, 1, cantidad))
+    latitudes = centros[donde, 0] + distancias * np.sin(angulos)
+    longitudes = centros[donde, 1] + distancias * np.cos(angulos)
+    return Recinto.objects.bulk_create([
+        Recinto(nombre=f'{prefijo} Recinto {i + 1}', latitud=lat, longitud=lng, seccion=municipios[m])
+        for i, (lat, lng, m) in enumerate(zip(latitudes.tolist(), longitudes.tolist(), donde.tolist()))
+    ], batch_size=5000)
+
+
+def _nombre_cargo(c):
+    # Gobernador, ..., Senador, Gobernador 2, ...
+    nombre = CARGOS[c % len(CARGOS)]
+    return nombre if c < len(CARGOS) else f'{nombre} {c // len(CARGOS) + 1}'
+
+
+def _candidaturas(azar, eleccion, cargos, por_cargo):
+    candidaturas = []
+    for cargo in cargos:
+        for p in azar.permutation(len(PARTIDOS))[:por_cargo].tolist():
+            partido, sigla = PARTIDOS[p]
+            candidaturas.append(Candidatura(
+                partido_politico=partido, sigla=sigla,
+                candidato=f'{NOMBRES[azar.integers(len(NOMBRES))]} {APELLIDOS[azar.integers(len(APELLIDOS))]}',
+                color='#%06x' % azar.integers(0x1000000), cargo=cargo, eleccion=eleccion,
+            ))
+    return Candidatura.objects.bulk_create(candidaturas)
+
+
+def generar_eleccion(semilla=0, votantes=100_000, secciones=20, recintos=500, elecciones=1, cargos=3,
+                     candidaturas=8, por_mesa=250, vertices=64, fecha=None, prefijo=None,
+                     simplificar=True, batch_size=None):
+    """
+    Genera un departamento con `secciones` municipios, `recintos` recintos,
+    `cargos` cargos y, por cada una de las `elecciones`, `candidaturas` por
+    cargo y las mesas para los `votantes` del padron (los mismos en todas
+    las elecciones) de a `por_mesa`.
+
+    Devuelve (resumen, manifiesto). El manifiesto tiene los ids generados y
+    el orden de las mesas, lo que necesita votacion generate_election para
+    generar votos de estos mismos votantes.
+    """
+    if candidaturas > len(PARTIDOS):
+        raise ValueError(f'Hay a lo sumo {len(PARTIDOS)} candidaturas por cargo')
+    if vertices < 8:
+        raise ValueError('Los poligonos necesitan al menos 8 vertices')
+    if min(votantes, secciones, recintos, elecciones, cargos, candidaturas, por_mesa) < 1:
+        raise ValueError('Las cantidades deben ser positivas')
+    prefijo = prefijo or f'Sintetica {semilla}'
+    if Seccion.objects.filter(nombre=f'{prefijo} Departamento').exists():
+        raise ValueError(f'Ya hay datos generados con el prefijo "{prefijo}"')
+
+    batch_size = get_batch_size(batch_size)
+    azar = np.random.default_rng(semilla)
+    ids = ids_votantes(semilla, votantes)
+    total_mesas = -(-votantes // por_mesa)
+    tamanos = tamanos_parejos(votantes, total_mesas)
+    # primer votante de cada mesa, que es quien queda de jefe
+    primeros = ids[np.concatenate(([0], np.cumsum(tamanos)[:-1]))].tolist()
+    manifiesto = {'semilla': semilla, 'votantes': {'total': votantes, 'base': BASE_VOTANTES}, 'elecciones': []}
+
+    with transaction.atomic():
+        departamento, municipios, centros, radio = _secciones(azar, prefijo, secciones, vertices, simplificar)
+        lista_recintos = _recintos(azar, prefijo, recintos, municipios, centros, radio)
+        lista_cargos = Cargo.objects.bulk_create([
+            Cargo(nombre=f'{prefijo} {_nombre_cargo(c)}', seccion=departamento) for c in range(cargos)
+        ])
+        # mesas por recinto segun una capacidad al azar; las mismas en todas las elecciones
+        mesas_por_recinto = repartir(total_mesas, azar.lognormal(0.0, 0.5, recintos))
+
+        total_candidaturas = 0
+        for e in range(elecciones):
+            eleccion = Eleccion.objects.create(
+                nombre=f'{prefijo} Eleccion {e + 1}', fecha=fecha or date.today(), seccion=departamento
+            )
+            lista_candidaturas = _candidaturas(azar, eleccion, lista_cargos, candidaturas)
+            total_candidaturas += len(lista_candidaturas)
+
+            mesas, k = [], 0
+            for recinto, cantidad in zip(lista_recintos, mesas_por_recinto.tolist()):
+                for numero in range(1, cantidad + 1):
+                    mesas.append(Mesa(numero=numero, recinto=recinto, eleccion=eleccion,
+                                      cantidad=int(tamanos[k]), jefe_id=primeros[k]))
+                    k += 1
+            mesas = Mesa.objects.bulk_create(mesas, batch_size=batch_size)
+            posicion = np.repeat(np.arange(len(mesas)), tamanos)
+            insertar_asignacion(mesas, posicion, ids, batch_size)
+
+            manifiesto['elecciones'].append({
+                'id': eleccion.pk,
+                'cargos': {
+                    cargo.pk: [c.pk for c in lista_candidaturas if c.cargo_id == cargo.pk] for cargo in lista_cargos
+                },
+                'mesas': [[mesa.pk, mesa.cantidad] for mesa in mesas],
+            })
+
+        # bulk_create no dispara señales
+        transaction.on_commit(invalidar_indices)
+        transaction.on_commit(invalidar_papeletas)
+        transaction.on_commit(lambda: invalidar_donde_votar(*(e['id'] for e in manifiesto['elecciones'])))
+        for modelo in (Seccion, Cargo, Eleccion, Recinto, Mesa):
+            transaction.on_commit(lambda modelo=modelo: subir_version(modelo))
+
+    resumen = {
+        'secciones': secciones + 1, 'recintos': recintos, 'cargos': cargos, 'elecciones': elecciones,
+        'candidaturas': total_candidaturas, 'mesas': total_mesas * elecciones, 'votantes': votantes * elecciones,
+    }
+    return resumen, manifiesto
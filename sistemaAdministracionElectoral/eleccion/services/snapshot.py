@@ -0,0 +1,139 @@
+"""
+Snapshot binario de la asignacion votante -> mesa de una eleccion, para las
+maquinas de jurado que trabajan sin conexion.
+
+Formato (todo little-endian):
+
+  cabecera, TAMANO_CABECERA = 72 bytes
+    magic       4s   b'ASIG'
+    version     u2   1
+    ancho       u2   bytes por registro (16)
+    eleccion    i8
+    recinto     i8   -1 si es la eleccion completa
+    registros   u8
+    creado      i8   segundos unix
+    sha256      32s  de la zona de registros
+  registros, ordenados por votante_id
+    votante_id  i8
+    mesa_id     i4
+    voto        u1
+    (relleno)   3 bytes
+
+Con ancho fijo y orden por votante_id un cliente puede mapear el archivo en
+memoria y hacer busqueda binaria sin parsear nada. LectorSnapshot hace eso
+en Python y no depende de Django.
+"""
+import hashlib
+import mmap
+import struct
+import time
+
+import numpy as np
+
+MAGIC = b'ASIG'
+VERSION = 1
+CABECERA = struct.Struct('<4sHHqqQq32s')
+TAMANO_CABECERA = CABECERA.size
+REGISTRO = np.dtype([
+    ('votante_id', '<i8'),
+    ('mesa_id', '<i4'),
+    ('voto', 'u1'),
+    ('relleno', 'V3'),
+])
+
+
+class SnapshotInvalido(ValueError):
+    pass
+
+
+def armar_snapshot(eleccion_id, recinto_id=None):
+    """
+    Devuelve (bytes, sha256 hex) del snapshot de la eleccion, o solo de las
+    mesas de `recinto_id`.
+    """
+    # import local: el resto del modulo (el lector) se usa sin Django
+    from eleccion.models import Votante
+
+    votantes = Votante.objects.filter(eleccion_id=eleccion_id)
+    if recinto_id is not None:
+        votantes = votantes.filter(mesa__recinto_id=recinto_id)
+    filas = votantes.order_by().values_list('votante_id', 'mesa_id', 'voto').iterator(chunk_size=10000)
+    registros = np.fromiter(((v, m, x, b'') for v, m, x in filas), dtype=REGISTRO)
+    registros.sort(order='votante_id', kind='stable')
+    cuerpo = registros.tobytes()
+    resumen = hashlib.sha256(cuerpo)
+    cabecera = CABECERA.pack(
+        MAGIC, VERSION, REGISTRO.itemsize, int(eleccion_id),
+        -1 if recinto_id is None else int(recinto_id),
+        len(registros), int(time.time()), resumen.digest()
+    )
+    return cabecera + cuerpo, resumen.hexdigest()
+
+
+def escribir_snapshot(ruta, eleccion_id, recinto_id=None):
+    datos, checksum = armar_snapshot(eleccion_id, recinto_id)
+    with open(ruta, 'wb') as archivo:
+        archivo.write(datos)
+    return checksum
+
+
+class LectorSnapshot:
+    """
+    Abre un snapshot mapeado en memoria; `registros` es un arreglo numpy
+    sobre el archivo (sin copiar) y buscar() es una busqueda binaria.
+    Uso:
+        with LectorSnapshot('eleccion-3.asig') as snapshot:
+            snapshot.buscar(1234567)   # (mesa_id, voto) o None
+    """
+
+    def __init__(self, ruta, verificar=False):
+        self.archivo = open(ruta, 'rb')
+        try:
+            self.mapa = mmap.mmap(self.archivo.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self.archivo.close()
+            raise SnapshotInvalido('Archivo vacío')
+        if len(self.mapa) < TAMANO_CABECERA:
+            self.close()
+            raise SnapshotInvalido('Archivo más corto que la cabecera')
+        (magic, version, ancho, self.eleccion_id, recinto, self.total,
+         self.creado, self.sha256) = CABECERA.unpack_from(self.mapa, 0)
+        if magic != MAGIC or version != VERSION or ancho != REGISTRO.itemsize:
+            self.close()
+            raise SnapshotInvalido('No es un snapshot de asignación compatible')
+        if len(self.mapa) != TAMANO_CABECERA + self.total * ancho:
+            self.close()
+            raise SnapshotInvalido('El tamaño no coincide con la cantidad de registros')
+        self.recinto_id = None if recinto < 0 else recinto
+        self.registros = np.frombuffer(self.mapa, dtype=REGISTRO, count=self.total, offset=TAMANO_CABECERA)
+        self.votantes = self.registros['votante_id']
+        if verificar and not self.verificar():
+            self.close()
+            raise SnapshotInvalido('El checksum no coincide')
+
+    def __len__(self):
+        return self.total
+
+    def verificar(self):
+        return hashlib.sha256(self.mapa[TAMANO_CABECERA:]).digest() == self.sha256
+
+    def buscar(self, votante_id):
+        i = int(np.searchsorted(self.votantes, votante_id))
+        if i == self.total or self.votantes[i] != votante_id:
+            return None
+        registro = self.registros[i]
+        return int(registro['mesa_id']), bool(registro['voto'])
+
+    def close(self):
+        # los arreglos apuntan al mapa, hay que soltarlos antes de cerrarlo
+        self.registros = self.votantes = None
+        if getattr(self, 'mapa', None) is not None:
+            self.mapa.close()
+            self.mapa = None
+        self.archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,295 @@
+"""
+Cola de trabajos en la base, sin broker externo.
+
+Las acciones pesadas encolan un Trabajo y responden 202; un worker
+(manage.py procesar_trabajos) los toma y los ejecuta de a pasos. Cada paso
+corre en su propia transaccion junto con el checkpoint del trabajo, asi que
+si el worker se corta se retoma desde el ultimo paso confirmado. Un trabajo
+en curso que no avanza hace TRABAJOS_VENCIMIENTO segundos se considera
+abandonado y lo puede tomar otro worker.
+
+Cada tipo de trabajo es una funcion registrada con @tarea('<tipo>') que
+recibe el Trabajo, hace un paso, actualiza checkpoint/procesados y devuelve
+True cuando termino.
+"""
+import logging
+from datetime import timedelta
+
+import numpy as np
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from eleccion.models import Eleccion, Mesa, Votante, Trabajo
+from eleccion.services.distribucion import calcular_tamanos, tamanos_parejos, insertar_votantes, asignar_jefes
+from eleccion.services.donde_votar import reconstruir_donde_votar, invalidar_donde_votar
+from eleccion.services.rebalanceo import rebalancear
+from eleccion.services.versiones import subir_version
+
+logger = logging.getLogger(__name__)
+
+# votantes por paso y segundos sin avanzar para considerar abandonado un trabajo
+CHUNK_DEFECTO = 20000
+VENCIMIENTO_DEFECTO = 300
+
+TAREAS = {}
+
+
+class TrabajoPerdido(Exception):
+    # otro worker tomo el trabajo mientras este lo ejecutaba
+    pass
+
+
+class VotantesRepetidos(ValueError):
+    pass
+
+
+def get_chunk():
+    return getattr(settings, 'TRABAJOS_CHUNK', CHUNK_DEFECTO)
+
+
+def get_vencimiento():
+    return timedelta(seconds=getattr(settings, 'TRABAJOS_VENCIMIENTO', VENCIMIENTO_DEFECTO))
+
+
+def tarea(tipo):
+    def registrar(funcion):
+        TAREAS[tipo] = funcion
+        return funcion
+    return registrar
+
+
+def empaquetar_ids(votantes):
+    # cualquier iterable de ids (o VotantesEnDisco) -> bytes int64 little-endian
+    if hasattr(votantes, 'chunks'):
+        partes = [np.asarray(lote, dtype='<i8') for lote in votantes.chunks()]
+        ids = np.concatenate(partes) if partes else np.empty(0, dtype='<i8')
+    elif isinstance(votantes, np.ndarray):
+        ids = votantes
+    else:
+        ids = np.fromiter((int(v) for v in votantes), dtype='<i8')
+    return ids.astype('<i8', copy=False).tobytes()
+
+
+def desempaquetar_ids(blob):
+    if not blob:
+        return np.empty(0, dtype=np.int64)
+    return np.frombuffer(bytes(blob), dtype='<i8')
+
+
+def encolar(tipo, parametros=None, votantes=None, total=0, unicos=False):
+    """
+    Crea el Trabajo con los ids de `votantes` empaquetados. Con `unicos`
+    rechaza ids repetidos antes de encolar (VotantesRepetidos): el trabajo
+    confirma cada paso por separado y un repetido a mitad de camino dejaria
+    la eleccion a medio escribir.
+    """
+    if tipo not in TAREAS:
+        raise ValueError(f'Tipo de trabajo desconocido: {tipo}')
+    datos = empaquetar_ids(votantes) if votantes is not None else None
+    if datos is not None:
+        total = len(datos) // 8
+        if unicos and len(np.unique(desempaquetar_ids(datos))) < total:
+            raise VotantesRepetidos('Hay votantes repetidos en la lista.')
+    return Trabajo.objects.create(tipo=tipo, parametros=parametros or {}, datos=datos, total=total)
+
+
+def tomar(worker):
+    """
+    Reclama el proximo trabajo pendiente (o abandonado) para `worker`. El
+    UPDATE condicionado al estado y al ultimo latido hace que dos workers
+    no puedan tomar el mismo.
+    """
+    ahora = timezone.now()
+    candidatos = (
+        Trabajo.objects
+        .filter(Q(estado=Trabajo.PENDIENTE) | Q(estado=Trabajo.EN_CURSO, actualizado__lt=ahora - get_vencimiento()))
+        .order_by('id')
+        .only('id', 'estado', 'actualizado', 'iniciado')[:10]
+    )
+    for candidato in candidatos:
+        tomado = Trabajo.objects.filter(
+            pk=candidato.pk, estado=candidato.estado, actualizado=candidato.actualizado
+        ).update(
+            estado=Trabajo.EN_CURSO, worker=worker, actualizado=ahora,
+            iniciado=candidato.iniciado or ahora
+        )
+        if tomado:
+            return Trabajo.objects.get(pk=candidato.pk)
+    return None
+
+
+def ejecutar(trabajo, max_pasos=None):
+    """
+    Ejecuta pasos de `trabajo` hasta que termine (o hasta `max_pasos`).
+    Devuelve True si termino.
+    """
+    funcion = TAREAS[trabajo.tipo]
+    pasos = 0
+    try:
+        while max_pasos is None or pasos < max_pasos:
+            with transaction.atomic():
+                # latido: si otro worker lo tomo, este paso no se confirma
+                if not Trabajo.objects.filter(
+                    pk=trabajo.pk, worker=trabajo.worker, estado=Trabajo.EN_CURSO
+                ).update(actualizado=timezone.now()):
+                    raise TrabajoPerdido(trabajo.pk)
+                terminado = funcion(trabajo)
+                trabajo.actualizado = timezone.now()
+                campos = ['checkpoint', 'total', 'procesados', 'resultado', 'actualizado']
+                if terminado:
+                    trabajo.estado = Trabajo.TERMINADO
+                    trabajo.terminado = trabajo.actualizado
+                    # los ids ya no hacen falta
+                    trabajo.datos = None
+                    campos += ['estado', 'terminado', 'datos']
+                trabajo.save(update_fields=campos)
+            pasos += 1
+            if terminado:
+                return True
+    except TrabajoPerdido:
+        logger.warning('Trabajo %s tomado por otro worker', trabajo.pk)
+    except Exception as e:
+        logger.exception('Trabajo %s fallo', trabajo.pk)
+        Trabajo.objects.filter(pk=trabajo.pk, worker=trabajo.worker).update(
+            estado=Trabajo.ERROR, error=str(e) or e.__class__.__name__, actualizado=timezone.now()
+        )
+    return False
+
+
+def _borrar_votantes(limite, **filtro):
+    # un pedazo por paso, para no tener una transaccion gigante
+    pks = Votante.objects.filter(**filtro).order_by().values('pk')[:limite]
+    return Votante.objects.filter(pk__in=pks).delete()[0]
+
+
+def _insertar_chunk(trabajo, mesas):
+    """
+    Inserta el proximo chunk de los ids de `trabajo`, desde
+    checkpoint['offset'], en `mesas` (en orden, ya con su cantidad).
+    Devuelve el nuevo offset.
+    """
+    ids = desempaquetar_ids(trabajo.datos)
+    offset = trabajo.checkpoint['offset']
+    tamanos = [m.cantidad for m in mesas]
+    # mesa donde cae el votante `offset` y cuanto lugar le queda
+    fines = np.cumsum(tamanos)
+    i = int(np.searchsorted(fines, offset, side='right'))
+    restantes = [int(fines[i]) - offset] + tamanos[i + 1:]
+    lote = ids[offset:offset + get_chunk()].tolist()
+    offset += insertar_votantes(mesas[i:], restantes, lote)
+    trabajo.procesados = offset
+    return offset
+
+
+@tarea('crear_distribuir')
+def paso_crear_distribuir(trabajo):
+    """
+    parametros: {"eleccion": id, "recintos": [[recinto_id, n_mesas], ...]}
+    o, con las mesas ya calculadas (cercania, planificar),
+    {"eleccion": id, "mesas": [[recinto_id, numero, cantidad], ...]}
+    datos: ids de los votantes en el orden en que llenan las mesas.
+    Fases: borrar lo anterior, crear mesas, insertar votantes de a chunks,
+    asignar jefes.
+    """
+    eleccion_id = trabajo.parametros['eleccion']
+    fase = trabajo.checkpoint.get('fase', 'borrar')
+
+    if fase == 'borrar':
+        if _borrar_votantes(get_chunk(), eleccion_id=eleccion_id):
+            return False
+        Mesa.objects.filter(eleccion_id=eleccion_id).delete()
+        ids = desempaquetar_ids(trabajo.datos)
+        filas = trabajo.parametros.get('mesas')
+        if filas is None:
+            recintos = trabajo.parametros['recintos']
+            tamanos = iter(calcular_tamanos(len(ids), sum(n for _, n in recintos)))
+            filas = [
+                (recinto_id, num, next(tamanos))
+                for recinto_id, num_mesas in recintos for num in range(1, num_mesas + 1)
+            ]
+        Mesa.objects.bulk_create([
+            Mesa(eleccion_id=eleccion_id, recinto_id=r, numero=n, cantidad=c) for r, n, c in filas
+        ])
+        transaction.on_commit(lambda: subir_version(Mesa))
+        trabajo.total = len(ids)
+        trabajo.checkpoint = {'fase': 'votantes' if len(ids) else 'jefes', 'offset': 0}
+        return False
+
+    if fase == 'votantes':
+        mesas = list(Mesa.objects.filter(eleccion_id=eleccion_id).order_by('pk').only('id', 'eleccion_id', 'cantidad'))
+        offset = _insertar_chunk(trabajo, mesas)
+        trabajo.checkpoint = {'fase': 'votantes' if offset < trabajo.total else 'jefes', 'offset': offset}
+        return False
+
+    asignar_jefes(Mesa.objects.filter(eleccion_id=eleccion_id))
+    transaction.on_commit(lambda: reconstruir_donde_votar(eleccion_id))
+    trabajo.resultado = {
+        'mesas': Mesa.objects.filter(eleccion_id=eleccion_id).count(),
+        'votantes': trabajo.total,
+    }
+    return True
+
+
+@tarea('reiniciar_eleccion')
+def paso_reiniciar_eleccion(trabajo):
+    # parametros: {"eleccion": id}; borra votantes de a chunks y despues las mesas
+    eleccion_id = trabajo.parametros['eleccion']
+    if 'fase' not in trabajo.checkpoint:
+        trabajo.total = Votante.objects.filter(eleccion_id=eleccion_id).count()
+        trabajo.checkpoint = {'fase': 'borrar'}
+    borrados = _borrar_votantes(get_chunk(), eleccion_id=eleccion_id)
+    trabajo.procesados += borrados
+    if borrados:
+        return False
+    mesas = Mesa.objects.filter(eleccion_id=eleccion_id).delete()[0]
+    transaction.on_commit(lambda: invalidar_donde_votar(eleccion_id))
+    trabajo.resultado = {'votantes': trabajo.procesados, 'mesas': mesas}
+    return True
+
+
+@tarea('distribuir')
+def paso_distribuir(trabajo):
+    """
+    parametros: {"seccion": id, "eleccion": id o null}
+    datos: ids de los votantes en orden.
+    Como MesaViewSet.distribuir: vacia las mesas ya creadas de la seccion
+    (las de la eleccion, o las sin eleccion), las reparte parejo y las llena
+    de a chunks. No asigna jefes.
+    """
+    filtro = {
+        'recinto__seccion_id': trabajo.parametros['seccion'], 'eleccion_id': trabajo.parametros['eleccion'],
+    }
+    fase = trabajo.checkpoint.get('fase', 'borrar')
+    if fase == 'borrar' and _borrar_votantes(get_chunk(), **{f'mesa__{k}': v for k, v in filtro.items()}):
+        return False
+
+    mesas = list(Mesa.objects.filter(**filtro).order_by('pk').only('id', 'eleccion_id', 'cantidad'))
+    if fase == 'borrar':
+        ids = desempaquetar_ids(trabajo.datos)
+        for mesa, cantidad in zip(mesas, tamanos_parejos(len(ids), len(mesas)).tolist()):
+            mesa.cantidad = cantidad
+        Mesa.objects.bulk_update(mesas, ['cantidad'])
+        trabajo.total = len(ids)
+        trabajo.checkpoint = {'fase': 'votantes', 'offset': 0}
+        return False
+
+    offset = _insertar_chunk(trabajo, mesas)
+    trabajo.checkpoint = {'fase': 'votantes', 'offset': offset}
+    if offset < trabajo.total:
+        return False
+    transaction.on_commit(lambda: invalidar_donde_votar(*{m.eleccion_id for m in mesas}))
+    transaction.on_commit(lambda: subir_version(Mesa))
+    trabajo.resultado = {'mesas': len(mesas), 'votantes': trabajo.total}
+    return True
+
+
+@tarea('rebalancear')
+def paso_rebalancear(trabajo):
+    # parametros: {"eleccion": id, "altas": [...], "bajas": [...]}; un solo paso
+    eleccion = Eleccion.objects.get(pk=trabajo.parametros['eleccion'])
+    trabajo.resultado = rebalancear(eleccion, trabajo.parametros.get('altas', []), trabajo.parametros.get('bajas', []))
+    trabajo.total = trabajo.procesados = trabajo.resultado['filas']
+    return True
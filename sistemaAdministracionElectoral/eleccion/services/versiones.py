@@ -0,0 +1,62 @@
+"""
+Version por modelo de los datos de referencia (secciones, cargos, elecciones,
+recintos y lo que anidan), para responder GET condicionales sin correr la
+consulta del listado.
+
+Cada save/delete sube la version del modelo (eleccion/signals.py); las
+escrituras en lote, que no disparan señales, llaman a subir_version() a
+mano. La version es la hora del ultimo cambio (un float, no se repite) y vive en la tabla Version,
+no en la cache: la LocMemCache es por proceso y un cambio hecho por el worker
+de procesar_trabajos, o por otro worker web, no llegaria a los demas. Leerla
+cuesta una consulta sobre un indice unico en lugar de la del listado. Como sube
+dentro de la misma transaccion que el cambio, un rollback la deja como estaba.
+
+donde_votar.py y papeleta.py guardan su version aca con leer()/subir().
+"""
+import hashlib
+import time
+
+from eleccion.models import Version
+
+
+def _clave(modelo):
+    return f'version:{modelo._meta.label_lower}'
+
+
+def leer(claves):
+    # {clave: version}; 0.0 para las que nunca cambiaron
+    valores = dict(Version.objects.filter(clave__in=claves).values_list('clave', 'valor'))
+    return {clave: valores.get(clave, 0.0) for clave in claves}
+
+
+async def aleer(claves):
+    valores = {clave: valor async for clave, valor in Version.objects.filter(clave__in=claves).values_list('clave', 'valor')}
+    return {clave: valores.get(clave, 0.0) for clave in claves}
+
+
+def subir(*claves):
+    # un solo INSERT ... ON CONFLICT para todas las claves
+    ahora = time.time()
+    Version.objects.bulk_create(
+        [Version(clave=clave, valor=ahora) for clave in claves],
+        update_conflicts=True, unique_fields=['clave'], update_fields=['valor'],
+    )
+
+
+def version(modelo):
+    return leer([_clave(modelo)])[_clave(modelo)]
+
+
+def subir_version(sender, **kwargs):
+    # receptor de post_save/post_delete; `sender` es el modelo que cambio
+    subir(_clave(sender))
+
+
+def etag_de(modelos, clave):
+    """
+    ETag de una respuesta que depende de `modelos`; `clave` separa
+    respuestas distintas (ruta, parametros y formato).
+    """
+    valores = leer([_clave(modelo) for modelo in modelos])
+    contenido = '|'.join([clave, *(repr(valores[_clave(modelo)]) for modelo in modelos)])
+    return '"%s"' % hashlib.sha1(contenido.encode()).hexdigest()
@@ -0,0 +1,35 @@
+from django.db.models.signals import post_save, post_delete
+
+from eleccion.models import Seccion, Punto, Cargo, Eleccion, Candidatura, Recinto, Mesa, Votante
+from eleccion.services.poligonos import invalidar_indices
+from eleccion.services.papeleta import invalidar_papeletas
+from eleccion.services.simplificacion import simplificar_al_guardar, simplificar_por_punto
+from eleccion.services.donde_votar import invalidar_por_mesa, invalidar_por_recinto, invalidar_por_votante
+from eleccion.services.versiones import subir_version
+
+
+# Votante y Punto no llevan post_delete: con un receptor conectado Django ya no
+# puede borrar en bloque y carga cada fila antes de borrarla. Sus viewsets
+# invalidan a mano en perform_destroy.
+
+def _conectar(receptor, modelos, nombre):
+    for modelo in modelos:
+        post_save.connect(receptor, sender=modelo, dispatch_uid=f'{nombre}_{modelo.__name__}_save')
+        post_delete.connect(receptor, sender=modelo, dispatch_uid=f'{nombre}_{modelo.__name__}_delete')
+
+
+def conectar():
+    _conectar(invalidar_indices, (Seccion,), 'poligonos')
+    post_save.connect(invalidar_indices, sender=Punto, dispatch_uid='poligonos_Punto_save')
+    # la papeleta anida cargo y eleccion, cada uno con su seccion
+    _conectar(invalidar_papeletas, (Candidatura, Cargo, Eleccion, Seccion), 'papeleta')
+    post_save.connect(invalidar_papeletas, sender=Punto, dispatch_uid='papeleta_Punto_save')
+    # donde_votar se invalida solo en las elecciones afectadas
+    _conectar(invalidar_por_mesa, (Mesa,), 'donde_votar')
+    _conectar(invalidar_por_recinto, (Recinto,), 'donde_votar')
+    post_save.connect(invalidar_por_votante, sender=Votante, dispatch_uid='donde_votar_Votante_save')
+    post_save.connect(simplificar_al_guardar, sender=Seccion, dispatch_uid='simplificar_Seccion_save')
+    post_save.connect(simplificar_por_punto, sender=Punto, dispatch_uid='simplificar_Punto_save')
+    # ETag de los listados de referencia; Mesa porque Recinto.elecciones pasa por ella
+    _conectar(subir_version, (Seccion, Cargo, Eleccion, Recinto, Mesa), 'version')
+    post_save.connect(subir_version, sender=Punto, dispatch_uid='version_Punto_save')
@@ -1,3 +1,1621 @@
-from django.test import TestCase
+import gzip
+import json
+import math
+import os
+import shutil
+import tempfile
+from datetime import date
+from io import BytesIO, StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient, APIRequestFactory
+
+from eleccion.apis import CargoViewSet, MesaViewSet
+from eleccion.apis.asincronas import papeleta_sync
+from eleccion.models import Seccion, Punto, Eleccion, Cargo, Candidatura, Recinto, Mesa, Votante, Trabajo
+from eleccion.models.seccion import empaquetar_puntos, desempaquetar_puntos
+from eleccion.services import (
+    invalidar_donde_votar, crear_y_distribuir, rebalancear, tomar, ejecutar, leer_features,
+    escribir_snapshot, LectorSnapshot, SnapshotInvalido, generar_eleccion, ids_votantes, version,
+    asignar_mas_cercano, IndiceGrilla,
+)
+from eleccion.services import donde_votar, ingesta, papeleta, simplificacion
+from eleccion.services.poligonos import dentro_poligono
+
+
+class ConsultasPorListadoTest(TestCase):
+    """
+    Fija la cantidad de queries de cada listado: no puede crecer con la
+    cantidad de filas ni con los vertices de las secciones anidadas.
+    """
+
+    def setUp(self):
+        self.client = APIClient()
+        self.empaquetada = Seccion(nombre='Empaquetada', tipo='departamento')
+        self.empaquetada.set_poligono([0, 0, 1], [0, 1, 1])
+        self.empaquetada.save()
+        self.con_puntos = Seccion.objects.create(nombre='Con puntos', tipo='municipio')
+        Punto.objects.bulk_create([
+            Punto(seccion=self.con_puntos, latitud=i, longitud=i) for i in range(10)
+        ])
+
+    def crear_filas(self, n):
+        inicio = Eleccion.objects.count()
+        for i in range(inicio, inicio + n):
+            seccion = self.empaquetada if i % 2 else self.con_puntos
+            eleccion = Eleccion.objects.create(nombre=f'Eleccion {i}', fecha=date(2025, 1, 1), seccion=seccion)
+            cargo = Cargo.objects.create(nombre=f'Cargo {i}', seccion=seccion)
+            Candidatura.objects.create(
+                partido_politico=f'Partido {i}', sigla=f'P{i}', color='#000',
+                cargo=cargo, eleccion=eleccion
+            )
+            recinto = Recinto.objects.create(nombre=f'Recinto {i}', latitud=0, longitud=0, seccion=seccion)
+            mesa = Mesa.objects.create(numero=1, cantidad=1, recinto=recinto, eleccion=eleccion)
+            Votante.objects.create(votante_id=i, eleccion=eleccion, mesa=mesa)
+
+    def assertConsultasConstantes(self, url, consultas):
+        # secciones, elecciones, cargos y recintos suman la lectura de su version (ver versiones.py)
+        self.crear_filas(5)
+        with self.assertNumQueries(consultas):
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+
+        self.crear_filas(45)
+        with self.assertNumQueries(consultas):
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_secciones(self):
+        self.assertConsultasConstantes('/eleccion/secciones/', 3)
+
+    def test_elecciones(self):
+        self.assertConsultasConstantes('/eleccion/elecciones/', 2)
+        self.assertConsultasConstantes('/eleccion/elecciones/?expand=seccion', 3)
+
+    def test_cargos(self):
+        self.assertConsultasConstantes('/eleccion/cargos/', 2)
+        self.assertConsultasConstantes('/eleccion/cargos/?expand=seccion', 3)
+
+    def test_recintos(self):
+        self.assertConsultasConstantes('/eleccion/recintos/', 3)
+        self.assertConsultasConstantes('/eleccion/recintos/?expand=seccion', 4)
+        self.assertConsultasConstantes('/eleccion/recintos/?fields=id,nombre', 2)
+
+    def test_recintos_por_seccion(self):
+        self.assertConsultasConstantes(f'/eleccion/recintos/seccion/{self.con_puntos.pk}/?expand=seccion', 4)
+
+    def test_candidaturas(self):
+        self.assertConsultasConstantes('/eleccion/candidaturas/', 1)
+        self.assertConsultasConstantes('/eleccion/candidaturas/?expand=cargo.seccion,eleccion.seccion', 3)
+
+    def test_papeleta(self):
+        self.crear_filas(1)
+        candidatura = Candidatura.objects.first()
+        Candidatura.objects.bulk_create([
+            Candidatura(partido_politico=f'Extra {i}', sigla='E', color='#fff',
+                        cargo_id=candidatura.cargo_id, eleccion_id=candidatura.eleccion_id)
+            for i in range(500)
+        ])
+        url = f'/eleccion/candidaturas/cargo/{candidatura.cargo_id}/eleccion/{candidatura.eleccion_id}/?expand=cargo,eleccion'
+        # la version la leen la vista async y la sync en la que delega, solo cuando no esta en cache
+        with self.assertNumQueries(3):
+            respuesta = self.client.get(url)
+        self.assertEqual(len(respuesta.json()), 501)
+
+        # la segunda vez sale de cache y con el ETag se puede revalidar; solo se lee la version
+        with self.assertNumQueries(1):
+            repetida = self.client.get(url)
+        self.assertEqual(repetida.content, respuesta.content)
+        with self.assertNumQueries(1):
+            revalidada = self.client.get(url, HTTP_IF_NONE_MATCH=respuesta['ETag'])
+        self.assertEqual(revalidada.status_code, 304)
+
+    def test_papeleta_se_invalida_al_guardar(self):
+        self.crear_filas(1)
+        candidatura = Candidatura.objects.first()
+        url = f'/eleccion/candidaturas/cargo/{candidatura.cargo_id}/eleccion/{candidatura.eleccion_id}/'
+        etag = self.client.get(url)['ETag']
+
+        candidatura.sigla = 'NUEVA'
+        candidatura.save()
+        respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()[0]['sigla'], 'NUEVA')
+
+    def test_papeleta_if_none_match(self):
+        self.crear_filas(1)
+        candidatura = Candidatura.objects.first()
+        url = f'/eleccion/candidaturas/cargo/{candidatura.cargo_id}/eleccion/{candidatura.eleccion_id}/'
+        etag = self.client.get(url)['ETag']
+        for valor, codigo in ((f'"otro", {etag}', 304), ('*', 304), (f'W/{etag}', 304),
+                              (f'"x{etag[1:]}', 200), (etag[:-2] + '"', 200)):
+            with self.subTest(if_none_match=valor):
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=valor).status_code, codigo)
+
+    def test_papeleta_version_no_se_repite(self):
+        self.crear_filas(1)
+        candidatura = Candidatura.objects.first()
+        url = f'/eleccion/candidaturas/cargo/{candidatura.cargo_id}/eleccion/{candidatura.eleccion_id}/'
+        self.client.get(url)
+        # se vacia la cache (cull o reinicio) y el cambio no dispara señales
+        cache.clear()
+        Candidatura.objects.filter(pk=candidatura.pk).update(sigla='NUEVA')
+        self.assertEqual(self.client.get(url).json()[0]['sigla'], 'NUEVA')
+
+    def test_papeleta_cambio_en_otro_proceso(self):
+        self.crear_filas(1)
+        candidatura = Candidatura.objects.first()
+        url = f'/eleccion/candidaturas/cargo/{candidatura.cargo_id}/eleccion/{candidatura.eleccion_id}/'
+        etag = self.client.get(url)['ETag']
+        # el cambio lo hace un proceso con su propia LocMemCache, como el worker
+        otra_cache = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'worker'}}
+        with override_settings(CACHES=otra_cache):
+            candidatura.sigla = 'NUEVA'
+            candidatura.save()
+        respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()[0]['sigla'], 'NUEVA')
+
+    def test_mesas(self):
+        self.assertConsultasConstantes('/eleccion/mesas/', 1)
+
+    def test_votantes(self):
+        self.assertConsultasConstantes('/eleccion/votantes/', 1)
+
+    def test_puntos_anidados(self):
+        self.crear_filas(2)
+        respuesta = self.client.get('/eleccion/candidaturas/?expand=cargo.seccion')
+        secciones = {c['cargo']['seccion']['nombre']: c['cargo']['seccion']['puntos'] for c in respuesta.json()}
+        self.assertEqual(len(secciones['Con puntos']), 10)
+        self.assertEqual(secciones['Empaquetada'][1], {'latitud': 0.0, 'longitud': 1.0})
+
+
+class CamposDinamicosTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.seccion = Seccion(nombre='Centro', tipo='municipio')
+        self.seccion.set_poligono([0, 0, 1], [0, 1, 1])
+        self.seccion.save()
+        self.recinto = Recinto.objects.create(nombre='Escuela', latitud=1, longitud=2, seccion=self.seccion)
+
+    def test_relacion_sale_como_id(self):
+        recinto = self.client.get('/eleccion/recintos/').json()[0]
+        self.assertEqual(recinto['seccion'], self.seccion.pk)
+
+    def test_expand_anida(self):
+        recinto = self.client.get('/eleccion/recintos/?expand=seccion').json()[0]
+        self.assertEqual(recinto['seccion']['nombre'], 'Centro')
+        self.assertEqual(len(recinto['seccion']['puntos']), 3)
+
+    def test_fields_recorta_respuesta_y_columnas(self):
+        with self.assertNumQueries(2) as consultas:
+            respuesta = self.client.get('/eleccion/recintos/?fields=id,nombre')
+        self.assertEqual(respuesta.json(), [{'id': self.recinto.pk, 'nombre': 'Escuela'}])
+        # la primera es la de la version
+        self.assertNotIn('latitud', consultas.captured_queries[1]['sql'])
+
+    def test_fields_en_anidado_con_calculados(self):
+        with self.assertNumQueries(3):
+            secciones = self.client.get('/eleccion/secciones/?fields=nombre,puntos').json()
+        self.assertEqual(set(secciones[0]), {'nombre', 'puntos'})
+        self.assertEqual(len(secciones[0]['puntos']), 3)
+
+    def test_expand_desconocido(self):
+        self.assertEqual(self.client.get('/eleccion/recintos/?expand=mesas').status_code, 400)
+
+    def test_forma_por_defecto(self):
+        # sin ?expand las relaciones salen como id; el frontend pide lo que anida
+        eleccion = Eleccion.objects.create(nombre='General', fecha=date(2025, 1, 1), seccion=self.seccion)
+        cargo = Cargo.objects.create(nombre='Alcalde', seccion=self.seccion)
+        Candidatura.objects.create(partido_politico='P', sigla='P', color='#000', cargo=cargo, eleccion=eleccion)
+        candidatura = self.client.get('/eleccion/candidaturas/').json()[0]
+        self.assertEqual((candidatura['cargo'], candidatura['eleccion']), (cargo.pk, eleccion.pk))
+        self.assertEqual(self.client.get('/eleccion/cargos/').json()[0]['seccion'], self.seccion.pk)
+        self.assertEqual(self.client.get('/eleccion/elecciones/').json()[0]['seccion'], self.seccion.pk)
+
+        # lo que piden CandidaturaService, CargoService y EleccionService
+        candidatura = self.client.get('/eleccion/candidaturas/?expand=cargo,eleccion').json()[0]
+        self.assertEqual(candidatura['cargo'], {'id': cargo.pk, 'nombre': 'Alcalde', 'seccion': self.seccion.pk})
+        self.assertEqual(candidatura['eleccion']['id'], eleccion.pk)
+        for url in ('/eleccion/cargos/?expand=seccion', '/eleccion/elecciones/?expand=seccion'):
+            seccion = self.client.get(url).json()[0]['seccion']
+            self.assertEqual((seccion['id'], seccion['nombre'], seccion['tipo']), (self.seccion.pk, 'Centro', 'municipio'))
+        creada = self.client.post(
+            '/eleccion/elecciones/?expand=seccion',
+            {'nombre': 'Otra', 'fecha': '2025-02-01', 'seccion_id': self.seccion.pk}, format='json'
+        )
+        self.assertEqual(creada.json()['seccion']['id'], self.seccion.pk)
+
+    def test_escritura_ignora_fields(self):
+        respuesta = self.client.post(
+            '/eleccion/cargos/?fields=id',
+            {'nombre': 'Alcalde', 'seccion_id': self.seccion.pk}, format='json'
+        )
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.json()['seccion'], self.seccion.pk)
+
+    def test_papeleta_por_variante(self):
+        eleccion = Eleccion.objects.create(nombre='General', fecha=date(2025, 1, 1), seccion=self.seccion)
+        cargo = Cargo.objects.create(nombre='Alcalde', seccion=self.seccion)
+        Candidatura.objects.create(partido_politico='P', sigla='P', color='#000', cargo=cargo, eleccion=eleccion)
+        url = f'/eleccion/candidaturas/cargo/{cargo.pk}/eleccion/{eleccion.pk}/'
+        self.assertEqual(self.client.get(url).json()[0]['cargo'], cargo.pk)
+        self.assertEqual(self.client.get(url + '?expand=cargo').json()[0]['cargo']['nombre'], 'Alcalde')
+
+
+class RespuestasTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        Seccion.objects.bulk_create([Seccion(nombre=f'Seccion {i}', tipo='municipio') for i in range(100)])
+
+    def test_gzip_negociado(self):
+        plano = self.client.get('/eleccion/secciones/')
+        comprimido = self.client.get('/eleccion/secciones/', HTTP_ACCEPT_ENCODING='br;q=0, gzip')
+        self.assertEqual(comprimido['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', comprimido['Vary'])
+        self.assertLess(len(comprimido.content), len(plano.content))
+        self.assertEqual(gzip.decompress(comprimido.content), plano.content)
+
+    def test_sin_comprimir(self):
+        # menos de COMPRESION_MINIMO bytes, o gzip rechazado por el cliente
+        seccion = Seccion.objects.first()
+        chica = self.client.get(f'/eleccion/secciones/{seccion.pk}/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertFalse(chica.has_header('Content-Encoding'))
+        rechazada = self.client.get('/eleccion/secciones/', HTTP_ACCEPT_ENCODING='gzip;q=0')
+        self.assertFalse(rechazada.has_header('Content-Encoding'))
+
+    def test_streaming_comprimido(self):
+        respuesta = self.client.get('/eleccion/secciones/geojson/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(respuesta['Content-Encoding'], 'gzip')
+        coleccion = json.loads(gzip.decompress(b''.join(respuesta.streaming_content)))
+        self.assertEqual(len(coleccion['features']), 100)
+
+    def test_json_invalido(self):
+        respuesta = self.client.post('/eleccion/cargos/', b'{"nombre": ', content_type='application/json')
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class CondicionalTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.seccion = Seccion.objects.create(nombre='Centro', tipo='municipio')
+        self.cargo = Cargo.objects.create(nombre='Alcalde', seccion=self.seccion)
+
+    def test_304_sin_consultar_el_listado(self):
+        respuesta = self.client.get('/eleccion/cargos/')
+        # solo la de las versiones
+        with self.assertNumQueries(1):
+            revalidada = self.client.get('/eleccion/cargos/', HTTP_IF_NONE_MATCH=respuesta['ETag'])
+        self.assertEqual(revalidada.status_code, 304)
+        self.assertEqual(revalidada['ETag'], respuesta['ETag'])
+        self.assertIn('Accept', revalidada['Vary'])
+
+    def test_sin_last_modified(self):
+        # con resolucion de segundos un cambio en el mismo segundo daria 304
+        respuesta = self.client.get('/eleccion/cargos/')
+        self.assertNotIn('Last-Modified', respuesta)
+        por_fecha = self.client.get('/eleccion/cargos/', HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(por_fecha.status_code, 200)
+
+    def test_etag_por_formato(self):
+        json_ = self.client.get('/eleccion/cargos/', HTTP_ACCEPT='application/json')
+        html = self.client.get('/eleccion/cargos/', HTTP_ACCEPT='text/html')
+        self.assertIn('Accept', json_['Vary'])
+        self.assertNotEqual(json_['ETag'], html['ETag'])
+        self.assertEqual(
+            self.client.get('/eleccion/cargos/', HTTP_ACCEPT='text/html', HTTP_IF_NONE_MATCH=json_['ETag']).status_code, 200
+        )
+
+    def test_guardar_cambia_etag(self):
+        etag = self.client.get(f'/eleccion/cargos/{self.cargo.pk}/')['ETag']
+        self.cargo.nombre = 'Gobernador'
+        self.cargo.save()
+        respuesta = self.client.get(f'/eleccion/cargos/{self.cargo.pk}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['nombre'], 'Gobernador')
+
+    def test_relacionados_y_parametros(self):
+        etag = self.client.get('/eleccion/cargos/?expand=seccion')['ETag']
+        self.assertNotEqual(etag, self.client.get('/eleccion/cargos/')['ETag'])
+        Punto.objects.create(seccion=self.seccion, latitud=1, longitud=1)
+        self.assertEqual(self.client.get('/eleccion/cargos/?expand=seccion', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_distribucion_en_lote_cambia_recintos(self):
+        recinto = Recinto.objects.create(nombre='Escuela', latitud=0, longitud=0, seccion=self.seccion)
+        eleccion = Eleccion.objects.create(nombre='General', fecha=date(2025, 1, 1), seccion=self.seccion)
+        etag = self.client.get('/eleccion/recintos/')['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            crear_y_distribuir(eleccion, [(recinto.pk, 2)], range(1, 11))
+        respuesta = self.client.get('/eleccion/recintos/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(set(respuesta.json()[0]['elecciones']), {eleccion.pk})
+
+    def test_no_encontrado_sin_etag(self):
+        self.assertFalse(self.client.get('/eleccion/cargos/999/').has_header('ETag'))
+
+
+@override_settings(PERFILADO=True, PERFILADO_TOKEN='secreto')
+class PerfiladoTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_X_PERFILADO_TOKEN='secreto')
+        self.client.delete('/_perfilado/')
+        seccion = Seccion.objects.create(nombre='Centro', tipo='municipio')
+        Cargo.objects.bulk_create([Cargo(nombre=f'Cargo {i}', seccion=seccion) for i in range(3)])
+
+    def test_server_timing(self):
+        respuesta = self.client.get('/eleccion/cargos/?expand=seccion')
+        self.assertRegex(respuesta['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ consultas", vista;dur=[\d.]+, render;dur=')
+
+    def test_resumen_por_endpoint(self):
+        for _ in range(5):
+            self.client.get('/eleccion/cargos/')
+        self.client.get('/eleccion/secciones/')
+        resumen = self.client.get('/_perfilado/').json()
+        self.assertEqual(resumen['muestras'], 6)
+        cargos = next(e for e in resumen['endpoints'] if e['endpoint'] == 'GET cargo-list')
+        self.assertEqual(cargos['requests'], 5)
+        self.assertEqual(cargos['consultas']['p50'], 2)
+        self.assertLessEqual(cargos['total']['p50'], cargos['total']['p99'])
+
+    def test_repetidas_marca_n_mas_uno(self):
+        # sin el select_related/prefetch cada cargo trae su seccion aparte
+        with mock.patch.object(CargoViewSet, 'get_queryset', lambda viewset: Cargo.objects.all()):
+            self.client.get('/eleccion/cargos/?expand=seccion')
+        cargos = self.client.get('/_perfilado/').json()['endpoints'][0]
+        self.assertGreaterEqual(cargos['repetidas_max'], 3)
+
+    def test_acceso(self):
+        anonimo = APIClient()
+        self.assertEqual(anonimo.get('/_perfilado/').status_code, 403)
+        self.assertEqual(anonimo.delete('/_perfilado/').status_code, 403)
+        anonimo.credentials(HTTP_X_PERFILADO_TOKEN='otro')
+        self.assertEqual(anonimo.get('/_perfilado/').status_code, 403)
+        with override_settings(DEBUG=True):
+            self.assertEqual(APIClient().get('/_perfilado/').status_code, 200)
+        staff = APIClient()
+        staff.force_login(User.objects.create(username='admin', is_staff=True))
+        self.assertEqual(staff.get('/_perfilado/').status_code, 200)
+
+    def test_delete_pide_csrf(self):
+        client = APIClient(enforce_csrf_checks=True)
+        client.credentials(HTTP_X_PERFILADO_TOKEN='secreto')
+        self.assertEqual(client.get('/_perfilado/').status_code, 200)
+        self.assertEqual(client.delete('/_perfilado/').status_code, 403)
+
+
+class AsincronasTest(TestCase):
+    """Las vistas async responden lo mismo que los @action que reemplazan."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.factory = APIRequestFactory()
+        seccion = Seccion.objects.create(nombre='Centro', tipo='municipio')
+        self.eleccion = Eleccion.objects.create(nombre='General', fecha=date(2025, 1, 1), seccion=seccion)
+        self.cargo = Cargo.objects.create(nombre='Alcalde', seccion=seccion)
+        self.recinto = Recinto.objects.create(nombre='Escuela', latitud=0, longitud=0, seccion=seccion)
+        Candidatura.objects.bulk_create([
+            Candidatura(partido_politico=f'Partido {i}', sigla=f'P{i}', color='#fff', cargo=self.cargo,
+                        eleccion=self.eleccion) for i in range(3)
+        ])
+        Mesa.objects.bulk_create([
+            Mesa(numero=i + 1, cantidad=10, recinto=self.recinto, eleccion=self.eleccion) for i in range(3)
+        ])
+
+    def test_papeleta(self):
+        url = f'/eleccion/candidaturas/cargo/{self.cargo.pk}/eleccion/{self.eleccion.pk}/?expand=cargo'
+        sync = papeleta_sync(self.factory.get(url), cargo_id=str(self.cargo.pk), eleccion_id=str(self.eleccion.pk))
+        # la primera la arma la vista sync, la segunda sale de cache leyendo solo la version
+        primera = self.client.get(url)
+        with self.assertNumQueries(1):
+            segunda = self.client.get(url)
+        for respuesta in (primera, segunda):
+            self.assertEqual(respuesta.content, sync.content)
+            self.assertEqual(respuesta['ETag'], sync['ETag'])
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=sync['ETag']).status_code, 304)
+        self.assertEqual(self.client.get(url.replace('expand=cargo', 'zoom=x')).status_code, 400)
+        self.assertEqual(self.client.post(url).status_code, 405)
+
+    def test_head(self):
+        # como los @action, HEAD responde igual que GET
+        papeleta = f'/eleccion/candidaturas/cargo/{self.cargo.pk}/eleccion/{self.eleccion.pk}/'
+        for url in (papeleta, papeleta, f'/eleccion/mesas/recinto/{self.recinto.pk}/eleccion/{self.eleccion.pk}/'):
+            with self.subTest(url=url):
+                self.assertEqual(self.client.head(url).status_code, 200)
+        etag = self.client.get(papeleta)['ETag']
+        self.assertEqual(self.client.head(papeleta, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_mesas_por_recinto(self):
+        url = f'/eleccion/mesas/recinto/{self.recinto.pk}/eleccion/{self.eleccion.pk}/'
+        sync = MesaViewSet.as_view({'get': 'get_mesas_por_recinto_y_eleccion'})(
+            self.factory.get(url), recinto_id=str(self.recinto.pk), eleccion_id=str(self.eleccion.pk)
+        )
+        with self.assertNumQueries(1):
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.json(), json.loads(sync.rendered_content))
+        self.assertEqual(self.client.get(f'/eleccion/mesas/recinto/999/eleccion/{self.eleccion.pk}/').json(), [])
+
+
+class EmpaquetadoTest(TestCase):
+
+    def test_ida_y_vuelta(self):
+        latitudes, longitudes = [-17.5, -17.25, 0.1, 1e-300], [-63.1, -63.0, 2 ** 0.5, -0.0]
+        blob = empaquetar_puntos(latitudes, longitudes)
+        self.assertEqual(len(blob), 8 * 2 * 4)
+        # float64 little-endian intercalado, lo que leen poligonos y geojson
+        self.assertEqual(np.frombuffer(blob, dtype='<f8').tolist()[:4], [-17.5, -63.1, -17.25, -63.0])
+        self.assertEqual(desempaquetar_puntos(blob), list(zip(latitudes, longitudes)))
+        self.assertEqual(desempaquetar_puntos(empaquetar_puntos([], [])), [])
+
+    def test_puntos_de_seccion_empaquetada_no_se_editan(self):
+        client = APIClient()
+        empaquetada = Seccion(nombre='Empaquetada')
+        empaquetada.set_poligono([0, 0, 1], [0, 1, 1])
+        empaquetada.save()
+        suelta = Seccion.objects.create(nombre='Suelta')
+        punto = Punto.objects.create(seccion=suelta, latitud=0, longitud=0)
+
+        respuesta = client.post('/eleccion/puntos/', {'seccion': empaquetada.pk, 'latitud': 5, 'longitud': 5}, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('/eleccion/secciones/importar-geojson/', respuesta.json()['seccion'][0])
+        respuesta = client.patch(f'/eleccion/puntos/{punto.pk}/', {'seccion': empaquetada.pk}, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertFalse(Punto.objects.filter(seccion=empaquetada).exists())
+
+        respuesta = client.post('/eleccion/puntos/', {'seccion': suelta.pk, 'latitud': 5, 'longitud': 5}, format='json')
+        self.assertEqual(respuesta.status_code, 201)
+
+
+class MigracionEmpaquetadoTest(TransactionTestCase):
+    # 0015 empaqueta los Punto en Seccion.poligono y 0019 borra las filas;
+    # hacia atras se recrean los Punto y se vacia el blob
+
+    antes = [('eleccion', '0014_seccion_poligono')]
+    despues = [('eleccion', '0019_borrar_puntos_empaquetados')]
+
+    def migrar(self, destino):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(destino)
+        return executor.loader.project_state(destino).apps
+
+    def tearDown(self):
+        self.migrar(MigrationExecutor(connection).loader.graph.leaf_nodes())
+
+    def test_ida_y_vuelta(self):
+        apps = self.migrar(self.antes)
+        Seccion_ = apps.get_model('eleccion', 'Seccion')
+        Punto_ = apps.get_model('eleccion', 'Punto')
+        vertices = [(0.5, -1.0), (1.5, -2.0), (2.5, -3.0)]
+        con_puntos = Seccion_.objects.create(nombre='A')
+        for lat, lng in vertices:
+            Punto_.objects.create(seccion=con_puntos, latitud=lat, longitud=lng)
+        vacia = Seccion_.objects.create(nombre='B')
+
+        apps = self.migrar(self.despues)
+        Seccion_ = apps.get_model('eleccion', 'Seccion')
+        Punto_ = apps.get_model('eleccion', 'Punto')
+        self.assertEqual(desempaquetar_puntos(Seccion_.objects.get(pk=con_puntos.pk).poligono), vertices)
+        self.assertIsNone(Seccion_.objects.get(pk=vacia.pk).poligono)
+        self.assertFalse(Punto_.objects.exists())
+
+        apps = self.migrar(self.antes)
+        Seccion_ = apps.get_model('eleccion', 'Seccion')
+        Punto_ = apps.get_model('eleccion', 'Punto')
+        self.assertFalse(Seccion_.objects.filter(poligono__isnull=False).exists())
+        self.assertEqual(
+            list(Punto_.objects.filter(seccion_id=con_puntos.pk).order_by('id').values_list('latitud', 'longitud')),
+            vertices
+        )
+        self.assertFalse(Punto_.objects.filter(seccion_id=vacia.pk).exists())
+
+
+class ClasificarTest(TestCase):
+    # dos cuadrados vecinos de 1 grado (A a la izquierda de B) y uno chico dentro de A
+
+    def setUp(self):
+        self.client = APIClient()
+        self.a = self.seccion('A', 'municipio', 0, 0, 1)
+        self.b = self.seccion('B', 'municipio', 0, 1, 1)
+        self.chica = self.seccion('Chica', 'distrito', 0.25, 0.25, 0.5)
+
+    def seccion(self, nombre, tipo, lat, lng, lado):
+        seccion = Seccion(nombre=nombre, tipo=tipo)
+        seccion.set_poligono([lat, lat + lado, lat + lado, lat], [lng, lng, lng + lado, lng + lado])
+        seccion.save()
+        return seccion
+
+    def clasificar(self, *puntos, **extra):
+        return self.client.post('/eleccion/secciones/clasificar/', {
+            'puntos': [{'latitud': lat, 'longitud': lng} for lat, lng in puntos], **extra,
+        }, format='json')
+
+    def test_dentro_y_fuera(self):
+        respuesta = self.clasificar((0.5, 0.1), (0.5, 1.5), (0.5, 2.5), (-0.5, 0.5), (0.3, 0.3))
+        self.assertEqual(respuesta.status_code, 200)
+        # la chica gana sobre A por ser la de menor area
+        self.assertEqual(respuesta.json()['secciones'], [self.a.pk, self.b.pk, None, None, self.chica.pk])
+
+    def test_borde(self):
+        # el borde compartido cae en una sola seccion; izquierdo e inferior adentro, derecho y superior afuera
+        respuesta = self.clasificar((0.5, 1.0), (0.5, 0.0), (0.5, 2.0), (0.0, 0.5), (1.0, 0.5))
+        self.assertEqual(respuesta.json()['secciones'], [self.b.pk, self.a.pk, None, self.a.pk, None])
+
+    def test_por_tipo(self):
+        respuesta = self.clasificar((0.3, 0.3), (0.5, 1.5), tipo='distrito')
+        self.assertEqual(respuesta.json()['secciones'], [self.chica.pk, None])
+        respuesta = self.client.post('/eleccion/secciones/clasificar/', {
+            'puntos': [{'latitud': '0,3', 'longitud': '0,3'}], 'tipo': 'municipio',
+        }, format='json')
+        self.assertEqual(respuesta.json()['secciones'], [self.a.pk])
+
+    def test_sin_secciones(self):
+        Seccion.objects.all().delete()
+        self.assertEqual(self.clasificar((0.5, 0.5)).json()['secciones'], [None])
+
+    def test_cuerpo_invalido(self):
+        for cuerpo in ({}, {'puntos': []}, {'puntos': [{'latitud': 1}]}, {'puntos': [{'latitud': 'x', 'longitud': 1}]},
+                       {'puntos': 'abc'}, {'puntos': 5}, {'puntos': [None]}, {'puntos': {'latitud': 1, 'longitud': 1}}):
+            with self.subTest(cuerpo=cuerpo):
+                respuesta = self.client.post('/eleccion/secciones/clasificar/', cuerpo, format='json')
+                self.assertEqual(respuesta.status_code, 400)
+
+
+class PaginacionTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        seccion = Seccion.objects.create(nombre='S')
+        self.eleccion = Eleccion.objects.create(nombre='E', fecha=date(2025, 1, 1), seccion=seccion)
+        recinto = Recinto.objects.create(nombre='R', latitud=0, longitud=0, seccion=seccion)
+        self.mesas = Mesa.objects.bulk_create([
+            Mesa(numero=n, cantidad=0, recinto=recinto, eleccion=self.eleccion) for n in range(1, 4)
+        ])
+        Votante.objects.bulk_create([
+            Votante(votante_id=i, eleccion=self.eleccion, mesa=self.mesas[i % 3]) for i in range(1200)
+        ])
+
+    def recorrer(self, url):
+        # sigue `next` hasta el final, devuelve los ids y cuantas paginas hubo
+        ids, paginas = [], 0
+        while url:
+            respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200)
+            ids += [fila['id'] for fila in respuesta.json()['results']]
+            url = respuesta.json()['next']
+            paginas += 1
+        return ids, paginas
+
+    def test_siguiente_hasta_el_final(self):
+        ids, paginas = self.recorrer('/eleccion/votantes/?page_size=500')
+        self.assertEqual(paginas, 3)
+        self.assertEqual(ids, list(Votante.objects.order_by('id').values_list('id', flat=True)))
+        # con filtro el cursor conserva los parametros
+        ids, paginas = self.recorrer(f'/eleccion/votantes/?mesa={self.mesas[0].pk}&page_size=150')
+        self.assertEqual((len(ids), paginas), (400, 3))
+
+    def test_page_size(self):
+        respuesta = self.client.get('/eleccion/votantes/').json()
+        self.assertEqual(len(respuesta['results']), 100)
+        self.assertIsNone(respuesta['previous'])
+        # el tope es 1000 aunque se pida mas
+        self.assertEqual(len(self.client.get('/eleccion/votantes/?page_size=5000').json()['results']), 1000)
+        self.assertEqual(len(self.client.get('/eleccion/mesas/?page_size=2').json()['results']), 2)
+
+    def test_filtros(self):
+        respuesta = self.client.get(f'/eleccion/mesas/?eleccion={self.eleccion.pk}&page_size=10')
+        self.assertEqual([m['id'] for m in respuesta.json()['results']], [m.pk for m in self.mesas])
+        self.assertEqual(self.client.get(f'/eleccion/mesas/?eleccion={self.eleccion.pk + 1}').json()['results'], [])
+        # un parametro vacio no filtra
+        self.assertEqual(len(self.client.get('/eleccion/mesas/?recinto=').json()['results']), 3)
+
+    def test_filtros_no_enteros(self):
+        for url in ('/eleccion/votantes/?eleccion=abc', '/eleccion/votantes/?mesa=1.5',
+                    '/eleccion/votantes/?recinto=x', '/eleccion/mesas/?eleccion=abc', '/eleccion/mesas/?recinto=1e3'):
+            with self.subTest(url=url):
+                respuesta = self.client.get(url)
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertIn('Debe ser un número válido', str(respuesta.json()))
+
+
+class SimplificacionTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        angulos = [2 * math.pi * i / 2000 for i in range(2000)]
+        self.seccion = Seccion(nombre='Circulo', tipo='municipio')
+        self.seccion.set_poligono([math.sin(a) for a in angulos], [math.cos(a) for a in angulos])
+        # los niveles se rearman al confirmar la transaccion
+        with self.captureOnCommitCallbacks(execute=True):
+            self.seccion.save()
+
+    def test_niveles_se_guardan_al_crear(self):
+        self.assertEqual(self.seccion.simplificadas.count(), 6)
+
+    def test_tolerance_reduce_vertices(self):
+        completa = self.client.get('/eleccion/secciones/').json()[0]['puntos']
+        with self.assertNumQueries(4):
+            simplificada = self.client.get('/eleccion/secciones/?tolerance=0.01').json()[0]['puntos']
+        self.assertEqual(len(completa), 2000)
+        self.assertLess(len(simplificada), len(completa) / 10)
+        self.assertGreaterEqual(len(simplificada), 3)
+
+    def test_zoom_alto_devuelve_todo(self):
+        puntos = self.client.get('/eleccion/secciones/?zoom=22').json()[0]['puntos']
+        self.assertEqual(len(puntos), 2000)
+
+    def test_nivel_en_anidados(self):
+        Recinto.objects.create(nombre='R', latitud=0, longitud=0, seccion=self.seccion)
+        puntos = self.client.get('/eleccion/recintos/?zoom=3&expand=seccion').json()[0]['seccion']['puntos']
+        self.assertLess(len(puntos), 200)
+
+    def test_tolerance_invalida(self):
+        self.assertEqual(self.client.get('/eleccion/secciones/?tolerance=abc').status_code, 400)
+
+    @override_settings(SECCION_POLIGONO_EMPAQUETADO=False)
+    def test_niveles_con_filas_de_punto(self):
+        angulos = [2 * math.pi * i / 500 for i in range(500)]
+        respuesta = self.client.post('/eleccion/secciones/crear/', {
+            'nombre': 'Suelta', 'tipo': 'municipio',
+            'puntos': [{'latitud': math.sin(a), 'longitud': math.cos(a)} for a in angulos],
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 201)
+        suelta = Seccion.objects.get(pk=respuesta.json()['id'])
+        self.assertIsNone(suelta.poligono)
+        self.assertEqual(suelta.simplificadas.count(), 6)
+        url = f'/eleccion/secciones/{suelta.pk}/'
+        self.assertLess(len(self.client.get(url + '?tolerance=0.01').json()['puntos']), 50)
+
+        # editar o borrar un Punto rearma los niveles
+        punto = suelta.puntos.order_by('id').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f'/eleccion/puntos/{punto.pk}/', {'latitud': 5}, format='json')
+        self.assertIn(5.0, [p['latitud'] for p in self.client.get(url + '?tolerance=0.01').json()['puntos']])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f'/eleccion/puntos/{punto.pk}/')
+        self.assertNotIn(5.0, [p['latitud'] for p in self.client.get(url + '?tolerance=0.01').json()['puntos']])
+
+    def test_un_rearmado_por_transaccion(self):
+        suelta = Seccion.objects.create(nombre='Suelta')
+        with mock.patch.object(simplificacion, 'actualizar_simplificaciones',
+                               wraps=simplificacion.actualizar_simplificaciones) as actualizar:
+            with self.captureOnCommitCallbacks(execute=True):
+                with transaction.atomic():
+                    for i in range(50):
+                        Punto.objects.create(seccion=suelta, latitud=math.sin(i), longitud=math.cos(i))
+        actualizar.assert_called_once()
+        self.assertEqual(suelta.simplificadas.count(), 6)
+
+    def test_rollback_no_rearma(self):
+        suelta = Seccion.objects.create(nombre='Suelta')
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                Punto.objects.create(seccion=suelta, latitud=0, longitud=0)
+                raise IntegrityError
+        self.assertEqual(suelta.simplificadas.count(), 0)
+        # la marca que quedo de la transaccion revertida no tapa la siguiente
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(4):
+                Punto.objects.create(seccion=suelta, latitud=i, longitud=i % 2)
+        self.assertEqual(suelta.simplificadas.count(), 6)
+
+    def test_renombrar_no_rearma(self):
+        seccion = Seccion.objects.get(pk=self.seccion.pk)
+        with mock.patch.object(simplificacion, 'actualizar_simplificaciones') as actualizar:
+            with self.captureOnCommitCallbacks(execute=True):
+                respuesta = self.client.put(f'/eleccion/secciones/{seccion.pk}/',
+                                            {'nombre': 'Otro nombre', 'tipo': 'municipio'}, format='json')
+                seccion.tipo = 'provincia'
+                seccion.save()
+            self.assertEqual(respuesta.status_code, 200)
+            actualizar.assert_not_called()
+
+            # cambiar el poligono si rearma
+            with self.captureOnCommitCallbacks(execute=True):
+                seccion.set_poligono([0, 0, 1], [0, 1, 1])
+                seccion.save()
+            actualizar.assert_called_once()
+
+    def test_sin_nivel_devuelve_poligono_completo(self):
+        suelta = Seccion.objects.create(nombre='Suelta')
+        Punto.objects.bulk_create([Punto(seccion=suelta, latitud=i, longitud=i % 2) for i in range(4)])
+        puntos = self.client.get(f'/eleccion/secciones/{suelta.pk}/?tolerance=0.01').json()['puntos']
+        self.assertEqual(len(puntos), 4)
+
+
+class IndicesVotanteTest(TestCase):
+
+    def setUp(self):
+        seccion = Seccion.objects.create(nombre='S')
+        self.eleccion = Eleccion.objects.create(nombre='E', fecha=date(2025, 1, 1), seccion=seccion)
+        recinto = Recinto.objects.create(nombre='R', latitud=0, longitud=0, seccion=seccion)
+        self.mesa = Mesa.objects.create(numero=1, cantidad=1000, recinto=recinto, eleccion=self.eleccion)
+        Votante.objects.bulk_create([
+            Votante(votante_id=i, eleccion=self.eleccion, mesa=self.mesa) for i in range(1000)
+        ])
+
+    def test_busqueda_por_eleccion_y_votante_usa_indice(self):
+        plan = Votante.objects.filter(eleccion_id=self.eleccion.pk, votante_id=10).explain()
+        # en SQLite la restriccion queda como indice automatico de la tabla
+        self.assertIn('USING INDEX', plan)
+        self.assertIn('eleccion_id=? AND votante_id=?', plan)
+
+    def test_votante_repetido_en_eleccion(self):
+        with self.assertRaises(IntegrityError):
+            Votante.objects.create(votante_id=10, eleccion=self.eleccion, mesa=self.mesa)
+
+
+class DondeVotarTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        seccion = Seccion.objects.create(nombre='S')
+        self.eleccion = Eleccion.objects.create(nombre='E', fecha=date(2025, 1, 1), seccion=seccion)
+        self.recinto = Recinto.objects.create(nombre='Colegio', latitud=-17.5, longitud=-63.1, seccion=seccion)
+        self.mesa = Mesa.objects.create(numero=3, cantidad=10, recinto=self.recinto, eleccion=self.eleccion)
+        Votante.objects.bulk_create([
+            Votante(votante_id=i, eleccion=self.eleccion, mesa=self.mesa) for i in range(10)
+        ])
+        invalidar_donde_votar()
+
+    def url(self, votante_id):
+        return f'/eleccion/votantes/donde-votar/{self.eleccion.pk}/{votante_id}/'
+
+    def test_busqueda_sin_queries_despues_de_armar(self):
+        self.client.get(self.url(0))
+        # solo se lee la version, el indice no se rearma
+        with self.assertNumQueries(1):
+            respuesta = self.client.get(self.url(7))
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['mesa'], 3)
+        self.assertEqual(respuesta.json()['recinto'], 'Colegio')
+
+    def test_votante_inexistente(self):
+        self.assertEqual(self.client.get(self.url(99)).status_code, 404)
+
+    def test_se_rearma_al_cambiar_la_mesa(self):
+        self.client.get(self.url(0))
+        otra = Mesa.objects.create(numero=4, cantidad=1, recinto=self.recinto, eleccion=self.eleccion)
+        votante = Votante.objects.get(votante_id=5)
+        votante.mesa = otra
+        votante.save()
+        self.assertEqual(self.client.get(self.url(5)).json()['mesa'], 4)
+
+    def test_votante_fuera_de_rango(self):
+        self.assertEqual(self.client.get(self.url(2 ** 63)).status_code, 404)
+        self.assertEqual(self.client.get(self.url(10 ** 30)).status_code, 404)
+
+    def test_eleccion_inexistente(self):
+        for eleccion_id in (self.eleccion.pk + 99, 10 ** 30):
+            with self.subTest(eleccion=eleccion_id):
+                respuesta = self.client.get(f'/eleccion/votantes/donde-votar/{eleccion_id}/1/')
+                self.assertEqual(respuesta.status_code, 404)
+                self.assertEqual(respuesta.json(), {'error': 'Elección no encontrada.'})
+        self.assertNotIn(self.eleccion.pk + 99, donde_votar._indices)
+
+    def test_invalidacion_por_eleccion(self):
+        otra = Eleccion.objects.create(nombre='Otra', fecha=date(2025, 1, 1), seccion=self.eleccion.seccion)
+        self.client.get(self.url(0))
+        # un cambio en otra eleccion no rearma esta: solo se lee la version
+        Mesa.objects.create(numero=1, cantidad=0, recinto=self.recinto, eleccion=otra)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(self.url(0)).status_code, 200)
+        # el recinto si esta en esta eleccion
+        self.recinto.nombre = 'Escuela'
+        self.recinto.save()
+        self.assertEqual(self.client.get(self.url(0)).json()['recinto'], 'Escuela')
+
+    def test_cache_vaciada_no_repite_version(self):
+        self.client.get(self.url(0))
+        otra = Mesa.objects.create(numero=4, cantidad=1, recinto=self.recinto, eleccion=self.eleccion)
+        # update() no dispara señales; una cache vaciada (cull o reinicio) igual debe rearmar
+        Votante.objects.filter(votante_id=5).update(mesa=otra)
+        cache.clear()
+        self.assertEqual(self.client.get(self.url(5)).json()['mesa'], 4)
+
+
+class RebalanceoTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        seccion = Seccion.objects.create(nombre='S')
+        self.eleccion = Eleccion.objects.create(nombre='E', fecha=date(2025, 1, 1), seccion=seccion)
+        recinto = Recinto.objects.create(nombre='R', latitud=0, longitud=0, seccion=seccion)
+        crear_y_distribuir(self.eleccion, [(recinto.pk, 3)], range(30))
+        self.mesas = list(Mesa.objects.filter(eleccion=self.eleccion).order_by('pk'))
+
+    def asignacion(self):
+        return dict(Votante.objects.filter(eleccion=self.eleccion).values_list('votante_id', 'mesa_id'))
+
+    def test_mueve_lo_minimo(self):
+        antes = self.asignacion()
+        # la primera mesa pierde 4, tiene que recibir 2 altas y 1 movido
+        respuesta = self.client.post('/eleccion/mesas/rebalancear/', {
+            'eleccion': self.eleccion.pk, 'altas': [100, 101], 'bajas': [1, 2, 3, 4],
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+        resumen = respuesta.json()
+        self.assertEqual(resumen['eliminados'], 4)
+        self.assertEqual(resumen['insertados'], 2)
+        self.assertEqual(resumen['movidos'], 1)
+
+        despues = self.asignacion()
+        tamanos = [list(despues.values()).count(m.pk) for m in self.mesas]
+        self.assertLessEqual(max(tamanos) - min(tamanos), 1)
+        cambiados = [v for v in despues if v in antes and despues[v] != antes[v]]
+        self.assertEqual(len(cambiados), 1)
+        self.assertEqual(
+            [m.cantidad for m in Mesa.objects.filter(eleccion=self.eleccion).order_by('pk')], tamanos
+        )
+
+    def test_baja_del_jefe_reasigna(self):
+        jefe = self.mesas[0].jefe_id
+        resumen = rebalancear(self.eleccion, bajas=[jefe])
+        self.assertEqual(resumen['jefes_reasignados'], 1)
+        self.mesas[0].refresh_from_db()
+        self.assertNotEqual(self.mesas[0].jefe_id, jefe)
+        self.assertIsNotNone(self.mesas[0].jefe_id)
+
+    def test_altas_repetidas_no_se_insertan(self):
+        resumen = rebalancear(self.eleccion, altas=[5, 200])
+        self.assertEqual(resumen['repetidos'], 1)
+        self.assertEqual(resumen['insertados'], 1)
+        self.assertEqual(resumen['movidos'], 0)
+
+
+@override_settings(TRABAJOS_CHUNK=7)
+class TrabajosTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        seccion = Seccion.objects.create(nombre='S')
+        self.eleccion = Eleccion.objects.create(nombre='E', fecha=date(2025, 1, 1), seccion=seccion)
+        self.recinto = Recinto.objects.create(nombre='R', latitud=0, longitud=0, seccion=seccion)
+
+    def encolar_distribucion(self):
+        respuesta = self.client.post('/eleccion/mesas/crear-distribuir/?segundo_plano=1', {
+            'eleccion': self.eleccion.pk,
+            'recintos': [{'recinto': self.recinto.pk, 'mesas': 4}],
+            'votantes': list(range(50)),
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 202)
+        self.assertTrue(respuesta['Location'].endswith(f"/eleccion/jobs/{respuesta.json()['trabajo']}/"))
+        return respuesta.json()['trabajo']
+
+    def test_distribucion_en_segundo_plano(self):
+        trabajo_id = self.encolar_distribucion()
+        self.assertFalse(Votante.objects.exists())
+
+        call_command('procesar_trabajos', una_vez=True, stdout=StringIO())
+
+        estado = self.client.get(f'/eleccion/jobs/{trabajo_id}/').json()
+        self.assertEqual(estado['estado'], Trabajo.TERMINADO)
+        self.assertEqual(estado['progreso'], 1.0)
+        self.assertEqual(estado['resultado'], {'mesas': 4, 'votantes': 50})
+        tamanos = sorted(Mesa.objects.filter(eleccion=self.eleccion).values_list('cantidad', flat=True))
+        self.assertEqual(tamanos, [12, 12, 13, 13])
+        self.assertEqual(Votante.objects.filter(eleccion=self.eleccion).count(), 50)
+        self.assertFalse(Mesa.objects.filter(eleccion=self.eleccion, jefe_id=None).exists())
+
+    def test_se_retoma_desde_el_checkpoint(self):
+        trabajo_id = self.encolar_distribucion()
+        trabajo = tomar('caido')
+        # borrar, crear mesas y dos chunks de votantes, y el worker se corta
+        self.assertFalse(ejecutar(trabajo, max_pasos=3))
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.procesados, 14)
+        self.assertIsNotNone(trabajo.eta_segundos)
+
+        # mientras no venza, ningun otro worker lo toma
+        self.assertIsNone(tomar('otro'))
+        with override_settings(TRABAJOS_VENCIMIENTO=-1):
+            retomado = tomar('otro')
+        self.assertEqual(retomado.pk, trabajo_id)
+        self.assertTrue(ejecutar(retomado))
+        ids = sorted(Votante.objects.filter(eleccion=self.eleccion).values_list('votante_id', flat=True))
+        self.assertEqual(ids, list(range(50)))
+
+        # el worker original ya no puede confirmar pasos
+        with self.assertLogs('eleccion.services.trabajos', 'WARNING'):
+            self.assertFalse(ejecutar(trabajo))
+
+    def procesar(self, respuesta):
+        self.assertEqual(respuesta.status_code, 202)
+        call_command('procesar_trabajos', una_vez=True, stdout=StringIO())
+        return Trabajo.objects.get(pk=respuesta.json()['trabajo'])
+
+    def test_repetidos_se_rechazan_antes_de_encolar(self):
+        crear_y_distribuir(self.eleccion, [(self.recinto.pk, 2)], range(30))
+        respuesta = self.client.post('/eleccion/mesas/crear-distribuir/?segundo_plano=1', {
+            'eleccion': self.eleccion.pk,
+            'recintos': [{'recinto': self.recinto.pk, 'mesas': 4}],
+            'votantes': list(range(50)) + [7],
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertFalse(Trabajo.objects.exists())
+        # la distribucion anterior sigue entera
+        self.assertEqual(Votante.objects.filter(eleccion=self.eleccion).count(), 30)
+
+    def test_distribuir_en_segundo_plano(self):
+        Mesa.objects.bulk_create([Mesa(numero=n, cantidad=0, recinto=self.recinto, eleccion=self.eleccion) for n in range(3)])
+        url = '/eleccion/mesas/distribuir/?segundo_plano=1'
+        datos = {'seccionId': self.recinto.seccion_id, 'eleccionId': self.eleccion.pk}
+        self.assertEqual(
+            self.client.post(url, dict(datos, votantes=[1, 2, 2]), format='json').status_code, 400
+        )
+        trabajo = self.procesar(self.client.post(url, dict(datos, votantes=list(range(100, 110))), format='json'))
+        self.assertEqual(trabajo.resultado, {'mesas': 3, 'votantes': 10})
+        mesas = list(Mesa.objects.order_by('pk'))
+        self.assertEqual([m.cantidad for m in mesas], [4, 3, 3])
+        self.assertEqual(
+            list(Votante.objects.filter(mesa=mesas[1]).order_by('votante_id').values_list('votante_id', flat=True)),
+            [104, 105, 106]
+        )
+
+    def test_cercania_y_planificar_en_segundo_plano(self):
+        otro = Recinto.objects.create(nombre='Lejos', latitud=0, longitud=1, seccion=self.recinto.seccion)
+        votantes = [{'votante_id': i, 'latitud': 0, 'longitud': 0.9 * (i % 2)} for i in range(20)]
+        trabajo = self.procesar(self.client.post('/eleccion/mesas/distribuir-cercania/?segundo_plano=1', {
+            'eleccion': self.eleccion.pk, 'votantes': votantes, 'votantes_por_mesa': 10,
+            'recintos': [{'recinto': self.recinto.pk, 'mesas': 2}, {'recinto': otro.pk, 'mesas': 1}],
+        }, format='json'))
+        self.assertEqual(trabajo.resultado, {'mesas': 3, 'votantes': 20})
+        self.assertEqual(
+            sorted(Votante.objects.filter(mesa__recinto=otro).values_list('votante_id', flat=True)),
+            list(range(1, 20, 2))
+        )
+        self.assertFalse(Mesa.objects.filter(eleccion=self.eleccion, jefe_id=None).exists())
+
+        trabajo = self.procesar(self.client.post('/eleccion/mesas/planificar/?segundo_plano=1', {
+            'eleccion': self.eleccion.pk, 'max_por_mesa': 4, 'aplicar': True, 'votantes': votantes,
+            'recintos': [{'recinto': self.recinto.pk}, {'recinto': otro.pk}],
+        }, format='json'))
+        self.assertEqual(trabajo.resultado, {'mesas': 6, 'votantes': 20})
+        self.assertEqual(Votante.objects.filter(eleccion=self.eleccion).count(), 20)
+
+    def test_reiniciar(self):
+        crear_y_distribuir(self.eleccion, [(self.recinto.pk, 2)], range(30))
+        trabajo_id = self.client.post(
+            '/eleccion/mesas/reiniciar/', {'eleccion': self.eleccion.pk}, format='json'
+        ).json()['trabajo']
+        call_command('procesar_trabajos', una_vez=True, stdout=StringIO())
+        self.assertEqual(Trabajo.objects.get(pk=trabajo_id).resultado, {'votantes': 30, 'mesas': 2})
+        self.assertFalse(Mesa.objects.filter(eleccion=self.eleccion).exists())
+
+    def test_worker_en_otro_proceso_invalida(self):
+        crear_y_distribuir(self.eleccion, [(self.recinto.pk, 2)], range(30))
+        donde = f'/eleccion/votantes/donde-votar/{self.eleccion.pk}/5/'
+        mesas = '/eleccion/recintos/'
+        self.assertEqual(self.client.get(donde).status_code, 200)
+        etag = self.client.get(mesas)['ETag']
+
+        self.client.post('/eleccion/mesas/reiniciar/', {'eleccion': self.eleccion.pk}, format='json')
+        # el worker tiene su propia LocMemCache, como en otro proceso
+        otra_cache = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'worker'}}
+        with override_settings(CACHES=otra_cache), self.captureOnCommitCallbacks(execute=True):
+            call_command('procesar_trabajos', una_vez=True, stdout=StringIO())
+
+        self.assertEqual(self.client.get(donde).status_code, 404)
+        self.assertEqual(self.client.get(mesas, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class PlanificacionTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        seccion = Seccion.objects.create(nombre='S')
+        self.eleccion = Eleccion.objects.create(nombre='E', fecha=date(2025, 1, 1), seccion=seccion)
+        self.urbano = Recinto.objects.create(nombre='Urbano', latitud=0, longitud=0, seccion=seccion)
+        self.rural = Recinto.objects.create(nombre='Rural', latitud=1, longitud=1, seccion=seccion)
+
+    def test_dry_run_con_cantidades(self):
+        respuesta = self.client.post('/eleccion/mesas/planificar/', {
+            'max_por_mesa': 100,
+            'recintos': [
+                {'recinto': self.urbano.pk, 'votantes': 950, 'mesas_max': 8},
+                {'recinto': self.rural.pk, 'votantes': 40},
+            ],
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+        plan = respuesta.json()
+        urbano, rural = plan['recintos']
+        self.assertEqual((urbano['mesas'], urbano['excedente'], urbano['por_mesa_max']), (8, 150, 100))
+        self.assertEqual((rural['mesas'], rural['por_mesa_max']), (1, 40))
+        self.assertFalse(plan['aplicado'])
+        self.assertFalse(Mesa.objects.exists())
+
+    def test_aplicar_por_cercania(self):
+        # 30 votantes junto al urbano, que solo admite 20: el resto va al rural
+        votantes = [{'votante_id': i, 'latitud': 0.01, 'longitud': 0.01} for i in range(30)]
+        datos = {
+            'eleccion': self.eleccion.pk,
+            'max_por_mesa': 8,
+            'recintos': [
+                {'recinto': self.urbano.pk, 'capacidad': 20},
+                {'recinto': self.rural.pk},
+            ],
+            'votantes': votantes,
+        }
+        plan = self.client.post('/eleccion/mesas/planificar/', datos, format='json').json()
+        self.assertEqual([r['votantes'] for r in plan['recintos']], [20, 10])
+        self.assertEqual([r['mesas'] for r in plan['recintos']], [3, 2])
+        self.assertFalse(Mesa.objects.exists())
+
+        respuesta = self.client.post('/eleccion/mesas/planificar/', dict(datos, aplicar=True), format='json')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(Mesa.objects.filter(eleccion=self.eleccion, recinto=self.urbano).count(), 3)
+        self.assertEqual(Votante.objects.filter(mesa__recinto=self.rural).count(), 10)
+        self.assertLessEqual(max(Mesa.objects.values_list('cantidad', flat=True)), 8)
+
+    def test_aplicar_sin_coordenadas(self):
+        respuesta = self.client.post('/eleccion/mesas/planificar/', {
+            'max_por_mesa': 100, 'aplicar': True,
+            'recintos': [{'recinto': self.urbano.pk, 'votantes': 10}],
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+
+
+@override_settings(GEOJSON_LOTE=2)
+class GeoJSONTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def coleccion(self, n):
+        return {'type': 'FeatureCollection', 'features': [{
+            'type': 'Feature',
+            'properties': {'nombre': f'Seccion {i}', 'tipo': 'municipio'},
+            'geometry': {'type': 'Polygon', 'coordinates': [[[i, 0], [i + 1, 0], [i + 1, 1], [i, 1], [i, 0]]]},
+        } for i in range(n)]}
+
+    def test_importar_y_exportar_secciones(self):
+        respuesta = self.client.post(
+            '/eleccion/secciones/importar-geojson/', json.dumps(self.coleccion(5)),
+            content_type='application/geo+json'
+        )
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.json(), {'features': 5, 'creadas': 5, 'actualizadas': 0})
+        seccion = Seccion.objects.get(nombre='Seccion 3')
+        self.assertEqual(seccion.get_poligono(), [(0, 3), (0, 4), (1, 4), (1, 3)])
+        self.assertEqual(seccion.simplificadas.count(), 6)
+
+        respuesta = self.client.get('/eleccion/secciones/geojson/')
+        self.assertEqual(respuesta['Content-Type'], 'application/geo+json')
+        exportado = json.loads(b''.join(respuesta.streaming_content))
+        self.assertEqual(len(exportado['features']), 5)
+        self.assertEqual(exportado['features'][3]['geometry'], self.coleccion(5)['features'][3]['geometry'])
+
+    def test_lectura_incremental(self):
+        texto = json.dumps(self.coleccion(40)).encode()
+        features = list(leer_features(BytesIO(texto)))
+        self.assertEqual(len(features), 40)
+        secuencia = b'\n'.join(b'\x1e' + json.dumps(f).encode() for f in self.coleccion(3)['features'])
+        self.assertEqual(len(list(leer_features(BytesIO(secuencia), secuencia=True))), 3)
+
+    def test_feature_invalido_informa_lo_guardado(self):
+        coleccion = self.coleccion(5)
+        coleccion['features'][4]['geometry'] = {'type': 'Point', 'coordinates': [0, 0]}
+        respuesta = self.client.post(
+            '/eleccion/secciones/importar-geojson/', json.dumps(coleccion),
+            content_type='application/geo+json'
+        )
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['creadas'], 4)
+        self.assertEqual(Seccion.objects.count(), 4)
+
+    def test_lote_invalido(self):
+        for url in ('/eleccion/secciones/importar-geojson/', '/eleccion/recintos/importar-geojson/'):
+            for lote in ('abc', '-1', '0', '1.5', '100001'):
+                with self.subTest(url=url, lote=lote):
+                    respuesta = self.client.post(
+                        f'{url}?lote={lote}', json.dumps(self.coleccion(2)), content_type='application/geo+json'
+                    )
+                    self.assertEqual(respuesta.status_code, 400)
+                    self.assertIn('lote', respuesta.json()['error'])
+        self.assertEqual(Seccion.objects.count(), 0)
+        respuesta = self.client.post(
+            '/eleccion/secciones/importar-geojson/?lote=1', json.dumps(self.coleccion(2)),
+            content_type='application/geo+json'
+        )
+        self.assertEqual(respuesta.status_code, 201)
+
+    def test_recintos(self):
+        seccion = Seccion.objects.create(nombre='Centro')
+        Recinto.objects.create(nombre='Escuela 1', latitud=0, longitud=0)
+        features = [
+            {'type': 'Feature', 'properties': {'nombre': f'Escuela {i}', 'seccion_nombre': 'Centro'},
+             'geometry': {'type': 'Point', 'coordinates': [-63.1, -17.7 - i]}}
+            for i in range(3)
+        ]
+        respuesta = self.client.post(
+            '/eleccion/recintos/importar-geojson/',
+            '\n'.join(json.dumps(f) for f in features), content_type='application/geo+json-seq'
+        )
+        self.assertEqual(respuesta.json(), {'features': 3, 'creados': 2, 'actualizados': 1})
+        self.assertEqual(Recinto.objects.get(nombre='Escuela 1').latitud, -18.7)
+        self.assertEqual(Recinto.objects.filter(seccion=seccion).count(), 3)
+
+        salida = StringIO()
+        call_command('exportar_geojson', 'recintos', stdout=salida)
+        exportado = json.loads(salida.getvalue())
+        # el primero es el que ya existia y se actualizo
+        self.assertEqual(exportado['features'][0]['geometry'], {'type': 'Point', 'coordinates': [-63.1, -18.7]})
+
+
+class SnapshotTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        seccion = Seccion.objects.create(nombre='S')
+        self.eleccion = Eleccion.objects.create(nombre='E', fecha=date(2025, 1, 1), seccion=seccion)
+        self.recintos = [
+            Recinto.objects.create(nombre=f'R{i}', latitud=0, longitud=0, seccion=seccion) for i in range(2)
+        ]
+        # ids desordenados para comprobar que el archivo sale ordenado
+        crear_y_distribuir(self.eleccion, [(r.pk, 2) for r in self.recintos], [7 * i % 101 for i in range(100)])
+        Votante.objects.filter(votante_id=14).update(voto=True)
+        self.directorio = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directorio)
+
+    def test_lector_busca_sobre_el_archivo(self):
+        ruta = os.path.join(self.directorio, 'e.asig')
+        escribir_snapshot(ruta, self.eleccion.pk)
+        votante = Votante.objects.get(votante_id=14)
+        with LectorSnapshot(ruta, verificar=True) as snapshot:
+            self.assertEqual(len(snapshot), 100)
+            self.assertTrue((snapshot.votantes[1:] > snapshot.votantes[:-1]).all())
+            self.assertEqual(snapshot.buscar(14), (votante.mesa_id, True))
+            self.assertIsNone(snapshot.buscar(5000))
+            self.assertIsNone(snapshot.recinto_id)
+
+    def test_checksum_detecta_cambios(self):
+        ruta = os.path.join(self.directorio, 'e.asig')
+        escribir_snapshot(ruta, self.eleccion.pk)
+        with open(ruta, 'r+b') as archivo:
+            archivo.seek(-4, os.SEEK_END)
+            archivo.write(b'\xff')
+        with self.assertRaises(SnapshotInvalido):
+            LectorSnapshot(ruta, verificar=True)
+
+    def test_por_recinto(self):
+        call_command('exportar_snapshot', self.eleccion.pk, directorio=self.directorio, por_recinto=True,
+                     stdout=StringIO())
+        total = 0
+        for recinto in self.recintos:
+            ruta = os.path.join(self.directorio, f'eleccion-{self.eleccion.pk}-recinto-{recinto.pk}.asig')
+            with LectorSnapshot(ruta) as snapshot:
+                self.assertEqual(snapshot.recinto_id, recinto.pk)
+                mesas = set(Mesa.objects.filter(recinto=recinto).values_list('pk', flat=True))
+                self.assertTrue(set(snapshot.registros['mesa_id'].tolist()) <= mesas)
+                total += len(snapshot)
+        self.assertEqual(total, 100)
+
+    def test_endpoint(self):
+        url = f'/eleccion/votantes/snapshot/{self.eleccion.pk}/?recinto={self.recintos[0].pk}'
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta['Content-Type'], 'application/octet-stream')
+        self.assertEqual(len(respuesta.content), 72 + 50 * 16)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=respuesta['ETag']).status_code, 304)
+
+    def test_if_none_match(self):
+        url = f'/eleccion/votantes/snapshot/{self.eleccion.pk}/'
+        etag = self.client.get(url)['ETag']
+        for valor, codigo in ((f'W/{etag}', 304), (f'"otro", {etag}', 304), ('*', 304),
+                              ('"otro"', 200), (etag[:-2] + '"', 200)):
+            with self.subTest(if_none_match=valor):
+                respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=valor)
+                self.assertEqual(respuesta.status_code, codigo)
+                self.assertEqual(respuesta['ETag'], etag)
+
+    def test_eleccion_inexistente(self):
+        respuesta = self.client.get(f'/eleccion/votantes/snapshot/{self.eleccion.pk + 99}/')
+        self.assertEqual(respuesta.status_code, 404)
+        # una eleccion sin votantes si existe y da el archivo vacio
+        vacia = Eleccion.objects.create(nombre='Vacia', fecha=date(2025, 1, 1), seccion=self.eleccion.seccion)
+        respuesta = self.client.get(f'/eleccion/votantes/snapshot/{vacia.pk}/')
+        self.assertEqual((respuesta.status_code, len(respuesta.content)), (200, 72))
+
+
+class CrearYDistribuirTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        seccion = Seccion.objects.create(nombre='S')
+        self.eleccion = Eleccion.objects.create(nombre='E', fecha=date(2025, 1, 1), seccion=seccion)
+        self.recintos = [
+            Recinto.objects.create(nombre=f'R{i}', latitud=0, longitud=i, seccion=seccion) for i in range(3)
+        ]
+
+    def distribuir(self, votantes, query=''):
+        return self.client.post(f'/eleccion/mesas/crear-distribuir/{query}', {
+            'eleccion': self.eleccion.pk,
+            'recintos': [{'recinto': r.pk, 'mesas': n} for r, n in zip(self.recintos, (2, 1, 1))],
+            'votantes': votantes,
+        }, format='json')
+
+    def test_tamanos_y_orden(self):
+        respuesta = self.distribuir(list(range(100, 110)))
+        self.assertEqual(respuesta.status_code, 201)
+        mesas = Mesa.objects.filter(eleccion=self.eleccion).order_by('pk')
+        self.assertEqual(
+            [(m.recinto_id, m.numero, m.cantidad) for m in mesas],
+            [(self.recintos[0].pk, 1, 3), (self.recintos[0].pk, 2, 3), (self.recintos[1].pk, 1, 2), (self.recintos[2].pk, 1, 2)]
+        )
+        por_mesa = [list(Votante.objects.filter(mesa=m).order_by('pk').values_list('votante_id', flat=True)) for m in mesas]
+        self.assertEqual(por_mesa, [[100, 101, 102], [103, 104, 105], [106, 107], [108, 109]])
+        # el jefe es el primer votante de cada mesa
+        self.assertEqual([m.jefe_id for m in mesas], [100, 103, 106, 108])
+        self.assertEqual([m['jefe_id'] for m in respuesta.json()], [100, 103, 106, 108])
+
+    def test_jefes_en_un_solo_update(self):
+        with CaptureQueriesContext(connection) as consultas:
+            crear_y_distribuir(self.eleccion, [(self.recintos[0].pk, 5)], range(50), batch_size=7)
+        updates = [q['sql'] for q in consultas.captured_queries if q['sql'].startswith('UPDATE "eleccion_mesa"')]
+        self.assertEqual(len(updates), 1)
+        self.assertFalse(Mesa.objects.filter(eleccion=self.eleccion, jefe_id=None).exists())
+
+    def test_repetido_deshace_todo(self):
+        self.distribuir(list(range(10)))
+        antes = list(Votante.objects.order_by('pk').values_list('votante_id', 'mesa_id'))
+        respuesta = self.distribuir(list(range(20, 30)) + [21])
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(list(Votante.objects.order_by('pk').values_list('votante_id', 'mesa_id')), antes)
+        self.assertEqual(Mesa.objects.filter(eleccion=self.eleccion).count(), 4)
+
+    def test_batch_size(self):
+        for valor in ('abc', '0', '-5', '1.5'):
+            with self.subTest(batch_size=valor):
+                self.assertEqual(self.distribuir(list(range(10)), f'?batch_size={valor}').status_code, 400)
+        self.assertFalse(Mesa.objects.exists())
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.distribuir(list(range(10)), '?batch_size=3').status_code, 201)
+        # executemany se registra como '<n> times: INSERT ...'
+        inserts = [q for q in consultas.captured_queries if 'INSERT INTO "eleccion_votante"' in q['sql']]
+        self.assertEqual(len(inserts), 4)
+
+    def test_recintos_invalidos(self):
+        valido = {'recinto': self.recintos[0].pk, 'mesas': 1}
+        for entrada in ({'recinto': self.recintos[1].pk}, {'mesas': 1}, {'recinto': 'x', 'mesas': 1},
+                        {'recinto': self.recintos[1].pk, 'mesas': 'dos'}, {'recinto': self.recintos[1].pk, 'mesas': 0},
+                        {'recinto': self.recintos[1].pk, 'mesas': 1.5}, {'recinto': 2 ** 63, 'mesas': 1},
+                        [self.recintos[1].pk, 1], 7):
+            with self.subTest(entrada=entrada):
+                respuesta = self.client.post('/eleccion/mesas/crear-distribuir/', {
+                    'eleccion': self.eleccion.pk, 'recintos': [valido, entrada], 'votantes': list(range(10)),
+                }, format='json')
+                self.assertEqual(respuesta.status_code, 400)
+                self.assertIn('recintos[1]', respuesta.json()['error'])
+        respuesta = self.client.post('/eleccion/mesas/crear-distribuir/', {
+            'eleccion': self.eleccion.pk, 'recintos': [valido, {'recinto': 999, 'mesas': 1}], 'votantes': list(range(10)),
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 404)
+        self.assertIn('recintos[1]', respuesta.json()['error'])
+        self.assertFalse(Mesa.objects.exists())
+
+
+class DitribuirTest(TestCase):
+
+    def test_reparte_con_arreglos(self):
+        seccion = Seccion.objects.create(nombre='S')
+        eleccion = Eleccion.objects.create(nombre='E', fecha=date(2025, 1, 1), seccion=seccion)
+        recinto = Recinto.objects.create(nombre='R', latitud=0, longitud=0, seccion=seccion)
+        Mesa.objects.bulk_create([Mesa(numero=n, cantidad=0, recinto=recinto, eleccion=eleccion) for n in range(3)])
+        respuesta = APIClient().post('/eleccion/mesas/distribuir/', {
+            'seccionId': seccion.pk, 'eleccionId': eleccion.pk, 'votantes': list(range(100, 110)),
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 200)
+        mesas = list(Mesa.objects.order_by('pk'))
+        self.assertEqual([m.cantidad for m in mesas], [4, 3, 3])
+        self.assertEqual(
+            list(Votante.objects.filter(mesa=mesas[1]).order_by('votante_id').values_list('votante_id', flat=True)),
+            [104, 105, 106]
+        )
+
+
+class CercaniaTest(TestCase):
+
+    def setUp(self):
+        self.client = APIClient()
+        seccion = Seccion.objects.create(nombre='S')
+        self.eleccion = Eleccion.objects.create(nombre='E', fecha=date(2025, 1, 1), seccion=seccion)
+        # tres recintos sobre el ecuador, a 1 grado de distancia
+        self.recintos = [
+            Recinto.objects.create(nombre=f'R{i}', latitud=0, longitud=i, seccion=seccion) for i in range(3)
+        ]
+
+    def distribuir(self, recintos, votantes, **extra):
+        return self.client.post('/eleccion/mesas/distribuir-cercania/', {
+            'eleccion': self.eleccion.pk, 'recintos': recintos, 'votantes': votantes, **extra,
+        }, format='json')
+
+    def votantes_en(self, *longitudes):
+        return [{'votante_id': 100 + i, 'latitud': 0.01, 'longitud': lng} for i, lng in enumerate(longitudes)]
+
+    def test_cada_votante_a_su_recinto(self):
+        r0, r1, r2 = (r.pk for r in self.recintos)
+        respuesta = self.distribuir(
+            [{'recinto': r0, 'mesas': 1}, {'recinto': r1, 'mesas': 2}, {'recinto': r2, 'mesas': 1}],
+            self.votantes_en(0.1, 0.9, 1.1, 1.2, 2.3), votantes_por_mesa=10,
+        )
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.json()['votantes_por_recinto'], {str(r0): 1, str(r1): 3, str(r2): 1})
+        self.assertEqual(Mesa.objects.filter(eleccion=self.eleccion, recinto_id=r1).count(), 2)
+        self.assertEqual(Votante.objects.get(votante_id=104).mesa.recinto_id, r2)
+
+    def test_capacidad_llena_pasa_al_siguiente(self):
+        r0, r1, r2 = (r.pk for r in self.recintos)
+        # cuatro votantes junto a R0, que tiene lugar para dos: el resto va a R1
+        respuesta = self.distribuir(
+            [{'recinto': r0, 'mesas': 1, 'capacidad': 2}, {'recinto': r1, 'mesas': 1}, {'recinto': r2, 'mesas': 1}],
+            self.votantes_en(0.0, 0.1, 0.2, 0.3), votantes_por_mesa=10,
+        )
+        self.assertEqual(respuesta.json()['votantes_por_recinto'], {str(r0): 2, str(r1): 2, str(r2): 0})
+        # los que quedan en R0 son los mas cercanos
+        self.assertEqual(
+            set(Votante.objects.filter(mesa__recinto_id=r0).values_list('votante_id', flat=True)), {100, 101}
+        )
+
+    def test_capacidad_total_insuficiente(self):
+        respuesta = self.distribuir(
+            [{'recinto': r.pk, 'mesas': 1, 'capacidad': 1} for r in self.recintos],
+            self.votantes_en(0, 0, 0, 0),
+        )
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertFalse(Mesa.objects.filter(eleccion=self.eleccion).exists())
+
+    def test_recintos_invalidos(self):
+        r0, r1, _ = (r.pk for r in self.recintos)
+        votantes = self.votantes_en(0, 1)
+        for recintos in (
+            [{'recinto': r0, 'mesas': 0, 'capacidad': 5}, {'recinto': r1, 'mesas': 1}],
+            [{'recinto': r0, 'mesas': 0}, {'recinto': r1, 'mesas': 0}],
+            [{'recinto': r0, 'mesas': -2}],
+            [{'recinto': r0, 'mesas': 1, 'capacidad': -1}],
+            [{'recinto': r0, 'mesas': 'dos'}],
+        ):
+            with self.subTest(recintos=recintos):
+                self.assertEqual(self.distribuir(recintos, votantes).status_code, 400)
+
+    def test_coordenadas_invalidas(self):
+        recintos = [{'recinto': self.recintos[0].pk, 'mesas': 1}]
+        for lat in ('abc', 'nan', 91):
+            with self.subTest(latitud=lat):
+                votantes = [{'votante_id': 1, 'latitud': lat, 'longitud': 0}]
+                self.assertEqual(self.distribuir(recintos, votantes).status_code, 400)
+
+
+class IngestaTest(TestCase):
+    # crear-distribuir y distribuir-cercania con el cuerpo en NDJSON, CSV o binario
+
+    def setUp(self):
+        self.client = APIClient()
+        seccion = Seccion.objects.create(nombre='S')
+        self.eleccion = Eleccion.objects.create(nombre='E', fecha=date(2025, 1, 1), seccion=seccion)
+        self.recintos = [
+            Recinto.objects.create(nombre=f'R{i}', latitud=0, longitud=i, seccion=seccion) for i in range(2)
+        ]
+
+    def subir(self, cuerpo, content_type, query='', url='crear-distribuir'):
+        if not query:
+            query = f'eleccion={self.eleccion.pk}&recintos={self.recintos[0].pk}:2,{self.recintos[1].pk}:1'
+        return self.client.generic(
+            'POST', f'/eleccion/mesas/{url}/?{query}', cuerpo, content_type=content_type
+        )
+
+    def repartidos(self):
+        return list(Votante.objects.order_by('pk').values_list('votante_id', flat=True))
+
+    def test_ndjson(self):
+        respuesta = self.subir('1\n{"votante_id": 2}\n\n{"id": 3}\n4', 'application/x-ndjson')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(self.repartidos(), [1, 2, 3, 4])
+        self.assertEqual([m['cantidad'] for m in respuesta.json()], [2, 1, 1])
+
+    def test_ndjson_linea_invalida(self):
+        self.assertEqual(self.subir('1\n"dos"\n3', 'application/x-ndjson').status_code, 400)
+        self.assertFalse(Mesa.objects.exists())
+
+    def test_csv_con_y_sin_encabezado(self):
+        for cuerpo in ('votante_id,nombre\n5,a\n6,b\n7,c\n', '5\r\n6\r\n7'):
+            with self.subTest(cuerpo=cuerpo):
+                Mesa.objects.all().delete()
+                self.assertEqual(self.subir(cuerpo, 'text/csv; charset=utf-8').status_code, 201)
+                self.assertEqual(self.repartidos(), [5, 6, 7])
+
+    def test_csv_fila_invalida(self):
+        # solo la primera fila puede ser encabezado
+        self.assertEqual(self.subir('5\nx\n7', 'text/csv').status_code, 400)
+
+    def test_binario(self):
+        ids = np.arange(10, 20)
+        respuesta = self.subir(ids.astype('<i4').tobytes(), 'application/octet-stream')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(self.repartidos(), list(range(10, 20)))
+        Mesa.objects.all().delete()
+        query = f'eleccion={self.eleccion.pk}&recintos={self.recintos[0].pk}:1&ancho=8'
+        ids = np.array([2 ** 40, 2 ** 40 + 1], dtype='<i8')
+        self.assertEqual(self.subir(ids.tobytes(), 'application/octet-stream', query).status_code, 201)
+        self.assertEqual(self.repartidos(), [2 ** 40, 2 ** 40 + 1])
+
+    def test_binario_invalido(self):
+        ids = np.arange(4, dtype='<i4').tobytes()
+        self.assertEqual(self.subir(ids[:-1], 'application/octet-stream').status_code, 400)
+        for ancho in ('3', 'abc'):
+            with self.subTest(ancho=ancho):
+                query = f'eleccion={self.eleccion.pk}&recintos={self.recintos[0].pk}:1&ancho={ancho}'
+                self.assertEqual(self.subir(ids, 'application/octet-stream', query).status_code, 400)
+        self.assertFalse(Mesa.objects.exists())
+
+    def test_query_invalida(self):
+        r = self.recintos[0].pk
+        for query in (f'eleccion=abc&recintos={r}:1', f'eleccion={self.eleccion.pk}&recintos={r}',
+                      f'eleccion={self.eleccion.pk}&recintos={r}:x'):
+            with self.subTest(query=query):
+                self.assertEqual(self.subir('1\n2', 'application/x-ndjson', query).status_code, 400)
+        query = f'eleccion={self.eleccion.pk + 99}&recintos={r}:1'
+        self.assertEqual(self.subir('1\n2', 'application/x-ndjson', query).status_code, 404)
+
+    def test_cercania_csv(self):
+        r0, r1 = (r.pk for r in self.recintos)
+        cuerpo = 'votante_id,latitud,longitud\n1,0,0.1\n2,0,0.9\n3,0,1.2\n'
+        query = f'eleccion={self.eleccion.pk}&recintos={r0}:1,{r1}:1:5'
+        respuesta = self.subir(cuerpo, 'text/csv', query, url='distribuir-cercania')
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.json()['votantes_por_recinto'], {str(r0): 1, str(r1): 2})
+        query = f'eleccion=abc&recintos={r0}:1'
+        self.assertEqual(self.subir(cuerpo, 'text/csv', query, url='distribuir-cercania').status_code, 400)
+
+    def test_votantes_en_disco(self):
+        with mock.patch.object(ingesta, 'CHUNK_IDS', 3):
+            with ingesta.VotantesEnDisco(iter(range(10))) as votantes:
+                self.assertEqual(len(votantes), 10)
+                self.assertEqual([len(lote) for lote in votantes.chunks()], [3, 3, 3, 1])
+                # se puede recorrer mas de una vez
+                self.assertEqual(list(votantes), list(range(10)))
+                self.assertEqual(list(votantes), list(range(10)))
+                self.assertEqual(votantes.arreglo().tolist(), list(range(10)))
+            self.assertTrue(votantes.archivo.closed)
+
+    def test_parsear_recintos(self):
+        self.assertEqual(
+            ingesta.parsear_recintos('3:2, 5:4:900,'),
+            [{'recinto': 3, 'mesas': 2}, {'recinto': 5, 'mesas': 4, 'capacidad': 900}]
+        )
+        self.assertEqual(ingesta.parsear_recintos(''), [])
+        for valor in ('3', '3:2:1:0', '3:x'):
+            with self.subTest(valor=valor):
+                with self.assertRaises(ValueError):
+                    ingesta.parsear_recintos(valor)
+
+
+class AsignacionCercanaTest(SimpleTestCase):
+
+    def setUp(self):
+        azar = np.random.default_rng(0)
+        self.rec_lat, self.rec_lon = azar.uniform(-18, -17, 60), azar.uniform(-64, -63, 60)
+        # algunos votantes lejos de todo para que caigan fuera de las celdas vecinas
+        self.lat = np.concatenate((azar.uniform(-18, -17, 2000), azar.uniform(-25, -24, 50)))
+        self.lon = np.concatenate((azar.uniform(-64, -63, 2000), azar.uniform(-70, -69, 50)))
+
+    def fuerza_bruta(self):
+        # distancia en el mismo plano que usa geo.proyectar
+        escala = np.cos(np.radians(self.rec_lat.mean()))
+        dx = (self.lon[:, None] - self.rec_lon[None, :]) * escala
+        dy = self.lat[:, None] - self.rec_lat[None, :]
+        return dx ** 2 + dy ** 2
+
+    def test_grilla_igual_a_fuerza_bruta(self):
+        escala = np.cos(np.radians(self.rec_lat.mean()))
+        indice = IndiceGrilla(self.rec_lon * escala, self.rec_lat)
+        indices, d2, exacto = indice.candidatos(self.lon * escala, self.lat, k=4)
+        d2_bruta = np.sort(self.fuerza_bruta(), axis=1)
+        # los exactos tienen al mas cercano de todos; el resto lo completa asignar_mas_cercano
+        self.assertGreater(exacto.sum(), 1900)
+        np.testing.assert_allclose(d2[exacto, 0], d2_bruta[exacto, 0])
+        self.assertTrue((indices[:, 0] >= 0).all())
+
+    def test_sin_limite_es_el_mas_cercano(self):
+        asignacion = asignar_mas_cercano(self.lat, self.lon, self.rec_lat, self.rec_lon, np.full(60, 10_000))
+        np.testing.assert_array_equal(asignacion, self.fuerza_bruta().argmin(axis=1))
+
+    def test_respeta_capacidad(self):
+        capacidad = np.full(60, 35)
+        asignacion = asignar_mas_cercano(self.lat, self.lon, self.rec_lat, self.rec_lon, capacidad)
+        self.assertTrue((asignacion >= 0).all())
+        self.assertLessEqual(np.bincount(asignacion, minlength=60).max(), 35)
+        with self.assertRaises(ValueError):
+            asignar_mas_cercano(self.lat, self.lon, self.rec_lat, self.rec_lon, np.full(60, 30))
+
+
+class GenerarEleccionTest(TestCase):
+
+    def generar(self, **kwargs):
+        parametros = {'votantes': 1000, 'secciones': 4, 'recintos': 12, 'cargos': 2, 'candidaturas': 3, 'por_mesa': 100}
+        return generar_eleccion(**{**parametros, **kwargs})
+
+    def test_genera_a_escala(self):
+        antes = version(Mesa)
+        with self.captureOnCommitCallbacks(execute=True):
+            resumen, manifiesto = self.generar(semilla=7)
+        self.assertEqual(resumen['mesas'], 10)
+        self.assertEqual(Votante.objects.count(), 1000)
+        self.assertEqual(Seccion.objects.filter(tipo='municipio').count(), 4)
+        self.assertEqual(Candidatura.objects.count(), 6)
+        self.assertGreater(version(Mesa), antes)
+
+        # las mesas del manifiesto, en orden, reciben los ids de ids_votantes
+        ids = ids_votantes(7, 1000).tolist()
+        mesa_id, cantidad = manifiesto['elecciones'][0]['mesas'][0]
+        mesa = Mesa.objects.get(pk=mesa_id)
+        self.assertEqual(mesa.jefe_id, ids[0])
+        self.assertEqual(
+            list(Votante.objects.filter(mesa=mesa).order_by('pk').values_list('votante_id', flat=True)), ids[:cantidad]
+        )
+        # los recintos caen dentro del poligono de su municipio
+        for recinto in Recinto.objects.select_related('seccion'):
+            latitudes, longitudes = zip(*recinto.seccion.get_poligono())
+            self.assertTrue(dentro_poligono(
+                np.array([recinto.latitud]), np.array([recinto.longitud]), np.array(latitudes), np.array(longitudes)
+            )[0])
+
+    def test_misma_semilla_mismos_datos(self):
+        self.generar(semilla=3, prefijo='A')
+        self.generar(semilla=3, prefijo='B')
+
+        def datos(prefijo):
+            recintos = Recinto.objects.filter(nombre__startswith=prefijo).order_by('pk')
+            candidaturas = Candidatura.objects.filter(eleccion__nombre__startswith=prefijo).order_by('pk')
+            return (
+                list(recintos.values_list('latitud', 'longitud', 'mesas__cantidad')),
+                list(candidaturas.values_list('sigla', 'candidato', 'color')),
+            )
+        self.assertEqual(datos('A'), datos('B'))
+
+    def test_comando(self):
+        salida = StringIO()
+        call_command('generate_election', '--votantes', '500', '--recintos', '5', '--secciones', '2', stdout=salida)
+        self.assertIn('votantes: 500', salida.getvalue())
+        with self.assertRaisesMessage(CommandError, 'Ya hay datos generados'):
+            call_command('generate_election', '--votantes', '500', stdout=salida)
+
+
+# copias identicas en los tres servicios, que no comparten un paquete importable
+PROYECTOS = {
+    'sistemaAdministracionElectoral': ('sistemaAdministracionElectoral', 'eleccion'),
+    'SistemaVotacion': ('SistemaVotacion', 'votacion'),
+    'sistemaGestionUsuario': ('sistemaGestionUsuario', 'autenticacion'),
+}
+COPIAS = ('{config}/respuestas.py', '{config}/sqlite.py', '{config}/perfilado.py',
+          '{app}/management/commands/_bench.py')
+
+
+class CopiasCompartidasTest(SimpleTestCase):
+
+    def test_copias_identicas(self):
+        base = Path(settings.BASE_DIR)
+        config, app = PROYECTOS[base.name]
+        for plantilla in COPIAS:
+            propia = base / plantilla.format(config=config, app=app)
+            for proyecto, (otra_config, otra_app) in PROYECTOS.items():
+                otra = base.parent / proyecto / plantilla.format(config=otra_config, app=otra_app)
+                if otra == propia or not otra.exists():
+                    # el servicio puede estar desplegado sin los demas
+                    continue
+                with self.subTest(archivo=f'{proyecto}/{plantilla.format(config=otra_config, app=otra_app)}'):
+                    self.assertEqual(propia.read_bytes(), otra.read_bytes(),
+                                     f'{otra} difiere de {propia}: el cambio va en las tres copias')
@@ -1,7 +1,8 @@
-from django.urls import path, include
+from django.urls import path, re_path, include
 from rest_framework import routers
 
-from eleccion.apis import PuntoViewSet, SeccionViewSet, EleccionViewSet, RecintoViewSet, MesaViewSet, CargoViewSet, CandidaturaViewSet, VotanteViewSet
+from eleccion.apis import asincronas
+from eleccion.apis import PuntoViewSet, SeccionViewSet, EleccionViewSet, RecintoViewSet, MesaViewSet, CargoViewSet, CandidaturaViewSet, VotanteViewSet, TrabajoViewSet
 
 router = routers.DefaultRouter()
 router.register('puntos', PuntoViewSet)
@@ -12,6 +13,12 @@ router.register('mesas', MesaViewSet)
 router.register('cargos', CargoViewSet)
 router.register('candidaturas', CandidaturaViewSet)
 router.register('votantes', VotanteViewSet)
+router.register('jobs', TrabajoViewSet)
 urlpatterns = [
+    # versiones async de los GET mas pedidos, delante de las de los viewsets (ver asincronas.py)
+    re_path(r'^candidaturas/cargo/(?P<cargo_id>[^/.]+)/eleccion/(?P<eleccion_id>[^/.]+)/$',
+            asincronas.papeleta, name='candidatura-get-papeleta-cargo-eleccion'),
+    re_path(r'^mesas/recinto/(?P<recinto_id>[^/.]+)/eleccion/(?P<eleccion_id>[^/.]+)/$',
+            asincronas.mesas_por_recinto, name='mesa-get-mesas-por-recinto-y-eleccion'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
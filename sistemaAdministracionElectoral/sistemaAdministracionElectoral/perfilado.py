@@ -0,0 +1,196 @@
+"""
+Perfilado por request, apagado salvo que settings.PERFILADO sea True.
+
+Es el mismo archivo en los tres servicios, como respuestas.py. Con el
+perfilado encendido cada respuesta lleva una cabecera Server-Timing:
+
+  db;dur=<ms>;desc="<n> consultas", vista;dur=<ms>, render;dur=<ms>, total;dur=<ms>
+
+`vista` es el tiempo de la vista sin el render (en DRF incluye
+serializer.data, donde aparecen los N+1), `render` el de convertir la
+respuesta a bytes. Las ultimas PERFILADO_MUESTRAS mediciones quedan en
+memoria y GET /_perfilado/ devuelve p50/p95/p99 por endpoint; `repetidas`
+es la mayor cantidad de veces que se ejecuto una misma consulta en un
+request, la marca de un N+1. DELETE /_perfilado/ vacia las muestras.
+
+/_perfilado/ solo responde con DEBUG, a un usuario staff o con la cabecera
+X-Perfilado-Token igual a settings.PERFILADO_TOKEN. El DELETE pasa por CSRF
+como cualquier otra vista.
+"""
+import hmac
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.http import Http404, JsonResponse
+
+RUTA = '/_perfilado/'
+
+_muestras = deque(maxlen=5000)
+_lock = threading.Lock()
+
+
+def activo():
+    return getattr(settings, 'PERFILADO', False)
+
+
+def permitido(request):
+    if settings.DEBUG:
+        return True
+    if getattr(getattr(request, 'user', None), 'is_staff', False):
+        return True
+    token = getattr(settings, 'PERFILADO_TOKEN', '')
+    recibido = request.headers.get('X-Perfilado-Token', '')
+    return bool(token) and hmac.compare_digest(recibido.encode(), token.encode())
+
+
+class Medicion:
+    # se engancha con connection.execute_wrapper en todas las bases
+    def __init__(self):
+        self.consultas = 0
+        self.db = 0.0
+        self.sql = Counter()
+        self.inicio_vista = None
+        self.render = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - inicio
+            self.consultas += 1
+            self.sql[sql] += 1
+
+
+@contextmanager
+def _enganchar(medicion):
+    with ExitStack() as pila:
+        for conexion in connections.all():
+            pila.enter_context(conexion.execute_wrapper(medicion))
+        yield
+
+
+class PerfiladoMiddleware:
+    # sirve con WSGI y con ASGI; en ASGI process_view y
+    # process_template_response corren en un hilo, solo con el perfilado encendido
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not activo():
+            raise MiddlewareNotUsed
+        global _muestras
+        maximo = getattr(settings, 'PERFILADO_MUESTRAS', 5000)
+        if _muestras.maxlen != maximo:
+            _muestras = deque(maxlen=maximo)
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if request.path == RUTA:
+            request.perfilado = None
+            return self.get_response(request)
+        medicion = request.perfilado = Medicion()
+        inicio = time.perf_counter()
+        with _enganchar(medicion):
+            response = self.get_response(request)
+        return self.registrar(request, response, medicion, inicio)
+
+    async def __acall__(self, request):
+        if request.path == RUTA:
+            request.perfilado = None
+            return await self.get_response(request)
+        medicion = request.perfilado = Medicion()
+        inicio = time.perf_counter()
+        with _enganchar(medicion):
+            response = await self.get_response(request)
+        return self.registrar(request, response, medicion, inicio)
+
+    def registrar(self, request, response, medicion, inicio):
+        total = time.perf_counter() - inicio
+        vista = 0.0
+        if medicion.inicio_vista is not None:
+            vista = max(0.0, inicio + total - medicion.inicio_vista - medicion.render)
+
+        ms = {k: round(v * 1000, 3) for k, v in (
+            ('db', medicion.db), ('vista', vista), ('render', medicion.render), ('total', total)
+        )}
+        response['Server-Timing'] = (
+            f'db;dur={ms["db"]};desc="{medicion.consultas} consultas", '
+            f'vista;dur={ms["vista"]}, render;dur={ms["render"]}, total;dur={ms["total"]}'
+        )
+        match = request.resolver_match
+        with _lock:
+            _muestras.append({
+                'endpoint': f'{request.method} {match.view_name if match else request.path}',
+                'status': response.status_code,
+                'consultas': medicion.consultas,
+                'repetidas': max(medicion.sql.values(), default=0),
+                **ms,
+            })
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.perfilado is not None:
+            request.perfilado.inicio_vista = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # DRF rinde la respuesta despues de la vista; se mide aparte
+        medicion, render = request.perfilado, response.render
+        if medicion is None:
+            return response
+
+        def render_medido():
+            inicio = time.perf_counter()
+            try:
+                return render()
+            finally:
+                medicion.render += time.perf_counter() - inicio
+
+        response.render = render_medido
+        return response
+
+
+def _percentiles(valores):
+    valores = sorted(valores)
+
+    def p(q):
+        return valores[min(len(valores) - 1, int(q * len(valores)))]
+    return {'p50': p(0.50), 'p95': p(0.95), 'p99': p(0.99)}
+
+
+def resumen(request):
+    if not activo():
+        raise Http404
+    if not permitido(request):
+        return JsonResponse({'error': 'No autorizado.'}, status=403)
+    with _lock:
+        muestras = list(_muestras)
+        if request.method == 'DELETE':
+            _muestras.clear()
+            return JsonResponse({'borradas': len(muestras)})
+
+    por_endpoint = defaultdict(list)
+    for muestra in muestras:
+        por_endpoint[muestra['endpoint']].append(muestra)
+    endpoints = []
+    for endpoint, lista in por_endpoint.items():
+        endpoints.append({
+            'endpoint': endpoint,
+            'requests': len(lista),
+            'errores': sum(1 for m in lista if m['status'] >= 500),
+            'repetidas_max': max(m['repetidas'] for m in lista),
+            **{campo: _percentiles([m[campo] for m in lista])
+               for campo in ('total', 'vista', 'render', 'db', 'consultas')},
+        })
+    endpoints.sort(key=lambda e: e['total']['p95'], reverse=True)
+    return JsonResponse({'muestras': len(muestras), 'endpoints': endpoints})
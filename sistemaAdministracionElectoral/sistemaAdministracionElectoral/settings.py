@@ -10,10 +10,14 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
 from corsheaders.defaults import  default_headers
+from django.db.backends.signals import connection_created
+
+from sistemaAdministracionElectoral import sqlite
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -47,6 +51,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'sistemaAdministracionElectoral.perfilado.PerfiladoMiddleware',
+    'sistemaAdministracionElectoral.respuestas.CompresionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -80,10 +86,41 @@ WSGI_APPLICATION = 'sistemaAdministracionElectoral.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Perfil para escrituras concurrentes (WAL, busy timeout, transacciones
+# IMMEDIATE), ver sqlite.py. SQLITE_CONCURRENTE=0 vuelve a lo de fabrica.
+SQLITE_CONCURRENTE = os.environ.get('SQLITE_CONCURRENTE', '1') == '1'
+# WAL queda grabado en el archivo: solo en el despliegue, no en la copia del repo
+SQLITE_WAL = os.environ.get('SQLITE_WAL', '0') == '1'
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': sqlite.OPCIONES if SQLITE_CONCURRENTE else {},
+        # cada hilo reusa su conexion entre requests y los PRAGMA se pagan una vez
+        'CONN_MAX_AGE': 600 if SQLITE_CONCURRENTE else 0,
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+connection_created.connect(sqlite.configurar_conexion, dispatch_uid='sqlite_concurrente')
+
+
+# Cache
+# Aca vive la papeleta renderizada. Las versiones que dicen cuando algo quedo
+# viejo (ETag de los GET condicionales, donde_votar) estan en la tabla
+# Version (eleccion/services/versiones.py), asi los cambios que hace el worker
+# de procesar_trabajos o otro proceso web se ven en todos aunque la cache sea
+# la LocMemCache de cada proceso. CACHE_COMPARTIDA=1 usa DatabaseCache (antes
+# correr manage.py createcachetable) para no renderizar lo mismo en cada
+# proceso, a costa de una consulta por lectura.
+CACHE_COMPARTIDA = os.environ.get('CACHE_COMPARTIDA') == '1'
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'eleccion_cache',
+    } if CACHE_COMPARTIDA else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
@@ -154,3 +191,24 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1)
 }
 '''
+
+REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'sistemaAdministracionElectoral.respuestas.OrjsonRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'sistemaAdministracionElectoral.respuestas.OrjsonParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# respuestas de texto/JSON mas chicas que esto no se comprimen
+COMPRESION_MINIMO = 1024
+
+# Server-Timing y /_perfilado/ por request, solo si se pide (PERFILADO=1)
+PERFILADO = os.environ.get('PERFILADO') == '1'
+PERFILADO_MUESTRAS = 5000
+# sin DEBUG, /_perfilado/ pide usuario staff o la cabecera X-Perfilado-Token
+PERFILADO_TOKEN = os.environ.get('PERFILADO_TOKEN', '')
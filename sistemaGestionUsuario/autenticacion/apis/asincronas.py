@@ -0,0 +1,46 @@
+"""
+Version async de /usuarios/info/me/, servida por autenticacion/urls.py en la
+misma ruta que UserViewSet.me, que queda detras.
+
+Bajo ASGI una vista sync corre en el unico hilo de sync_to_async y todas las
+conexiones de un worker hacen cola ahi. Aca el token se valida en el event
+loop (no consulta la base) y solo la busqueda del usuario pasa por ese hilo,
+con el mismo JWTAuthentication.get_user que usa el viewset: usuario
+inexistente, inactivo o con la clave cambiada se rechazan igual.
+"""
+from asgiref.sync import sync_to_async
+from django.views.decorators.http import require_safe
+from rest_framework import exceptions
+from rest_framework_simplejwt.authentication import JWTAuthentication
+
+from sistemaGestionUsuario.respuestas import respuesta_json
+from autenticacion.apis.user_viewset import UserSerializer
+
+
+async def aautenticar(autenticador, request):
+    """
+    JWTAuthentication.authenticate para una vista async. Devuelve el usuario
+    o None si no vino un token; levanta AuthenticationFailed/InvalidToken
+    como la original.
+    """
+    encabezado = autenticador.get_header(request)
+    crudo = None if encabezado is None else autenticador.get_raw_token(encabezado)
+    if crudo is None:
+        return None
+    token = autenticador.get_validated_token(crudo)
+    return await sync_to_async(autenticador.get_user)(token)
+
+
+@require_safe
+async def me(request):
+    # UserViewSet.me (IsAuthenticated)
+    autenticador = JWTAuthentication()
+    try:
+        usuario = await aautenticar(autenticador, request)
+        if usuario is None:
+            raise exceptions.NotAuthenticated()
+    except exceptions.APIException as e:
+        respuesta = respuesta_json(e.detail if isinstance(e.detail, dict) else {'detail': e.detail}, e.status_code)
+        respuesta['WWW-Authenticate'] = autenticador.authenticate_header(request)
+        return respuesta
+    return respuesta_json(UserSerializer(usuario).data)
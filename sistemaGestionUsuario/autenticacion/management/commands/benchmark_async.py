@@ -0,0 +1,35 @@
+from django.urls import path, include
+from rest_framework_simplejwt.tokens import AccessToken
+
+from autenticacion.apis.user_viewset import UserViewSet
+from autenticacion.management.commands._bench import ComandoBenchmarkAsgi, Escenario
+from autenticacion.management.commands.benchmark_carga import cargar_usuarios
+from autenticacion.models import CustomUser
+
+# modo sync: la misma ruta servida por el @action del viewset
+urlpatterns = [
+    path('usuarios/info/me/', UserViewSet.as_view({'get': 'me'})),
+    path('', include('sistemaGestionUsuario.urls')),
+]
+
+
+def preparar_me(tamano):
+    cargar_usuarios(tamano)
+    # tokens firmados aca: se mide solo /me/, no el login
+    usuarios = CustomUser.objects.order_by('pk').values_list('pk', flat=True)[:100]
+    cabeceras = [
+        {'Authorization': f'Bearer {AccessToken.for_user(CustomUser(pk=pk))}'} for pk in usuarios
+    ]
+
+    def operacion(cliente, i):
+        return cliente.get('/usuarios/info/me/', headers=cabeceras[i % len(cabeceras)])
+    return operacion
+
+
+class Command(ComandoBenchmarkAsgi):
+    help = '/usuarios/info/me/ bajo ASGI, vista async contra la del viewset'
+    servicio = 'autenticacion'
+    urlconf_sync = __name__
+    escenarios = {
+        'me': Escenario(preparar_me),
+    }
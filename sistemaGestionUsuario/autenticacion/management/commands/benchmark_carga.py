@@ -0,0 +1,52 @@
+from django.contrib.auth.hashers import make_password
+
+from autenticacion.management.commands._bench import ComandoBenchmark, Escenario
+from autenticacion.models import CustomUser
+
+CLAVE = 'benchmark-1234'
+ROLES = ('admin_padron', 'admin_elecciones', 'jurado')
+
+
+def cargar_usuarios(tamano, lote=10_000):
+    # un solo hash para todos: hashear `tamano` claves tardaria mas que el benchmark
+    clave = make_password(CLAVE)
+    for inicio in range(0, tamano, lote):
+        CustomUser.objects.bulk_create([
+            CustomUser(username=f'usuario{i}', email=f'usuario{i}@example.com', password=clave,
+                       first_name='Usuario', last_name=str(i), rol=ROLES[i % len(ROLES)], is_active=True)
+            for i in range(inicio, min(tamano, inicio + lote))
+        ], batch_size=lote)
+
+
+def preparar_login(tamano):
+    cargar_usuarios(tamano)
+
+    def operacion(cliente, i):
+        return cliente.post('/api/token/', {
+            'username': f'usuario{(i * 7919) % tamano}', 'password': CLAVE,
+        }, format='json')
+    return operacion
+
+
+def preparar_me(tamano):
+    cargar_usuarios(tamano)
+    accesos = {}
+
+    def operacion(cliente, i):
+        # un token por cliente, pedido una sola vez; se mide solo /me/
+        if id(cliente) not in accesos:
+            respuesta = cliente.post('/api/token/', {'username': 'usuario0', 'password': CLAVE}, format='json')
+            accesos[id(cliente)] = respuesta.data['access']
+            cliente.credentials(HTTP_AUTHORIZATION=f'Bearer {accesos[id(cliente)]}')
+        return cliente.get('/usuarios/info/me/')
+    return operacion
+
+
+class Command(ComandoBenchmark):
+    help = 'Carga contra el login (token JWT) y /usuarios/info/me/; reporte JSON comparable entre commits'
+    servicio = 'autenticacion'
+    escenarios = {
+        # el login es caro a proposito (PBKDF2), con pocas iteraciones alcanza
+        'login': Escenario(preparar_login, escala=0.1),
+        'me': Escenario(preparar_me),
+    }
@@ -1,3 +1,98 @@
-from django.test import TestCase
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from autenticacion.apis import UserViewSet
+from autenticacion.models import CustomUser
+
+me_sync = UserViewSet.as_view({'get': 'me'})
+
+
+class MeAsyncTest(TestCase):
+    """
+    /usuarios/info/me/ lo sirve la vista async; tiene que responder igual
+    que UserViewSet.me.
+    """
+
+    def setUp(self):
+        self.usuario = CustomUser.objects.create_user(
+            username='jurado1', password='clave-1234', email='j@example.com', rol='jurado'
+        )
+        self.client = APIClient()
+
+    def comparar(self, autorizacion=None):
+        extra = {'HTTP_AUTHORIZATION': autorizacion} if autorizacion else {}
+        asincrona = self.client.get('/usuarios/info/me/', **extra)
+        sincrona = me_sync(RequestFactory().get('/usuarios/info/me/', **extra))
+        sincrona.render()
+        self.assertEqual(asincrona.status_code, sincrona.status_code)
+        self.assertEqual(asincrona.json(), sincrona.data)
+        self.assertEqual(asincrona.get('WWW-Authenticate'), sincrona.get('WWW-Authenticate'))
+        return asincrona
+
+    def test_con_token(self):
+        respuesta = self.comparar(f'Bearer {AccessToken.for_user(self.usuario)}')
+        self.assertEqual(respuesta.json()['rol'], 'jurado')
+        # HEAD se acepta como en el @action
+        head = self.client.head('/usuarios/info/me/', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.usuario)}')
+        self.assertEqual(head.status_code, 200)
+
+    def test_sin_token_o_invalido(self):
+        self.assertEqual(self.comparar().status_code, 401)
+        self.assertEqual(self.comparar('Bearer no-es-un-jwt').status_code, 401)
+
+    def test_usuario_inactivo(self):
+        token = AccessToken.for_user(self.usuario)
+        self.usuario.is_active = False
+        self.usuario.save()
+        self.assertEqual(self.comparar(f'Bearer {token}').status_code, 401)
+
+    def test_usuario_borrado(self):
+        token = AccessToken.for_user(self.usuario)
+        self.usuario.delete()
+        self.assertEqual(self.comparar(f'Bearer {token}').status_code, 401)
+
+    def test_token_sin_usuario(self):
+        # un token valido pero sin el claim user_id
+        self.assertEqual(self.comparar(f'Bearer {AccessToken()}').status_code, 401)
+
+    def test_token_revocado_al_cambiar_la_clave(self):
+        # simplejwt no relee sus settings en los modulos que ya los importaron
+        with mock.patch.object(jwt_settings, 'CHECK_REVOKE_TOKEN', True):
+            token = AccessToken.for_user(self.usuario)
+            self.assertEqual(self.comparar(f'Bearer {token}').status_code, 200)
+            self.usuario.set_password('otra-clave-5678')
+            self.usuario.save()
+            self.assertEqual(self.comparar(f'Bearer {token}').status_code, 401)
+
+
+# copias identicas en los tres servicios, que no comparten un paquete importable
+PROYECTOS = {
+    'sistemaAdministracionElectoral': ('sistemaAdministracionElectoral', 'eleccion'),
+    'SistemaVotacion': ('SistemaVotacion', 'votacion'),
+    'sistemaGestionUsuario': ('sistemaGestionUsuario', 'autenticacion'),
+}
+COPIAS = ('{config}/respuestas.py', '{config}/sqlite.py', '{config}/perfilado.py',
+          '{app}/management/commands/_bench.py')
+
+
+class CopiasCompartidasTest(SimpleTestCase):
+
+    def test_copias_identicas(self):
+        base = Path(settings.BASE_DIR)
+        config, app = PROYECTOS[base.name]
+        for plantilla in COPIAS:
+            propia = base / plantilla.format(config=config, app=app)
+            for proyecto, (otra_config, otra_app) in PROYECTOS.items():
+                otra = base.parent / proyecto / plantilla.format(config=otra_config, app=otra_app)
+                if otra == propia or not otra.exists():
+                    # el servicio puede estar desplegado sin los demas
+                    continue
+                with self.subTest(archivo=f'{proyecto}/{plantilla.format(config=otra_config, app=otra_app)}'):
+                    self.assertEqual(propia.read_bytes(), otra.read_bytes(),
+                                     f'{otra} difiere de {propia}: el cambio va en las tres copias')
@@ -1,11 +1,13 @@
 from django.urls import path, include
 from rest_framework import routers
+from autenticacion.apis import asincronas
 from autenticacion.apis.user_viewset import UserViewSet
 
 router = routers.DefaultRouter()
 router.register('info', UserViewSet, basename='user')
 
 urlpatterns = [
+    # version async, delante de la del viewset (ver asincronas.py)
+    path('info/me/', asincronas.me, name='user-me'),
     path('', include(router.urls)),
-
 ]
\ No newline at end of file
@@ -0,0 +1,208 @@
+"""
+JSON rapido y compresion de respuestas.
+
+Es el mismo archivo en los tres servicios (sistemaAdministracionElectoral,
+SistemaVotacion y sistemaGestionUsuario), cada uno lo usa desde su paquete
+de configuracion:
+
+  REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] / ['DEFAULT_PARSER_CLASSES']
+      OrjsonRenderer / OrjsonParser: orjson en vez del json de la libreria
+      estandar, varias veces mas rapido con listas grandes.
+  MIDDLEWARE
+      CompresionMiddleware: brotli (si esta instalado) o gzip segun
+      Accept-Encoding, solo para contenido de texto/JSON de al menos
+      COMPRESION_MINIMO bytes (1024 por defecto).
+"""
+import gzip
+import zlib
+from datetime import timedelta
+from decimal import Decimal
+
+import orjson
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.renderers import BaseRenderer
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional, sin el se usa solo gzip
+    brotli = None
+
+COMPRIMIBLES = ('text/', 'application/json', 'application/geo+json', 'application/x-ndjson', 'application/javascript')
+CALIDAD_BROTLI = 5
+NIVEL_GZIP = 6
+
+
+def _por_defecto(valor):
+    # lo que orjson no serializa solo, como lo resuelve el encoder de DRF
+    if isinstance(valor, Decimal):
+        return str(valor)
+    if isinstance(valor, Promise):
+        return force_str(valor)
+    if isinstance(valor, timedelta):
+        return str(valor.total_seconds())
+    if isinstance(valor, bytes):
+        return valor.decode()
+    if hasattr(valor, 'tolist'):
+        return valor.tolist()
+    if hasattr(valor, 'keys') and hasattr(valor, '__getitem__'):
+        return dict(valor)
+    if hasattr(valor, '__iter__'):
+        # QuerySet, .values(), sets, generadores
+        return list(valor)
+    raise TypeError(f'{type(valor).__name__} no es serializable a JSON')
+
+
+def a_json(datos):
+    return orjson.dumps(
+        datos, default=_por_defecto,
+        option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+    )
+
+
+def respuesta_json(datos, status=200):
+    # para las vistas que no pasan por DRF (las async)
+    return HttpResponse(a_json(datos), content_type='application/json', status=status)
+
+
+class OrjsonRenderer(BaseRenderer):
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return a_json(data)
+
+
+class OrjsonParser(BaseParser):
+    media_type = 'application/json'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as e:
+            raise ParseError(f'JSON inválido: {e}')
+
+
+def codificaciones_aceptadas(cabecera):
+    # {'gzip': 1.0, 'br': 0.8, ...} a partir de Accept-Encoding
+    aceptadas = {}
+    for parte in cabecera.split(','):
+        nombre, _, parametros = parte.strip().partition(';')
+        calidad = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith('q='):
+            try:
+                calidad = float(parametros[2:])
+            except ValueError:
+                calidad = 0.0
+        if nombre:
+            aceptadas[nombre.lower()] = calidad
+    return aceptadas
+
+
+def elegir_codificacion(cabecera):
+    aceptadas = codificaciones_aceptadas(cabecera)
+    comodin = aceptadas.get('*', 0.0)
+    candidatas = (['br'] if brotli is not None else []) + ['gzip']
+    mejor, mejor_calidad = None, 0.0
+    for nombre in candidatas:
+        calidad = aceptadas.get(nombre, comodin)
+        if calidad > mejor_calidad:
+            mejor, mejor_calidad = nombre, calidad
+    return mejor
+
+
+def _comprimir(contenido, codificacion):
+    if codificacion == 'br':
+        return brotli.compress(contenido, quality=CALIDAD_BROTLI)
+    return gzip.compress(contenido, compresslevel=NIVEL_GZIP, mtime=0)
+
+
+def _compresor(codificacion):
+    # (comprimir, terminar) de un compresor incremental
+    if codificacion == 'br':
+        compresor = brotli.Compressor(quality=CALIDAD_BROTLI)
+        return compresor.process, compresor.finish
+    compresor = zlib.compressobj(NIVEL_GZIP, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compresor.compress, compresor.flush
+
+
+def _comprimir_stream(pedazos, codificacion):
+    comprimir, terminar = _compresor(codificacion)
+    for pedazo in pedazos:
+        salida = comprimir(pedazo)
+        if salida:
+            yield salida
+    yield terminar()
+
+
+async def _comprimir_stream_async(pedazos, codificacion):
+    comprimir, terminar = _compresor(codificacion)
+    async for pedazo in pedazos:
+        salida = comprimir(pedazo)
+        if salida:
+            yield salida
+    yield terminar()
+
+
+class CompresionMiddleware:
+    """
+    Comprime con brotli o gzip, lo que el cliente prefiera de los dos. No
+    toca respuestas ya codificadas, binarias (el snapshot de asignacion) ni
+    las de menos de COMPRESION_MINIMO bytes, que crecerian con la cabecera.
+    Funciona con WSGI y con ASGI: si quedara un middleware solo sync las
+    vistas async volverian a correr en un hilo.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.minimo = getattr(settings, 'COMPRESION_MINIMO', 1024)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.comprimir(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.comprimir(request, await self.get_response(request))
+
+    def comprimir(self, request, response):
+        if response.has_header('Content-Encoding') or not response.get('Content-Type', '').startswith(COMPRIMIBLES):
+            return response
+        patch_vary_headers(response, ('Accept-Encoding',))
+        codificacion = elegir_codificacion(request.headers.get('Accept-Encoding', ''))
+        if codificacion is None:
+            return response
+
+        if response.streaming:
+            comprimir_stream = _comprimir_stream_async if response.is_async else _comprimir_stream
+            response.streaming_content = comprimir_stream(response.streaming_content, codificacion)
+            del response.headers['Content-Length']
+        else:
+            if len(response.content) < self.minimo:
+                return response
+            comprimido = _comprimir(response.content, codificacion)
+            if len(comprimido) >= len(response.content):
+                return response
+            response.content = comprimido
+            response.headers['Content-Length'] = str(len(comprimido))
+
+        # el cuerpo ya no es el mismo byte a byte: el ETag pasa a ser debil
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = codificacion
+        return response
@@ -0,0 +1,58 @@
+"""
+Perfil de SQLite para escrituras concurrentes.
+
+Es el mismo archivo en los tres servicios, como respuestas.py. settings.py
+lo usa en dos lugares:
+
+  DATABASES['default']['OPTIONS'] = OPCIONES
+      timeout: cuanto espera una conexion a que se libere el lock antes de
+      fallar con "database is locked".
+      transaction_mode IMMEDIATE: atomic() toma el lock de escritura al
+      empezar. Con el modo por defecto una transaccion que primero lee y
+      despues escribe falla al instante si otra ya esta escribiendo, sin
+      esperar el timeout.
+  connection_created -> configurar_conexion
+      los PRAGMAS de abajo en cada conexion nueva. En WAL los lectores no
+      bloquean al que escribe ni al reves, y con synchronous=NORMAL el
+      commit no espera un fsync (lo hace el checkpoint).
+
+journal_mode=WAL no es de la conexion sino del archivo: queda grabado en la
+base y deja db.sqlite3-wal/-shm al lado. Por eso solo se pone con
+SQLITE_WAL = True (SQLITE_WAL=1 en el entorno del despliegue); sin eso un
+migrate o un runserver en la copia de trabajo no reescriben el db.sqlite3
+del repo. Los benchmarks lo activan en su base temporal.
+
+Con SQLITE_CONCURRENTE = False queda la configuracion de fabrica de Django,
+para comparar (benchmark_carga --sqlite defecto).
+"""
+from django.conf import settings
+
+TIMEOUT = 20
+
+OPCIONES = {
+    'timeout': TIMEOUT,
+    'transaction_mode': 'IMMEDIATE',
+}
+
+PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': TIMEOUT * 1000,
+    # KiB en negativo: 64 MB de cache de paginas por conexion
+    'cache_size': -64000,
+    'temp_store': 'MEMORY',
+    'mmap_size': 256 * 1024 * 1024,
+}
+
+
+def configurar_conexion(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or not getattr(settings, 'SQLITE_CONCURRENTE', True):
+        return
+    with connection.cursor() as cursor:
+        for nombre, valor in getattr(settings, 'SQLITE_PRAGMAS', PRAGMAS).items():
+            # una base en memoria (la de los tests) no tiene WAL
+            if nombre == 'journal_mode' and (
+                connection.is_in_memory_db() or not getattr(settings, 'SQLITE_WAL', False)
+            ):
+                continue
+            cursor.execute(f'PRAGMA {nombre} = {valor}')
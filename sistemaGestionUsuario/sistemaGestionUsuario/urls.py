@@ -1,9 +1,11 @@
 from django.urls import path, include
+from sistemaGestionUsuario import perfilado
 from rest_framework import routers
 from rest_framework_simplejwt.views import TokenRefreshView
 from autenticacion.apis import CustomTokenObtainPairView
 
 urlpatterns = [
+    path('_perfilado/', perfilado.resumen, name='perfilado'),
     path('usuarios/', include('autenticacion.urls')),
     path('api/token/', CustomTokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),